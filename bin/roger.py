@@ -4,11 +4,24 @@ from __future__ import print_function
 
 import os
 import sys
-import subprocess
-import re
 import importlib
 from cli.utils import Utils
 
+# command > (module implementing it, description shown by roger -h). Every module has a main(argv) that returns
+# the exit code. The descriptions are kept here so that roger -h doesn't have to import every command.
+COMMANDS = {
+    'build': ('cli.roger_build', 'runs the docker build and optionally pushes it into the registry.'),
+    'deploy': ('cli.roger_deploy',
+               'runs through all of the steps: gitpull -> build & push to registry -> push to roger mesos.'),
+    'gitpull': ('cli.roger_gitpull', 'pulls code from the application git repository (clones the repository).'),
+    'init': ('cli.roger_init', 'creates an initial application template and a team config file.'),
+    'logs': ('cli.roger_logs', "streams the new output from the tasks's STDOUT and STDERR logs."),
+    'promote': ('cli.roger_promote', 'Enables application promotion between environments'),
+    'ps': ('cli.roger_ps', 'displays information about the currently active applications and tasks.'),
+    'push': ('cli.roger_push', 'pushes the application into roger mesos.'),
+    'shell': ('cli.roger_shell', 'starts an interactive bash session into a task.')
+}
+
 
 def print_help_opt(opt, desc):
     print("  {} {}".format(opt.ljust(13), desc))
@@ -24,66 +37,48 @@ def roger_help(root, commands):
     print_help_opt("-h, --help", "show this help message and exit.")
     print_help_opt("-v, --version", "show version information and exit.")
     print("\ncommands:")
-    sys.path.append("{}/cli".format(root))
     for command in commands:
-        description = ""
-        module_name = "roger_" + command
-        cmd_module = importlib.import_module(module_name)
-        try:
-            description = cmd_module.describe()
-        except Exception as e:
-            pass
-        print_help_opt(command, description)
+        print_help_opt(command, COMMANDS[command][1])
     print("\nrun: 'roger < command > -h' for more information on a command.")
 
 
-def getFiles(directory):
-    filenames = next(os.walk(directory))[2]
-    return filenames
-
-
-def getCommands(files):
-    commands = set()
-    for filename in files:
-        if filename.startswith("roger_"):
-            commands.add(re.split("roger_|\.", filename)[1])
-    return sorted(commands)
-
+def getCommands():
+    return sorted(COMMANDS.keys())
 
-def getScriptCall(root, command, command_args):
-    script_call = "roger_{}.py".format(command)
 
-    for command_arg in command_args:
-        script_call = script_call + " {}".format(command_arg)
-    return script_call
+def runCommand(command, command_args):
+    '''Runs the command in this process and returns its exit code.'''
+    cmd_module = importlib.import_module(COMMANDS[command][0])
+    exit_code = cmd_module.main(command_args)
+    return exit_code if exit_code is not None else 0
 
 
-def main():
+def main(argv=None):
     root = ''
     utilsObj = Utils()
     own_dir = os.path.dirname(os.path.realpath(__file__))
     root = os.path.abspath(os.path.join(own_dir, os.pardir))
-    files = getFiles("{}/cli/".format(root))
-    commands = getCommands(files)
-    if len(sys.argv) > 1:
-        if sys.argv[1] == "-h" or sys.argv[1] == "--help":
+    commands = getCommands()
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) > 0:
+        if argv[0] == "-h" or argv[0] == "--help":
             roger_help(root, commands)
-        elif sys.argv[1] == "-v" or sys.argv[1] == "--version":
+        elif argv[0] == "-v" or argv[0] == "--version":
             version = utilsObj.roger_version(root)
             print(version)
         else:
-            command = sys.argv[1]
-            command_args = sys.argv[2:]
+            command = argv[0]
+            command_args = argv[1:]
             if command in commands:
                 print("root: {} command: {} args: {}".format(
                     root, command, command_args
                 ))
-                script_call = getScriptCall(root, command, command_args)
-                os.system(script_call)
+                return runCommand(command, command_args)
             else:
                 raise SystemExit("Command is not valid. Exiting.")
     else:
         raise SystemExit("No arguments found. Please refer to usage: roger -h")
+    return 0
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
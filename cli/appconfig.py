@@ -4,25 +4,99 @@ from __future__ import print_function
 import os
 import os.path
 import sys
-import json
-import yaml
+import threading
+from cli import loader
 from cli.settings import Settings
 
+# path > ((mtime, size), frozen config), shared by every AppConfig in the process
+_snapshots = {}
+_snapshots_lock = threading.Lock()
+
+
+def _readonly(self, *args, **kwargs):
+    raise TypeError("Config snapshots are read-only, copy them (e.g. with copy.deepcopy) before making changes.")
+
+
+class FrozenDict(dict):
+    '''A dict that can't be changed in place. Copies of it are plain dicts.'''
+
+    __setitem__ = __delitem__ = clear = pop = popitem = setdefault = update = _readonly
+
+    def __copy__(self):
+        return dict(self)
+
+    def __deepcopy__(self, memo):
+        return thaw(self)
+
+    def __reduce__(self):
+        return (dict, (dict(self),))
+
+
+class FrozenList(list):
+    '''A list that can't be changed in place. Copies of it are plain lists.'''
+
+    __setitem__ = __delitem__ = __setslice__ = __delslice__ = __iadd__ = __imul__ = _readonly
+    append = extend = insert = pop = remove = reverse = sort = _readonly
+
+    def __copy__(self):
+        return list(self)
+
+    def __deepcopy__(self, memo):
+        return thaw(self)
+
+    def __reduce__(self):
+        return (list, (list(self),))
+
+
+def freeze(value):
+    if isinstance(value, dict):
+        return FrozenDict((key, freeze(item)) for key, item in value.iteritems())
+    if isinstance(value, list):
+        return FrozenList(freeze(item) for item in value)
+    return value
+
+
+def thaw(value):
+    if isinstance(value, dict):
+        return dict((key, thaw(item)) for key, item in value.iteritems())
+    if isinstance(value, list):
+        return [thaw(item) for item in value]
+    return value
+
+
+def load_snapshot(path):
+    '''Returns the frozen contents of the file at path, loading it only if it
+    was not read before or its mtime or size have changed since.'''
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    signature = (stat.st_mtime, stat.st_size)
+    with _snapshots_lock:
+        snapshot = _snapshots.get(path)
+    if snapshot is not None and snapshot[0] == signature:
+        return snapshot[1]
+    value = freeze(loader.load(path))
+    with _snapshots_lock:
+        _snapshots[path] = (signature, value)
+    return value
+
+
+def clear_snapshots():
+    with _snapshots_lock:
+        _snapshots.clear()
+
 
 class AppConfig:
 
     def getRogerEnv(self, config_dir):
-        roger_env = None
+        '''Returns a read-only view of roger-mesos-tools.config in config_dir.'''
         env_file = '{0}/roger-mesos-tools.config'
-        with open(env_file.format(config_dir)) as roger_env_file_obj:
-            if env_file.lower().endswith('.config'):
-                roger_env = yaml.load(roger_env_file_obj)
-        return roger_env
+        return load_snapshot(env_file.format(config_dir))
 
     def getConfig(self, config_dir, config_file):
         '''Load the Roger configuration file with path specified by
         'config_file' as either a YAML file or a JSON file. If 'config_file' is
         a relative path, then look for it relative to the 'config_dir' path.
+        The file is parsed once and a read-only view of it is returned.
         '''
         if not os.path.isabs(config_file):
             config_file = os.path.join(config_dir, config_file)
@@ -32,11 +106,7 @@ class AppConfig:
             raise ValueError("Config filepath '{}' is not a readable file"
                              .format(config_file))
 
-        load = yaml.load if config_file.lower().endswith('.yml') else json.load
-        with open(config_file) as config_file_obj:
-            config = load(config_file_obj)
-
-        return config
+        return load_snapshot(config_file)
 
     def getAppData(self, config_dir, config_file, app_name):
         config = self.getConfig(config_dir, config_file)
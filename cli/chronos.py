@@ -3,21 +3,21 @@
 from __future__ import print_function
 import os
 import sys
-import requests
 import json
 from termcolor import colored
 from cli.framework import Framework
 from cli.appconfig import AppConfig
 from cli.utils import Utils
-requests.packages.urllib3.disable_warnings()
+from cli.sessionpool import get_session_pool
 utils = Utils()
 
 
 class Chronos(Framework):
 
-    def __init__(self):
+    def __init__(self, session_pool=None):
         self.user = None
         self.passw = None
+        self.session_pool = session_pool if session_pool is not None else get_session_pool()
 
     def getName(self):
         return "Chronos"
@@ -26,7 +26,7 @@ class Chronos(Framework):
         self.fetchUserPass(environment)
         url = roger_env['environments'][environment][
             'chronos_endpoint'] + "/scheduler/jobs"
-        resp = requests.get(url, auth=(self.user, self.passw))
+        resp = self.session_pool.get(url, auth=(self.user, self.passw))
         return resp.json()
 
     def put(self, file_path, environmentObj, container, environment, act_as_user):
@@ -43,15 +43,15 @@ class Chronos(Framework):
         deploy_url = "{}/{}".format(endpoint, chronos_resource)
 
         if not act_as_user:
-            resp = requests.put(deploy_url, data=data,
-                                headers={'Content-type': 'application/json'},
-                                auth=(self.user, self.passw),
-                                allow_redirects=True)
+            resp = self.session_pool.put(deploy_url, data=data,
+                                         headers={'Content-type': 'application/json'},
+                                         auth=(self.user, self.passw),
+                                         allow_redirects=True)
         else:
-            resp = requests.put(deploy_url, data=data,
-                                headers={'Content-type': 'application/json', 'act-as-user': act_as_user},
-                                auth=(self.user, self.passw),
-                                allow_redirects=True)
+            resp = self.session_pool.put(deploy_url, data=data,
+                                         headers={'Content-type': 'application/json', 'act-as-user': act_as_user},
+                                         auth=(self.user, self.passw),
+                                         allow_redirects=True)
         chronos_message = "{}".format(resp)
         print(colored(chronos_message, "yellow"))
         task_id = []
@@ -98,6 +98,33 @@ class Chronos(Framework):
         url = '{location}/scheduler/jobs/search?name={name}'.format(
             location=location, name=name)
 
-        res = requests.get(url, auth=(username, password))
+        res = self.session_pool.get(url, auth=(username, password))
         imagename = res.json()[0]['container']['image']
         return imagename
+
+    def get_image_names(self, username, password, env, names, config_dir, config_file,
+                        app_config_object=AppConfig()):
+        """
+        returns {job name: image name} for all of names, from a single listing
+        of /scheduler/jobs; names that don't match a job exactly are searched
+        for as get_image_name does
+        """
+        if not names:
+            return {}
+        config = app_config_object.getRogerEnv(config_dir)
+        location = config['environments'][env]['chronos_endpoint']
+        url = '{location}/scheduler/jobs'.format(location=location)
+        res = self.session_pool.get(url, auth=(username, password))
+        res.raise_for_status()
+        index = {}
+        for job in res.json():
+            if 'name' in job and 'image' in (job.get('container') or {}):
+                index[job['name']] = job['container']['image']
+        images = {}
+        for name in names:
+            if name in index:
+                images[name] = index[name]
+            else:
+                images[name] = self.get_image_name(username, password, env, name, config_dir, config_file,
+                                                   app_config_object)
+        return images
@@ -5,12 +5,10 @@ import argparse
 import subprocess
 import json
 import os
-import requests
 import subprocess
 import sys
 from marathon import Marathon
 from cli.utils import printException, printErrorMsg
-requests.packages.urllib3.disable_warnings()
 
 # we probably need to remove (or refactor) this module (ankan, 201603)
 
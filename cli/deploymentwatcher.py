@@ -0,0 +1,107 @@
+#!/usr/bin/python
+
+from __future__ import print_function
+import time
+from collections import namedtuple
+
+# name is what was pushed (the container), apps the Marathon apps the deployment changed and
+# health {app id: AppHealth} the state of their tasks once the deployment was over
+DeploymentResult = namedtuple('DeploymentResult', ['name', 'deployment_id', 'status', 'elapsed', 'apps', 'health'])
+AppHealth = namedtuple('AppHealth', ['instances', 'running', 'healthy', 'has_health_checks'])
+
+
+def app_health(app):
+    has_health_checks = bool(app.get('healthChecks'))
+    return AppHealth(app.get('instances', 0), app.get('tasksRunning', 0), app.get('tasksHealthy', 0),
+                     has_health_checks)
+
+
+def is_converged(health):
+    if health.running < health.instances:
+        return False
+    return not health.has_health_checks or health.healthy >= health.instances
+
+
+class DeploymentWatcher(object):
+    '''Waits for Marathon deployments to finish.
+
+    All the deployments being waited for are tracked with a single GET of
+    /v2/deployments per poll, however many there are. The poll interval starts
+    at initial_interval and grows by half (up to max_interval) every time
+    nothing changed, it goes back to initial_interval as soon as a deployment
+    moves to its next step or finishes. When a deployment is over, the apps
+    it changed are fetched once to report whether their tasks converged.'''
+
+    def __init__(self, endpoint, session_pool, auth=None, initial_interval=1.0, max_interval=10.0,
+                 sleep=time.sleep, clock=time.time):
+        self.endpoint = endpoint
+        self.session_pool = session_pool
+        self.auth = auth
+        self.initial_interval = initial_interval
+        self.max_interval = max_interval
+        self.sleep = sleep
+        self.clock = clock
+        self.pending = {}
+        self.apps = {}
+
+    def add(self, name, deployment_id, app_ids=None):
+        self.pending[deployment_id] = name
+        self.apps[deployment_id] = list(app_ids or [])
+
+    def getJson(self, path):
+        resp = self.session_pool.get("{}{}".format(self.endpoint, path), auth=self.auth,
+                                     headers={'Accept': 'application/json'})
+        resp.raise_for_status()
+        return resp.json()
+
+    def getHealth(self, app_ids):
+        health = {}
+        for app_id in app_ids:
+            try:
+                health[app_id] = app_health(self.getJson("/v2/apps/{}".format(app_id.lstrip('/')))['app'])
+            except (Exception) as e:
+                print("Unable to get the tasks of {}: {}".format(app_id, e))
+        return health
+
+    def wait(self, timeout=600, on_progress=None):
+        '''Returns a DeploymentResult for every deployment added, once all of them
+        are over or timeout seconds passed. on_progress(name, deployment) is called
+        every time a deployment moves to a new step.'''
+        started = self.clock()
+        interval = self.initial_interval
+        steps = {}
+        results = []
+        while self.pending:
+            deployments = dict((deployment['id'], deployment) for deployment in self.getJson('/v2/deployments'))
+            changed = False
+            for deployment_id, name in list(self.pending.items()):
+                deployment = deployments.get(deployment_id)
+                if deployment is not None:
+                    self.apps[deployment_id] = deployment.get('affectedApps', self.apps[deployment_id])
+                    step = (deployment.get('currentStep'), deployment.get('totalSteps'))
+                    if steps.get(deployment_id) != step:
+                        steps[deployment_id] = step
+                        changed = True
+                        if on_progress is not None:
+                            on_progress(name, deployment)
+                    continue
+                # gone from the list: finished (or was replaced by a newer deployment)
+                del self.pending[deployment_id]
+                changed = True
+                app_ids = self.apps[deployment_id]
+                health = self.getHealth(app_ids)
+                converged = len(health) == len(app_ids) and all(is_converged(value) for value in health.values())
+                results.append(DeploymentResult(name, deployment_id, 'succeeded' if converged else 'unhealthy',
+                                                self.clock() - started, app_ids, health))
+            if not self.pending:
+                break
+            elapsed = self.clock() - started
+            if elapsed >= timeout:
+                for deployment_id, name in self.pending.items():
+                    results.append(DeploymentResult(name, deployment_id, 'timeout', elapsed,
+                                                    self.apps[deployment_id], {}))
+                self.pending = {}
+                break
+            interval = self.initial_interval if changed else min(self.max_interval, interval * 1.5)
+            self.sleep(min(interval, max(0, timeout - elapsed)))
+        return results
@@ -7,14 +7,22 @@ import shutil
 import json
 import os
 import re
+import subprocess
+import tempfile
+from collections import namedtuple
 from copy import deepcopy
 from cli.appconfig import AppConfig
 from cli.dockerutils import DockerUtils
+from cli.gitmirror import GitMirror
+from cli.settings import Settings
+from cli.workerpool import thread_map
 
 import contextlib
 
 pattern = re.compile('.+/(\S+).git', re.IGNORECASE)
 
+RepoResult = namedtuple('RepoResult', ['project', 'exit_code', 'output'])
+
 
 @contextlib.contextmanager
 def chdir(dirname):
@@ -50,34 +58,91 @@ def write_update_id(update_id):
 GIT_ACCOUNT = "seomoz"
 
 
-def download_private_repos(projects, update_id=None):
+def private_repo(project_or_path):
+    '''Returns (project, repository url) for an entry of privateProjects.'''
+    matches = pattern.findall(project_or_path)
+    if matches:
+        return matches[0], project_or_path
+    return project_or_path, 'git@github.com:{}/{}'.format(GIT_ACCOUNT, project_or_path)
+
+
+def run_commands(commands, cwd, log):
+    '''Runs commands in cwd until one fails, returns the exit code of the last one run.'''
+    for command in commands:
+        exit_code = subprocess.call(command, cwd=cwd, stdout=log, stderr=subprocess.STDOUT)
+        if exit_code != 0:
+            return exit_code
+    return 0
+
+
+def fetch_private_repo(git_dir, project, path, mirror):
+    '''Clones (or pulls if already existing) one private project to git_dir/project.
+  Uses the mirror, if enabled, instead of going to the remote. Returns a RepoResult.'''
+    project_dir = os.path.join(git_dir, project)
+    with tempfile.TemporaryFile() as log:
+        if os.path.isdir(project_dir):
+            if mirror.isEnabled():
+                exit_code = mirror.update(path, log=log)
+                if exit_code == 0:
+                    exit_code = run_commands([
+                        ['git', 'fetch', mirror.getPath(path), '+refs/heads/*:refs/remotes/origin/*'],
+                        ['git', 'merge', '--no-edit', 'origin/master']], project_dir, log)
+            else:
+                exit_code = run_commands([['git', 'fetch'], ['git', 'pull', '--no-edit', 'origin', 'master']],
+                                         project_dir, log)
+        elif mirror.isEnabled():
+            exit_code = mirror.checkout(path, None, project_dir, log=log)
+        else:
+            exit_code = run_commands([['git', 'clone', path, project]], git_dir, log)
+        log.seek(0)
+        return RepoResult(project, exit_code, log.read())
+
+
+def download_private_repos(projects, update_id=None, jobs=None):
     '''Clone (or pull if already existing) private projects to the "git" subdirectory.
   Takes an optional "update_id" (can be a very long string like a Gemfile) that we save
-  to the subdirectory. Only pulls from the subrepos if this has changed.'''
+  to the subdirectory. Only pulls from the subrepos if this has changed.
+  Up to "jobs" (defaults to $ROGER_GIT_JOBS) projects are fetched at a time; raises a
+  ValueError naming the projects that could not be fetched.'''
     if not os.path.isdir('git'):
         os.mkdir('git')
+    git_dir = os.path.abspath('git')
 
     with chdir('git'):
         if update_id_matches(update_id):
             return
 
-        for project_or_path in projects:
-            matches = pattern.findall(project_or_path)
-            if matches:
-                project, path = matches[0], project_or_path
-            else:
-                project, path = project_or_path, 'git@github.com:{}/{}'.format(
-                    GIT_ACCOUNT, project_or_path)
+        repos = [private_repo(project_or_path) for project_or_path in projects]
 
-            if os.path.isdir(project):
-                with chdir(project):
-                    os.system('git fetch; git pull origin master')
-            else:
-                os.system('git clone {}'.format(path))
+        mirror = GitMirror()
+        jobs = jobs if jobs else Settings().getGitJobs()
+        results = thread_map(lambda repo: fetch_private_repo(git_dir, repo[0], repo[1], mirror), repos, jobs)
+        failed = []
+        for result in results:
+            print(result.output, end='')
+            if result.exit_code != 0:
+                failed.append(result.project)
+        if failed:
+            raise ValueError("Failed to download private repos: {}".format(", ".join(failed)))
 
         write_update_id(update_id)
 
 
+def private_repo_revisions(projects, git_dir='git'):
+    '''Returns {project: sha of HEAD} for the private projects checked out in git_dir
+  by download_private_repos, None if one of them isn't checked out.'''
+    revisions = {}
+    with open(os.devnull, 'w') as devnull:
+        for project_or_path in projects:
+            project = private_repo(project_or_path)[0]
+            try:
+                revisions[project] = subprocess.check_output(
+                    ['git', 'rev-parse', 'HEAD'], cwd=os.path.join(git_dir, project), stderr=devnull).strip()
+            except (subprocess.CalledProcessError, OSError):
+                return None
+    return revisions
+
+
 # SWAPAROOS
 # Swaparoos swap out package.json / Gemfile etc replacing references to private Github repos with local ones
 # They are language-specific and may work different ways
@@ -107,12 +172,15 @@ end
 '''
 
 
+GEMFILE_REPO_RE = re.compile('git@github.com:' + GIT_ACCOUNT +
+                             '/([^\'"\\r\\n]+)\\.git')
+
+
 @contextlib.contextmanager
 def gemfile_swaparoo():
     '''Ruby swaparoo -- swap out Gemfile for fixed one referencing repos in local git/ directory.
     You may need to modify your Dockerfile to add the 'git' before running bundle install'''
-    repo_re = re.compile('git@github.com:' + GIT_ACCOUNT +
-                         '/([^\'"\\r\\n]+)\\.git')
+    repo_re = GEMFILE_REPO_RE
 
     # Get original file
     with open('Gemfile', 'r') as f:
@@ -147,6 +215,10 @@ def gemfile_swaparoo():
             f.write(orig_gemfile_lock)
 
 
+def private_npm_dependency(version):
+    return ('git' in version or 'https' in version or 'ssh' in version) and GIT_ACCOUNT in version
+
+
 # Simply installs the modules into local node_modules; you must then not include that
 # in .dockerignore. This is not ideal and I want to rewrite it
 @contextlib.contextmanager
@@ -159,7 +231,7 @@ def packagejson_swaparoo():
 
     # Do the swaparoo
     for name, version in data['dependencies'].items():
-        if('git' in version or 'https' in version or 'ssh' in version) and 'seomoz' in version:
+        if private_npm_dependency(version):
             data['dependencies'].pop(name, None)
             print("Installing {} as a private dependency".format(name))
             os.system('npm install {}'.format(name))
@@ -182,16 +254,40 @@ def null_swaparoo():
     yield []
 
 
+def swaparoo_fetches_dependencies(docker_path):
+    '''Whether the swaparoo docker_build picks for docker_path downloads private gems
+    (at the branch the Gemfile names) or npm installs private modules.'''
+    package_json = os.path.join(docker_path, 'package.json')
+    gemfile = os.path.join(docker_path, 'Gemfile')
+    if os.path.isfile(package_json):
+        with open(package_json, 'r') as f:
+            dependencies = json.load(f).get('dependencies', {})
+        return any(private_npm_dependency(version) for version in dependencies.values())
+    if os.path.isfile(gemfile):
+        with open(gemfile, 'r') as f:
+            return GEMFILE_REPO_RE.search(f.read()) is not None
+    return False
+
+
 class Docker(object):
 
-    def docker_build(self, dockerUtilsObj, appObj, directory, repo, projects, path, image_tag, build_args, verbose_mode, docker_file='Dockerfile', disable_swaparoo = False):
-        '''run a `docker_build -t image_tag .` in the current directory, handling any private repos'''
+    def fetch_private_repos(self, appObj, directory, repo, projects):
+        '''Downloads the private projects into the checkout of repo, returns the
+        revisions checked out as {project: sha} (None if they can't be read).'''
+        sourcePath = "{0}/{1}/".format(directory, appObj.getRepoName(repo))
+        with chdir(sourcePath):
+            download_private_repos(projects)
+            return private_repo_revisions(projects)
+
+    def docker_build(self, dockerUtilsObj, appObj, directory, repo, projects, path, image_tag, build_args, verbose_mode, docker_file='Dockerfile', disable_swaparoo = False, labels=None, cache_from=None, fetch_projects=True):
+        '''run a `docker_build -t image_tag .` in the current directory, handling any private repos.
+        Pass fetch_projects=False if the private repos were already downloaded with fetch_private_repos.'''
         repo_name = appObj.getRepoName(repo)
         sourcePath = "{0}/{1}/".format(directory, repo_name)
         if os.path.isdir(sourcePath):
             os.chdir(sourcePath)
 
-        if projects != 'none':
+        if projects != 'none' and fetch_projects:
             download_private_repos(projects)
 
         os.chdir(sourcePath)
@@ -208,10 +304,10 @@ class Docker(object):
             else:
                 swaparoo = null_swaparoo
             with swaparoo():
-                dockerUtilsObj.docker_build(image_tag, docker_file, verbose_mode, build_args)
+                dockerUtilsObj.docker_build(image_tag, docker_file, verbose_mode, build_args, labels, cache_from)
         else:
             if verbose_mode: print("Skipping swaparoo functionality")
-            dockerUtilsObj.docker_build(image_tag, docker_file, verbose_mode, build_args)
+            dockerUtilsObj.docker_build(image_tag, docker_file, verbose_mode, build_args, labels, cache_from)
 
 if __name__ == "__main__":
     dockerObj = Docker()
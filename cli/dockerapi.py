@@ -0,0 +1,321 @@
+#!/usr/bin/python
+
+from __future__ import print_function
+import base64
+import json
+import os
+import re
+import socket
+import tarfile
+import tempfile
+import time
+import urllib
+from collections import namedtuple
+from cli.fingerprint import iter_context, read_dockerignore
+
+try:
+    import httplib
+except ImportError:
+    import http.client as httplib
+
+DEFAULT_DOCKER_HOST = 'unix:///var/run/docker.sock'
+
+# Registry of the images without a registry host in their name
+DOCKER_HUB = 'https://index.docker.io/v1/'
+
+# Step 3/7 : RUN make
+BUILD_STEP = re.compile(r'^Step (\d+)/\d+ : (.*)$')
+
+BuildResult = namedtuple('BuildResult', ['image_id', 'steps'])
+StepTiming = namedtuple('StepTiming', ['step', 'command', 'elapsed'])
+PushResult = namedtuple('PushResult', ['digest', 'layers'])
+LayerTiming = namedtuple('LayerTiming', ['layer', 'status', 'elapsed'])
+
+
+class DockerError(ValueError):
+    pass
+
+
+class UnixHTTPConnection(httplib.HTTPConnection):
+    '''HTTPConnection to a server listening on a unix socket.'''
+
+    def __init__(self, path, timeout=None):
+        httplib.HTTPConnection.__init__(self, 'localhost')
+        self.path = path
+        self.socket_timeout = timeout
+
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.socket_timeout)
+        sock.connect(self.path)
+        self.sock = sock
+
+
+def iter_chunks(response, chunk_size=4096):
+    '''Yields the body of response as it arrives. httplib's read(n) only returns
+    once n bytes arrived, so chunked responses are read one chunk at a time.'''
+    if getattr(response, 'chunked', False) and response.chunk_left is None:
+        while True:
+            size = int(response.fp.readline().split(b';')[0].strip() or b'0', 16)
+            if size == 0:
+                break
+            chunk = response.fp.read(size)
+            response.fp.readline()
+            yield chunk
+        return
+    while True:
+        chunk = response.read(chunk_size)
+        if not chunk:
+            break
+        yield chunk
+
+
+def iter_json_stream(response):
+    '''Yields the JSON objects of a streamed docker response as they arrive;
+    objects can be split across chunks or several can share one.'''
+    decoder = json.JSONDecoder()
+    buf = u''
+    try:
+        for chunk in iter_chunks(response):
+            buf += chunk.decode('utf-8')
+            while True:
+                buf = buf.lstrip()
+                if not buf:
+                    break
+                try:
+                    value, end = decoder.raw_decode(buf)
+                except ValueError:
+                    break
+                buf = buf[end:]
+                yield value
+    except (socket.error, httplib.HTTPException) as e:
+        raise DockerError("Lost the connection to docker: {}".format(e))
+    if buf.strip():
+        raise DockerError("Truncated response from docker: {}".format(buf.strip()[:200]))
+
+
+def split_image(image):
+    '''"example.com:5000/app/v0.1.0" > ("example.com:5000/app/v0.1.0", "latest")'''
+    name, _, tag = image.rpartition(':')
+    if not name or '/' in tag:
+        return image, 'latest'
+    return name, tag
+
+
+def registry_host(image):
+    '''"example.com:5000/app/v0.1.0" > "example.com:5000", DOCKER_HUB for "app/v0.1.0"'''
+    host, _, rest = image.partition('/')
+    if rest and ('.' in host or ':' in host or host == 'localhost'):
+        return host
+    return DOCKER_HUB
+
+
+def normalize_registry(registry):
+    '''"https://example.com:5000/v1/" > "example.com:5000", the way docker matches auths keys.'''
+    if registry == DOCKER_HUB:
+        return registry
+    return re.sub(r'^[a-z]+://', '', registry).split('/')[0]
+
+
+def get_docker_config_path():
+    return os.path.join(os.environ.get('DOCKER_CONFIG') or os.path.join(os.path.expanduser('~'), '.docker'),
+                        'config.json')
+
+
+def read_registry_auth(registry, config_path=None):
+    '''Returns the auth config docker expects in X-Registry-Auth for registry,
+    read from the "auths" of the docker config file (what `docker login` writes).
+    Registries without credentials get an empty one. Credentials kept by a
+    credential helper (credsStore or credHelpers) can't be read here: a
+    DockerError is raised, use the docker binary (ROGER_DOCKER_BACKEND=cli) to
+    push to those registries.'''
+    config_path = config_path if config_path is not None else get_docker_config_path()
+    try:
+        with open(config_path) as f:
+            config = json.load(f)
+    except IOError:
+        return {}
+    except ValueError as e:
+        raise DockerError("Unable to read the docker config {}: {}".format(config_path, e))
+    registry = normalize_registry(registry)
+    entry = None
+    for key, value in (config.get('auths') or {}).items():
+        if normalize_registry(key) == registry:
+            entry = value or {}
+            break
+    if entry and entry.get('identitytoken'):
+        return {'identitytoken': entry['identitytoken'], 'serveraddress': registry}
+    if entry and entry.get('auth'):
+        username, _, password = base64.b64decode(entry['auth']).decode('utf-8').partition(':')
+        return {'username': username, 'password': password, 'serveraddress': registry}
+    if entry and entry.get('username'):
+        return {'username': entry['username'], 'password': entry.get('password', ''), 'serveraddress': registry}
+    helpers = config.get('credHelpers') or {}
+    if any(normalize_registry(key) == registry for key in helpers) or (entry is not None and config.get('credsStore')):
+        raise DockerError("The credentials for {} are kept by a docker credential helper, which the docker api "
+                          "backend can't use; push with ROGER_DOCKER_BACKEND=cli instead.".format(registry))
+    return {}
+
+
+def write_context(context_dir, fileobj, dockerfile='Dockerfile'):
+    '''Writes the build context of context_dir, as docker would send it, to fileobj as a tar.'''
+    rules = read_dockerignore(context_dir)
+    tar = tarfile.open(fileobj=fileobj, mode='w')
+    try:
+        paths = set(iter_context(context_dir, rules))
+        # the Dockerfile and .dockerignore are always sent
+        for name in [dockerfile, '.dockerignore']:
+            if os.path.exists(os.path.join(context_dir, name)):
+                paths.add(name)
+        for path in sorted(paths):
+            tar.add(os.path.join(context_dir, path), arcname=path, recursive=False)
+    finally:
+        tar.close()
+
+
+class DockerClient(object):
+    '''Talks to the Docker Engine API on $DOCKER_HOST (unix:///var/run/docker.sock
+    by default, or tcp://host:port) instead of running the docker binary.
+
+    build() and push() read the daemon's JSON progress as it is streamed and
+    pass every event to on_event, so callers can print output and see which
+    build steps and layers take time. Closing the connection, e.g. on Ctrl-C,
+    cancels the operation on the daemon. timeout only applies to connecting
+    to the daemon: a build step or a layer upload can take any time.
+
+    push() authenticates to the registry with the credentials `docker login`
+    saved in the docker config file (see read_registry_auth).'''
+
+    def __init__(self, docker_host=None, timeout=None, docker_config=None):
+        self.docker_host = docker_host or os.environ.get('DOCKER_HOST') or DEFAULT_DOCKER_HOST
+        self.timeout = timeout
+        self.docker_config = docker_config
+
+    def connect(self):
+        if self.docker_host.startswith('unix://'):
+            return UnixHTTPConnection(self.docker_host[len('unix://'):], self.timeout)
+        if self.docker_host.startswith('tcp://'):
+            return httplib.HTTPConnection(self.docker_host[len('tcp://'):].rstrip('/'), timeout=self.timeout)
+        raise DockerError("Unsupported DOCKER_HOST: {}".format(self.docker_host))
+
+    def request(self, method, path, params=None, headers=None, body=None, body_length=None):
+        '''Sends the request, body being a file object sent in chunks. Returns the
+        connection (to be closed by the caller) and the response.'''
+        url = path
+        if params:
+            url = "{}?{}".format(path, urllib.urlencode(sorted(params.items())))
+        conn = self.connect()
+        try:
+            conn.connect()
+            # the timeout is for connecting, the responses are streamed as the daemon works
+            conn.sock.settimeout(None)
+            conn.putrequest(method, url)
+            for key, value in (headers or {}).items():
+                conn.putheader(key, value)
+            conn.putheader('Content-Length', str(body_length or 0))
+            conn.endheaders()
+            if body is not None:
+                for chunk in iter(lambda: body.read(1 << 16), b''):
+                    conn.send(chunk)
+            response = conn.getresponse()
+        except (socket.error, httplib.HTTPException) as e:
+            conn.close()
+            raise DockerError("{} {} failed, unable to talk to docker at {}: {}".format(
+                method, path, self.docker_host, e))
+        except:
+            conn.close()
+            raise
+        if response.status >= 400:
+            message = response.read()
+            conn.close()
+            try:
+                message = json.loads(message).get('message', message)
+            except ValueError:
+                pass
+            raise DockerError("{} {} failed with HTTP {}: {}".format(method, path, response.status, message))
+        return conn, response
+
+    def build(self, context_dir, tag, dockerfile='Dockerfile', build_args=None, labels=None,
+              cache_from=None, on_event=None):
+        '''Builds context_dir into an image tagged tag. Returns a BuildResult with
+        the time every Dockerfile step took; raises DockerError if the build fails.'''
+        params = {'t': tag, 'dockerfile': dockerfile, 'rm': '1'}
+        if build_args:
+            params['buildargs'] = json.dumps(build_args)
+        if labels:
+            params['labels'] = json.dumps(labels)
+        if cache_from:
+            params['cachefrom'] = json.dumps(list(cache_from))
+        with tempfile.TemporaryFile() as context:
+            write_context(context_dir, context, dockerfile)
+            length = context.tell()
+            context.seek(0)
+            conn, response = self.request('POST', '/build', params, {'Content-Type': 'application/x-tar'},
+                                          context, length)
+        image_id = None
+        steps = []
+        current = None
+        try:
+            for event in iter_json_stream(response):
+                if on_event is not None:
+                    on_event(event)
+                if 'error' in event:
+                    raise DockerError("docker build failed: {}".format(event['error'].strip()))
+                if 'aux' in event and 'ID' in event['aux']:
+                    image_id = event['aux']['ID']
+                match = BUILD_STEP.match(event.get('stream', '').strip())
+                if match:
+                    now = time.time()
+                    if current is not None:
+                        steps.append(StepTiming(current[0], current[1], now - current[2]))
+                    current = (int(match.group(1)), match.group(2), now)
+                success = re.match(r'^Successfully built (\w+)', event.get('stream', ''))
+                if success and image_id is None:
+                    image_id = success.group(1)
+        finally:
+            conn.close()
+        if current is not None:
+            steps.append(StepTiming(current[0], current[1], time.time() - current[2]))
+        return BuildResult(image_id, steps)
+
+    def tag(self, image, target):
+        '''Tags image as target; raises DockerError if the image doesn't exist.'''
+        name, tag = split_image(target)
+        conn, response = self.request('POST', '/images/{}/tag'.format(urllib.quote(image, safe='/:')),
+                                      {'repo': name, 'tag': tag})
+        try:
+            response.read()
+        finally:
+            conn.close()
+
+    def push(self, image, on_event=None):
+        '''Pushes image to its registry. Returns a PushResult with the time every
+        layer took to upload; raises DockerError if the push fails.'''
+        name, tag = split_image(image)
+        auth = read_registry_auth(registry_host(name), self.docker_config)
+        # the daemon requires the header even for registries that need no auth
+        headers = {'X-Registry-Auth': base64.urlsafe_b64encode(json.dumps(auth).encode('utf-8'))}
+        conn, response = self.request('POST', '/images/{}/push'.format(urllib.quote(name, safe='/:')),
+                                      {'tag': tag}, headers)
+        started = {}
+        layers = []
+        digest = None
+        try:
+            for event in iter_json_stream(response):
+                if on_event is not None:
+                    on_event(event)
+                if 'error' in event:
+                    raise DockerError("docker push failed: {}".format(event['error'].strip()))
+                if 'aux' in event and 'Digest' in event['aux']:
+                    digest = event['aux']['Digest']
+                layer = event.get('id')
+                status = event.get('status', '')
+                if not layer or layer == tag:
+                    continue
+                now = time.time()
+                started.setdefault(layer, now)
+                if status in ('Pushed', 'Layer already exists') or status.startswith('Mounted from'):
+                    layers.append(LayerTiming(layer, status, now - started[layer]))
+        finally:
+            conn.close()
+        return PushResult(digest, layers)
@@ -4,12 +4,29 @@ from __future__ import print_function
 import os
 import subprocess
 import sys
+import bisect
 import contextlib
-import requests
+import errno
+import hashlib
 import json
+import re
+import time
+import urllib
 from cli.utils import printException, printErrorMsg
+from cli.sessionpool import get_session_pool
+from cli.settings import Settings
 from termcolor import colored
-requests.packages.urllib3.disable_warnings()
+
+try:
+    from urlparse import urljoin
+except ImportError:
+    from urllib.parse import urljoin
+
+# Number of repositories asked for per catalog page
+CATALOG_PAGE_SIZE = 1000
+
+# Link: </v2/_catalog?last=name&n=1000>; rel="next"
+LINK_NEXT = re.compile(r'<([^>]*)>\s*;\s*rel="?next"?')
 
 
 @contextlib.contextmanager
@@ -23,13 +40,51 @@ def chdir(dirname):
         os.chdir(curdir)
 
 
+def write_json(path, value):
+    '''Writes value to path atomically, creating its directory if needed. Errors
+    are ignored, the files written with it are only caches.'''
+    try:
+        try:
+            os.makedirs(os.path.dirname(path))
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+        temp_path = "{}.{}.tmp".format(path, os.getpid())
+        with open(temp_path, 'w') as f:
+            json.dump(value, f)
+        os.rename(temp_path, path)
+    except (IOError, OSError):
+        pass
+
+
+def read_json(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (IOError, ValueError):
+        return None
+
+
 class DockerUtils:
 
-    def docker_build(self, image_tag, docker_file, verbose_mode, build_args):
+    def __init__(self, session_pool=None, cache_dir=None):
+        self.session_pool = session_pool if session_pool is not None else get_session_pool()
+        self.cache_dir = cache_dir if cache_dir is not None else os.path.join(Settings().getCacheDir(), 'registry')
+        self.docker_backend = Settings().getDockerBackend()
+
+    def docker_build(self, image_tag, docker_file, verbose_mode, build_args, labels=None, cache_from=None):
+        if self.docker_backend == 'api':
+            return self.docker_api_build(image_tag, docker_file, verbose_mode, build_args, labels, cache_from)
         build_arg_str = ""
         if build_args:
             for key, value in build_args.iteritems():
                 build_arg_str = build_arg_str + "--build-arg {}={} ".format(key, value)
+        if labels:
+            for key, value in sorted(labels.iteritems()):
+                build_arg_str = build_arg_str + "--label {}={} ".format(key, value)
+        if cache_from:
+            for image in cache_from:
+                build_arg_str = build_arg_str + "--cache-from {} ".format(image)
 
         redirect = " >/dev/null 2>&1"
         if verbose_mode:
@@ -43,33 +98,133 @@ class DockerUtils:
             raise ValueError("docker build failed")
 
     def docker_push(self, image, verbose_mode):
+        if self.docker_backend == 'api':
+            return self.docker_api_push(image, verbose_mode)
         redirect = " >/dev/null 2>&1"
         if verbose_mode:
             redirect = ""
         exit_code = os.system("docker push {} {}".format(image, redirect))
         return exit_code
 
+    def docker_tag(self, image, target, verbose_mode):
+        if self.docker_backend == 'api':
+            return self.docker_api_tag(image, target)
+        redirect = " >/dev/null 2>&1"
+        if verbose_mode:
+            redirect = ""
+        exit_code = os.system("docker tag {} {} {}".format(image, target, redirect))
+        return exit_code
+
+    def docker_client(self):
+        from cli.dockerapi import DockerClient
+        return DockerClient(timeout=Settings().getHttpTimeout())
+
+    def print_docker_event(self, event):
+        if 'stream' in event:
+            print(event['stream'], end='')
+        elif 'status' in event and not event.get('progressDetail'):
+            # upload progress bars are left out
+            print(' '.join(event[key] for key in ['id', 'status'] if event.get(key)))
+
+    def docker_api_build(self, image_tag, docker_file, verbose_mode, build_args, labels, cache_from):
+        on_event = self.print_docker_event if verbose_mode else None
+        result = self.docker_client().build('.', image_tag, os.path.relpath(docker_file), build_args, labels,
+                                            cache_from, on_event)
+        if verbose_mode:
+            for step in sorted(result.steps, key=lambda step: step.elapsed, reverse=True)[:5]:
+                print("Step {} took {:.1f}s: {}".format(step.step, step.elapsed, step.command))
+
+    def docker_api_push(self, image, verbose_mode):
+        on_event = self.print_docker_event if verbose_mode else None
+        try:
+            result = self.docker_client().push(image, on_event)
+        except (Exception) as e:
+            printException(e)
+            return 1
+        if verbose_mode:
+            for layer in result.layers:
+                print("Layer {} {} in {:.1f}s".format(layer.layer, layer.status.lower(), layer.elapsed))
+        return 0
+
+    def docker_api_tag(self, image, target):
+        try:
+            self.docker_client().tag(image, target)
+        except (Exception) as e:
+            printException(e)
+            return 1
+        return 0
+
+    def image_exists(self, registry, repository, tag='latest'):
+        '''Whether the registry still has the image, checked with a HEAD on its manifest.'''
+        url = 'http://{}/v2/{}/manifests/{}'.format(registry, repository, tag)
+        response = self.session_pool.request('HEAD', url, headers={
+            'Accept': 'application/vnd.docker.distribution.manifest.v2+json'})
+        if response.status_code == 404:
+            return False
+        response.raise_for_status()
+        return True
+
+    def image_labels(self, registry, repository, tag='latest'):
+        '''Returns the labels of an image in the registry, read from the config
+        blob its manifest points to. None if the registry doesn't have the image.'''
+        url = 'http://{}/v2/{}/manifests/{}'.format(registry, repository, tag)
+        response = self.session_pool.get(url, headers={
+            'Accept': 'application/vnd.docker.distribution.manifest.v2+json'})
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        digest = response.json()['config']['digest']
+        response = self.session_pool.get('http://{}/v2/{}/blobs/{}'.format(registry, repository, digest))
+        response.raise_for_status()
+        return response.json().get('config', {}).get('Labels') or {}
+
     def docker_search_v1(self, registry, name, application):
         result = subprocess.check_output("docker search {0}/{1}-{2}".format(
             registry, name, application), shell=True)
         return result
 
-    def docker_search_v2(self, registry):
-        url = 'http://{}/v2/_catalog?n=10000'.format(registry)
-        response = requests.get(url)
-        data = response.json()
-        tmp_repos_list = data['repositories']
-        result = ""
-        while(tmp_repos_list):
-            for item in tmp_repos_list:
-                result += item + '\n'
-            last_fetched_repo = tmp_repos_list[-1]
-            url = 'http://{}/v2/_catalog?n=10000&last={}'.format(registry, last_fetched_repo)
-            response = requests.get(url)
-            data = response.json()
-            tmp_repos_list = data['repositories']
+    def catalog_url(self, registry, last=None, page_size=CATALOG_PAGE_SIZE):
+        url = 'http://{}/v2/_catalog?n={}'.format(registry, page_size)
+        if last:
+            url = '{}&last={}'.format(url, urllib.quote(last, safe=''))
+        return url
 
-        return result
+    def get_catalog_page(self, url):
+        '''Returns (repositories, next page url or None) for a catalog page. Pages that
+        come with an ETag are kept under the cache dir and revalidated with If-None-Match.'''
+        cache_path = os.path.join(self.cache_dir, "{}.json".format(hashlib.sha1(url).hexdigest()))
+        cached = read_json(cache_path)
+        headers = {}
+        if cached is not None:
+            headers['If-None-Match'] = cached['etag']
+        response = self.session_pool.get(url, headers=headers)
+        if response.status_code == 304 and cached is not None:
+            return cached['repositories'], cached['next']
+        response.raise_for_status()
+        repositories = response.json().get('repositories') or []
+        match = LINK_NEXT.search(response.headers.get('Link', ''))
+        next_url = urljoin(url, match.group(1)) if match else None
+        etag = response.headers.get('ETag')
+        if etag:
+            write_json(cache_path, {'etag': etag, 'repositories': repositories, 'next': next_url})
+        return repositories, next_url
+
+    def iter_catalog(self, registry, last=None, page_size=CATALOG_PAGE_SIZE):
+        '''Yields the names of the repositories in the registry in lexical order,
+        starting after last, fetching one page at a time as they are consumed. Stop
+        iterating to stop fetching.'''
+        url = self.catalog_url(registry, last, page_size)
+        while url:
+            repositories, next_url = self.get_catalog_page(url)
+            for repository in repositories:
+                yield repository
+            if next_url is None and len(repositories) >= page_size:
+                # registries that don't send Link headers
+                next_url = self.catalog_url(registry, repositories[-1], page_size)
+            url = next_url
+
+    def docker_search_v2(self, registry):
+        return ''.join(repository + '\n' for repository in CatalogSnapshot(registry, self).refresh())
 
     def docker_search(self, registry, name, application):
         result = ""
@@ -81,3 +236,55 @@ class DockerUtils:
             print(colored("Attempting docker v1 search", "yellow"))
             result = self.docker_search_v1(registry, name, application)
         return result
+
+
+class CatalogSnapshot(object):
+    '''A sorted copy of a registry's catalog kept under the cache dir, so that
+    listing the catalog doesn't crawl every page again, even from registries
+    that send no ETag (like the stock v2 registry).
+
+    refresh() only asks the registry for the repositories that sort after the
+    last one in the snapshot (last=<name>). That picks up new repositories with
+    a name past the end of the snapshot; to also see new names in the middle of
+    the catalog the whole catalog is crawled again once the snapshot is older
+    than ttl seconds (ROGER_CATALOG_SNAPSHOT_TTL), or with refresh(full=True).'''
+
+    def __init__(self, registry, dockerUtils=None, path=None, ttl=None):
+        self.registry = registry
+        self.dockerUtils = dockerUtils if dockerUtils is not None else DockerUtils()
+        self.path = path if path is not None else os.path.join(
+            self.dockerUtils.cache_dir, "{}-catalog.json".format(re.sub(r'[^A-Za-z0-9_.-]', '_', registry)))
+        self.ttl = ttl if ttl is not None else Settings().getCatalogSnapshotTtl()
+        self.snapshot = None
+
+    def load(self):
+        if self.snapshot is None:
+            self.snapshot = read_json(self.path) or {'crawled_at': None, 'repositories': []}
+        return self.snapshot
+
+    def is_fresh(self):
+        crawled_at = self.load()['crawled_at']
+        return crawled_at is not None and 0 <= time.time() - crawled_at < self.ttl
+
+    def refresh(self, full=False):
+        '''Brings the snapshot up to date and returns its repositories.'''
+        if full or not self.is_fresh():
+            crawled_at = time.time()
+            repositories = list(self.dockerUtils.iter_catalog(self.registry))
+        else:
+            crawled_at = self.load()['crawled_at']
+            repositories = list(self.load()['repositories'])
+            last = repositories[-1] if repositories else None
+            repositories.extend(self.dockerUtils.iter_catalog(self.registry, last=last))
+        self.snapshot = {'crawled_at': crawled_at, 'repositories': repositories}
+        write_json(self.path, self.snapshot)
+        return repositories
+
+    def search(self, prefix):
+        '''Returns the repositories in the snapshot whose name starts with prefix.'''
+        repositories = self.load()['repositories']
+        start = bisect.bisect_left(repositories, prefix)
+        end = start
+        while end < len(repositories) and repositories[end].startswith(prefix):
+            end += 1
+        return repositories[start:end]
@@ -0,0 +1,147 @@
+#!/usr/bin/python
+
+from __future__ import print_function
+import hashlib
+import os
+import re
+import stat
+
+# Bump when the way fingerprints are computed changes
+FINGERPRINT_VERSION = 1
+
+# Label the fingerprint is recorded under in the built image
+FINGERPRINT_LABEL = 'roger.build.fingerprint'
+
+# Label the tag name the image was pushed as is recorded under
+TAG_LABEL = 'roger.build.tag'
+
+# Marker download_private_repos leaves in the git/ dir it clones private projects into
+PRIVATE_REPOS_MARKER = '.roger_docker_build_update_id'
+
+
+def compile_pattern(pattern):
+    '''Translates a .dockerignore pattern to a regex: "*" and "?" don't match
+    "/", "**" matches any number of directories.'''
+    regex = ''
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith('**/', i):
+            regex += '(?:.*/)?'
+            i += 3
+        elif pattern.startswith('**', i):
+            regex += '.*'
+            i += 2
+        elif pattern[i] == '*':
+            regex += '[^/]*'
+            i += 1
+        elif pattern[i] == '?':
+            regex += '[^/]'
+            i += 1
+        elif pattern[i] == '[' and ']' in pattern[i + 1:]:
+            end = pattern.index(']', i + 1)
+            regex += pattern[i:end + 1].replace('[!', '[^')
+            i = end + 1
+        else:
+            regex += re.escape(pattern[i])
+            i += 1
+    return re.compile('^{}$'.format(regex))
+
+
+def read_dockerignore(context_dir):
+    '''Returns the rules of the .dockerignore of context_dir as (exception, regex) tuples.'''
+    rules = []
+    try:
+        with open(os.path.join(context_dir, '.dockerignore')) as f:
+            lines = f.read().splitlines()
+    except IOError:
+        return rules
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        exception = line.startswith('!')
+        pattern = os.path.normpath(line.lstrip('!').strip()).lstrip('/')
+        rules.append((exception, compile_pattern(pattern)))
+    return rules
+
+
+def is_ignored(path, rules):
+    '''Whether docker leaves path (relative to the context) out of the build
+    context: the last rule matching the path, or one of its parent dirs, wins.'''
+    parts = path.split('/')
+    candidates = ['/'.join(parts[:i]) for i in range(1, len(parts) + 1)]
+    ignored = False
+    for exception, regex in rules:
+        if any(regex.match(candidate) for candidate in candidates):
+            ignored = not exception
+    return ignored
+
+
+def hash_file(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def iter_context(context_dir, rules, skip_repos=False):
+    '''Yields the paths, relative to context_dir, of the files docker sends as
+    the build context, in sorted order. With skip_repos, .git and the private
+    projects cloned by download_private_repos are left out.'''
+    can_prune = not any(exception for exception, regex in rules)
+    for root, dirs, files in os.walk(context_dir):
+        relroot = os.path.relpath(root, context_dir)
+        relroot = '' if relroot == '.' else relroot + '/'
+        kept = []
+        for name in sorted(dirs):
+            path = relroot + name
+            if skip_repos and name == '.git':
+                continue
+            if skip_repos and path == 'git' and os.path.exists(os.path.join(root, name, PRIVATE_REPOS_MARKER)):
+                continue
+            if os.path.islink(os.path.join(root, name)):
+                files.append(name)
+            elif not (can_prune and is_ignored(path, rules)):
+                kept.append(name)
+        dirs[:] = kept
+        for name in sorted(files):
+            path = relroot + name
+            if not is_ignored(path, rules):
+                yield path
+
+
+def build_fingerprint(context_dir, build_filename, build_args, project_shas):
+    '''Returns a sha1 of everything that goes into a docker build: the files
+    of the build context (respecting .dockerignore), the Dockerfile, the build
+    args and the revisions of the private projects (a {project: sha} dict).'''
+    digest = hashlib.sha1()
+    digest.update("version {}\n".format(FINGERPRINT_VERSION))
+    rules = read_dockerignore(context_dir)
+    # the revisions of .git and of the private projects are part of the fingerprint instead
+    paths = set(iter_context(context_dir, rules, skip_repos=True))
+    build_file = os.path.relpath(os.path.join(context_dir, build_filename), context_dir)
+    if os.path.exists(os.path.join(context_dir, build_file)):
+        # the Dockerfile is always sent, even if .dockerignore lists it
+        paths.add(build_file)
+    digest.update("build file {}\n".format(build_file))
+    for path in sorted(paths):
+        full_path = os.path.join(context_dir, path)
+        mode = os.lstat(full_path).st_mode
+        if stat.S_ISLNK(mode):
+            digest.update("link {} {}\n".format(path, os.readlink(full_path)))
+        else:
+            digest.update("file {} {} {}\n".format(path, oct(mode & 0o777), hash_file(full_path)))
+    for key, value in sorted((build_args or {}).items()):
+        digest.update("arg {}={}\n".format(key, value))
+    for project, sha in sorted((project_shas or {}).items()):
+        digest.update("project {} {}\n".format(project, sha))
+    return digest.hexdigest()
+
+
+
+def fingerprint_repository(image_prefix):
+    '''Returns the repository that, for every image of the app pushed with a
+    fingerprint, has a tag named after the fingerprint (see RogerBuild.pushFingerprint).
+    It has no /v<version> so the version resolver leaves it out.'''
+    return "{}-fingerprints".format(image_prefix)
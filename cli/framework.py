@@ -3,10 +3,10 @@
 from __future__ import print_function
 import os
 import sys
-import yaml
 
-from jinja2 import Environment, FileSystemLoader
 from cli.settings import Settings
+from cli.appconfig import AppConfig
+from cli.templates import get_environment
 from abc import ABCMeta, abstractmethod
 
 settings = Settings()
@@ -37,10 +37,42 @@ class Framework(object):
             key = "name"
         dir_name = os.path.dirname(template_file)
         file_name = os.path.basename(template_file)
-        env = Environment(loader=FileSystemLoader(dir_name))
+        env = get_environment(dir_name)
         template = env.get_template(file_name)
+        import yaml
         return yaml.safe_load(str(template.module))[key]
 
+    def get_image_names(self, username, password, env, app_ids, config_dir, config_file,
+                        app_config_object=AppConfig()):
+        """
+        returns {app id: image name} for all of app_ids; frameworks that can
+        list their apps in one request override this, the others ask for
+        every app in turn
+
+        :params:
+        :app_ids [list]: ids (Marathon) or names (Chronos) of the apps
+        other params as for get_image_name
+        """
+        images = {}
+        for app_id in app_ids:
+            images[app_id] = self.get_image_name(username, password, env, app_id, config_dir, config_file,
+                                                 app_config_object)
+        return images
+
+    def getDeployment(self, resp, file_path):
+        """
+        returns (deployment id, ids of the apps it changes) for the response to a put,
+        None for frameworks that apply changes right away
+        """
+        return None
+
+    def waitForDeployments(self, environmentObj, environment, deployments, timeout):
+        """
+        waits for the deployments, a list of (name, deployment id, app ids) tuples, to
+        finish and returns a cli.deploymentwatcher.DeploymentResult for each of them
+        """
+        return []
+
     @abstractmethod
     def getName(self):
         pass
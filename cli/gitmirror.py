@@ -0,0 +1,97 @@
+#!/usr/bin/python
+
+from __future__ import print_function
+import contextlib
+import errno
+import fcntl
+import hashlib
+import os
+import re
+import shutil
+import subprocess
+from cli.settings import Settings
+
+
+@contextlib.contextmanager
+def locked(path):
+    '''Holds an exclusive lock on path (created if needed) so that concurrent
+    deploys don't update the same mirror at the same time.'''
+    with open(path, 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def get_clone_dir_name(repo_url):
+    '''Name of the dir `git clone <repo_url>` checks out into.'''
+    name = os.path.basename(repo_url.rstrip('/').split(':')[-1])
+    return name[:-len('.git')] if name.endswith('.git') else name
+
+
+class GitMirror(object):
+    '''Bare mirrors of the application repositories kept under mirror_dir
+    (defaults to $ROGER_GIT_MIRROR_DIR), one per repository url.
+
+    The first checkout of a repository clones it with --mirror, later ones
+    only fetch what changed since. Work dirs are then cloned from the mirror
+    with --shared, which doesn't copy any objects, and their origin is pointed
+    back at the repository url so that git pull keeps working as before.'''
+
+    def __init__(self, mirror_dir=None):
+        self.mirror_dir = mirror_dir if mirror_dir is not None else Settings().getGitMirrorDir()
+
+    def isEnabled(self):
+        return self.mirror_dir is not None
+
+    def getPath(self, repo_url):
+        name = re.sub(r'[^A-Za-z0-9_.-]', '_', get_clone_dir_name(repo_url))
+        return os.path.join(self.mirror_dir, "{}-{}.git".format(name, hashlib.sha1(repo_url).hexdigest()[:12]))
+
+    def run(self, command, verbose, cwd=None, log=None):
+        if log is not None:
+            return subprocess.call(command, cwd=cwd, stdout=log, stderr=subprocess.STDOUT)
+        if verbose:
+            return subprocess.call(command, cwd=cwd)
+        with open(os.devnull, 'w') as devnull:
+            return subprocess.call(command, cwd=cwd, stdout=devnull, stderr=devnull)
+
+    def update(self, repo_url, verbose=False, log=None):
+        '''Creates or fetches the mirror of repo_url. Returns the exit code of git.
+        The output of git goes to the log file if one is given.'''
+        try:
+            os.makedirs(self.mirror_dir)
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+        path = self.getPath(repo_url)
+        with locked(path + '.lock'):
+            if os.path.isdir(path):
+                return self.run(['git', '--git-dir', path, 'fetch', '--prune', 'origin'], verbose, log=log)
+            temp_path = path + '.tmp'
+            if os.path.isdir(temp_path):
+                shutil.rmtree(temp_path)
+            exit_code = self.run(['git', 'clone', '--mirror', repo_url, temp_path], verbose, log=log)
+            if exit_code != 0:
+                return exit_code
+            # work dirs borrow objects from the mirror, they must never be pruned
+            exit_code = self.run(['git', '--git-dir', temp_path, 'config', 'gc.pruneExpire', 'never'], verbose, log=log)
+            if exit_code == 0:
+                os.rename(temp_path, path)
+            return exit_code
+
+    def checkout(self, repo_url, branch, target_dir, verbose=False, log=None):
+        '''Updates the mirror of repo_url and clones branch (the default branch if
+        None) from it into target_dir. Returns the exit code of git.'''
+        exit_code = self.update(repo_url, verbose, log)
+        if exit_code != 0:
+            return exit_code
+        command = ['git', 'clone', '--shared']
+        if branch:
+            command.extend(['--branch', branch])
+        command.extend([self.getPath(repo_url), target_dir])
+        exit_code = self.run(command, verbose, log=log)
+        if exit_code != 0:
+            return exit_code
+        return self.run(['git', 'remote', 'set-url', 'origin', repo_url], verbose, cwd=target_dir, log=log)
@@ -0,0 +1,70 @@
+#!/usr/bin/python
+
+from __future__ import print_function
+import os
+import re
+import subprocess
+import time
+from cli.dockerutils import read_json, write_json
+from cli.gitmirror import GitMirror
+from cli.settings import Settings
+
+SHA = re.compile(r'^[0-9a-f]{40}$')
+
+
+def parse_ls_remote(output, branch):
+    '''Picks the sha of branch (or of the commit tagged branch) out of the
+    output of `git ls-remote`.'''
+    refs = {}
+    for line in output.splitlines():
+        sha, _, ref = line.strip().partition('\t')
+        refs[ref] = sha
+    for ref in ['refs/heads/{}'.format(branch), 'refs/tags/{}^{{}}'.format(branch),
+                'refs/tags/{}'.format(branch), branch]:
+        if ref in refs:
+            return refs[ref]
+    return None
+
+
+class GitShaResolver(object):
+    '''Resolves the sha a branch of a repository points to without checking it out.
+
+    The repository is asked with `git ls-remote`, which only transfers the list
+    of refs; if it can't be reached the local mirror (see GitMirror) is used
+    instead. Answers are cached for ttl seconds (defaults to $ROGER_GIT_SHA_TTL)
+    so that the apps of one deploy don't all query the same repository.'''
+
+    def __init__(self, mirror=None, ttl=None, cache_dir=None):
+        settings = Settings()
+        self.mirror = mirror if mirror is not None else GitMirror()
+        self.ttl = ttl if ttl is not None else settings.getGitShaTtl()
+        cache_dir = cache_dir if cache_dir is not None else os.path.join(settings.getCacheDir(), 'git')
+        self.cache_path = os.path.join(cache_dir, 'shas.json')
+
+    def lsRemote(self, remote, branch):
+        with open(os.devnull, 'w') as devnull:
+            proc = subprocess.Popen(['git', 'ls-remote', remote, branch],
+                                    stdout=subprocess.PIPE, stderr=devnull)
+            output = proc.communicate()[0]
+        if proc.returncode != 0:
+            return None
+        return parse_ls_remote(output, branch)
+
+    def resolve(self, repo_url, branch):
+        '''Returns the sha branch points to in repo_url, None if it can't be resolved.'''
+        if SHA.match(branch):
+            return branch
+        key = "{}#{}".format(repo_url, branch)
+        cache = read_json(self.cache_path) or {}
+        if key in cache:
+            sha, resolved_at = cache[key]
+            if 0 <= time.time() - resolved_at < self.ttl:
+                return sha
+        sha = self.lsRemote(repo_url, branch)
+        if sha is None and self.mirror.isEnabled() and os.path.isdir(self.mirror.getPath(repo_url)):
+            sha = self.lsRemote(self.mirror.getPath(repo_url), branch)
+        if sha is not None:
+            cache = read_json(self.cache_path) or {}
+            cache[key] = [sha, time.time()]
+            write_json(self.cache_path, cache)
+        return sha
@@ -0,0 +1,121 @@
+#!/usr/bin/python
+
+from __future__ import print_function
+import errno
+import hashlib
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+from cli.gitmirror import get_clone_dir_name, locked
+from cli.gitresolver import GitShaResolver
+from cli.settings import Settings
+
+# checkouts kept per repository, the least recently used are removed first
+MAX_CACHED_CHECKOUTS = 5
+
+
+def sparse_patterns(paths):
+    '''Patterns of .git/info/sparse-checkout matching the files or dirs at paths,
+    relative to the root of the repository.'''
+    return ["/{}".format(path.strip('/')) for path in paths if path.strip('/')]
+
+
+class SparseCheckout(object):
+    '''Checks out only some paths of a repository, e.g. the templates of an app.
+
+    The branch is fetched with --depth 1 and --filter=blob:none, so neither the
+    history nor the files outside of paths are downloaded (servers that don't
+    support filters send the files of the last commit only). Checkouts are
+    cached under cache_dir by commit and paths: when the branch still points
+    to a commit that was checked out before, git isn't run at all.'''
+
+    def __init__(self, cache_dir=None, resolver=None):
+        cache_dir = cache_dir if cache_dir is not None else os.path.join(Settings().getCacheDir(), 'git')
+        self.cache_dir = os.path.join(cache_dir, 'sparse')
+        self.resolver = resolver if resolver is not None else GitShaResolver()
+
+    def getRepoDir(self, repo_url):
+        name = re.sub(r'[^A-Za-z0-9_.-]', '_', get_clone_dir_name(repo_url))
+        return os.path.join(self.cache_dir, "{}-{}".format(name, hashlib.sha1(repo_url).hexdigest()[:12]))
+
+    def getCachePath(self, repo_url, commit, paths):
+        key = hashlib.sha1('\n'.join(sorted(sparse_patterns(paths)))).hexdigest()[:12]
+        return os.path.join(self.getRepoDir(repo_url), "{}-{}".format(commit, key))
+
+    def run(self, command, verbose, cwd=None):
+        if verbose:
+            return subprocess.call(command, cwd=cwd)
+        with open(os.devnull, 'w') as devnull:
+            return subprocess.call(command, cwd=cwd, stdout=devnull, stderr=devnull)
+
+    def fetch(self, repo_url, ref, paths, work_dir, verbose=False):
+        '''Checks out paths of ref (a branch, tag or HEAD) into work_dir, a new
+        repository. Returns the commit checked out.
+
+        Raises subprocess.CalledProcessError if git fails.'''
+        def git(*args):
+            command = ['git'] + list(args)
+            exit_code = self.run(command, verbose, cwd=work_dir)
+            if exit_code != 0:
+                raise subprocess.CalledProcessError(exit_code, ' '.join(command))
+
+        git('init', '-q')
+        git('remote', 'add', 'origin', repo_url)
+        git('config', 'core.sparseCheckout', 'true')
+        with open(os.path.join(work_dir, '.git', 'info', 'sparse-checkout'), 'w') as f:
+            f.write('\n'.join(sparse_patterns(paths)) + '\n')
+        try:
+            git('fetch', '-q', '--depth', '1', '--filter=blob:none', 'origin', ref)
+        except subprocess.CalledProcessError:
+            # git before 2.19 doesn't know --filter
+            git('fetch', '-q', '--depth', '1', 'origin', ref)
+        git('checkout', '-q', 'FETCH_HEAD')
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=work_dir).strip()
+
+    def checkout(self, repo_url, branch, paths, target_dir, verbose=False):
+        '''Copies paths of branch (the default branch if None) of repo_url into
+        target_dir, which must not exist yet. Returns the commit checked out.'''
+        ref = branch or 'HEAD'
+        commit = self.resolver.resolve(repo_url, ref)
+        if commit is not None:
+            cache_path = self.getCachePath(repo_url, commit, paths)
+            if os.path.isdir(cache_path):
+                return self.copy(cache_path, target_dir, commit)
+        repo_dir = self.getRepoDir(repo_url)
+        try:
+            os.makedirs(repo_dir)
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+        with locked(repo_dir + '.lock'):
+            if commit is not None and os.path.isdir(self.getCachePath(repo_url, commit, paths)):
+                # checked out by another deploy while we were waiting
+                return self.copy(self.getCachePath(repo_url, commit, paths), target_dir, commit)
+            work_dir = tempfile.mkdtemp(dir=repo_dir, prefix='.tmp-')
+            try:
+                commit = self.fetch(repo_url, ref, paths, work_dir, verbose)
+                shutil.rmtree(os.path.join(work_dir, '.git'))
+                cache_path = self.getCachePath(repo_url, commit, paths)
+                if os.path.isdir(cache_path):
+                    shutil.rmtree(work_dir)
+                else:
+                    os.rename(work_dir, cache_path)
+            except:
+                shutil.rmtree(work_dir, ignore_errors=True)
+                raise
+            self.prune(repo_dir)
+        return self.copy(cache_path, target_dir, commit)
+
+    def copy(self, cache_path, target_dir, commit):
+        # marks the checkout as recently used
+        os.utime(cache_path, None)
+        shutil.copytree(cache_path, target_dir, symlinks=True)
+        return commit
+
+    def prune(self, repo_dir, keep=MAX_CACHED_CHECKOUTS):
+        checkouts = [os.path.join(repo_dir, name) for name in os.listdir(repo_dir) if not name.startswith('.')]
+        checkouts.sort(key=os.path.getmtime, reverse=True)
+        for path in checkouts[keep:]:
+            shutil.rmtree(path, ignore_errors=True)
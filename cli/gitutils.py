@@ -5,6 +5,8 @@ import os
 import subprocess
 import sys
 from cli.appconfig import AppConfig
+from cli.gitmirror import GitMirror, get_clone_dir_name
+from cli.gitresolver import GitShaResolver
 import contextlib
 
 
@@ -35,6 +37,11 @@ class GitUtils:
         except (ValueError) as e:
             print("The folowing error occurred.(Error: %s).\n" %
                   e, file=sys.stderr)
+        mirror = GitMirror()
+        if mirror.isEnabled():
+            # a local clone of the mirror is as cheap as a shallow clone and
+            # keeps the full history for later fetches
+            return mirror.checkout(repo_url, branch, get_clone_dir_name(repo_url), verbose)
         redirect = " >/dev/null 2>&1"
         if verbose:
             redirect = ""
@@ -49,6 +56,9 @@ class GitUtils:
         except (ValueError) as e:
             print("The folowing error occurred.(Error: %s).\n" %
                   e, file=sys.stderr)
+        mirror = GitMirror()
+        if mirror.isEnabled():
+            return mirror.checkout(repo_url, branch, get_clone_dir_name(repo_url), True)
         exit_code = os.system(
             "git clone --branch {} {}".format(branch, repo_url))
         return exit_code
@@ -56,7 +66,11 @@ class GitUtils:
     def getGitSha(self, repo, branch, work_dir):
         appObj = AppConfig()
         repo_name = appObj.getRepoName(repo)
-        with chdir("{0}/{1}".format(work_dir, repo_name)):
+        checkout_dir = "{0}/{1}".format(work_dir, repo_name)
+        if not os.path.isdir(checkout_dir):
+            # nothing checked out (e.g. deploys with --skip-build), ask the remote
+            return GitShaResolver().resolve(appObj.getRepoUrl(repo), branch)
+        with chdir(checkout_dir):
             proc = subprocess.Popen(
                 ["git rev-parse origin/{} --verify HEAD".format(branch)],
                 stdout=subprocess.PIPE, shell=True)
@@ -0,0 +1,86 @@
+#!/usr/bin/python
+
+from __future__ import print_function
+import cPickle as pickle
+import errno
+import hashlib
+import json
+import os
+import tempfile
+from cli.settings import Settings
+
+# Bump this when the format of the cached entries changes
+CACHE_VERSION = 1
+YAML_EXTENSIONS = ('.yml', '.yaml', '.config')
+
+
+def is_yaml(path):
+    return path.lower().endswith(YAML_EXTENSIONS)
+
+
+def parse(content, yaml_format):
+    if yaml_format:
+        import yaml
+        try:
+            # libyaml bindings, several times faster than the pure python parser
+            from yaml import CSafeLoader as SafeLoader
+        except ImportError:
+            from yaml import SafeLoader
+        return yaml.load(content, Loader=SafeLoader)
+    return json.loads(content)
+
+
+def get_cache_path(content, yaml_format):
+    digest = hashlib.sha1(content).hexdigest()
+    name = "{}-{}-{}.pickle".format(digest, 'yaml' if yaml_format else 'json', CACHE_VERSION)
+    return os.path.join(Settings().getCacheDir(), 'parsed', name)
+
+
+def read_cache(cache_path):
+    try:
+        with open(cache_path, 'rb') as f:
+            return True, pickle.load(f)
+    except IOError:
+        return False, None
+    except Exception:
+        # truncated or otherwise unreadable entry, parse the file again
+        return False, None
+
+
+def write_cache(cache_path, value):
+    cache_dir = os.path.dirname(cache_path)
+    try:
+        try:
+            os.makedirs(cache_dir)
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+        fd, temp_path = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(value, f, pickle.HIGHEST_PROTOCOL)
+        # rename is atomic, concurrent readers never see a partial entry
+        os.rename(temp_path, cache_path)
+    except (IOError, OSError):
+        # the cache is only an optimization
+        pass
+
+
+def load(path, cache=True):
+    '''Parses the YAML (.yml, .yaml or .config) or JSON file at path.
+
+    When cache is True the parsed value is also pickled under
+    $ROGER_CACHE_DIR/parsed, keyed by a hash of the file's contents, and
+    later loads of the same contents are read from there instead of being
+    parsed again. Pass cache=False for files that shouldn't be copied to
+    disk, such as secrets.'''
+    with open(path, 'rb') as f:
+        content = f.read()
+    yaml_format = is_yaml(path)
+    if not cache:
+        return parse(content, yaml_format)
+    cache_path = get_cache_path(content, yaml_format)
+    found, value = read_cache(cache_path)
+    if not found:
+        value = parse(content, yaml_format)
+        write_cache(cache_path, value)
+    return value
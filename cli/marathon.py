@@ -3,11 +3,10 @@
 from __future__ import print_function
 import os
 import sys
-import requests
 import json
-import yaml
 import re
-from jinja2 import Environment, FileSystemLoader
+import urllib
+from collections import namedtuple
 from termcolor import colored
 from cli.framework import Framework
 from cli.utils import Utils
@@ -15,20 +14,38 @@ from cli.settings import Settings
 from cli.marathonvalidator import MarathonValidator
 from cli.proxyparser import ProxyParser
 from cli.appconfig import AppConfig
+from cli.sessionpool import get_session_pool
 from distutils.version import LooseVersion
-requests.packages.urllib3.disable_warnings()
 
 utils = Utils()
 settings = Settings()
 
+TaskSummary = namedtuple('TaskSummary', ['task_id', 'host', 'ports', 'started_at'])
+AppSummary = namedtuple('AppSummary', ['app_id', 'env', 'tasks'])
+
+
+def get_instance_details(summaries):
+    '''Returns {task id: (app id, host, ports, started at)} of the running tasks of summaries.'''
+    instance_details = {}
+    for app in summaries:
+        for task in app.tasks:
+            instance_details[task.task_id] = (app.app_id, task.host, task.ports, task.started_at)
+    return instance_details
+
+
+def get_app_envs(summaries):
+    '''Returns {app id: env} of the apps of summaries that have an env.'''
+    return dict((app.app_id, app.env) for app in summaries if app.env)
+
 
 class Marathon(Framework):
 
-    def __init__(self):
+    def __init__(self, session_pool=None):
         self.user = None
         self.passw = None
+        self.session_pool = session_pool if session_pool is not None else get_session_pool()
         self.marathonvalidator = MarathonValidator()
-        self.proxyparser = ProxyParser()
+        self.proxyparser = ProxyParser(self.session_pool)
 
     def getName(self):
         return "Marathon"
@@ -37,7 +54,7 @@ class Marathon(Framework):
         url = roger_env['environments'][environment][
             'marathon_endpoint'] + "/v2/apps"
         self.fetchUserPass(environment)
-        resp = requests.get(url, auth=(self.user, self.passw))
+        resp = self.session_pool.get(url, auth=(self.user, self.passw))
         color = "green"
         if re.compile("[45]\d{2}").match(str(resp.status_code)):
             color = "red"
@@ -53,17 +70,17 @@ class Marathon(Framework):
         resp = ""
         if 'groups' in data:
             if not act_as_user:
-                resp = requests.put("{}/v2/groups/{}".format(environmentObj['marathon_endpoint'], appName),
-                                    data=data,
-                                    headers={'Content-type': 'application/json'},
-                                    auth=(self.user, self.passw),
-                                    allow_redirects=True)
+                resp = self.session_pool.put("{}/v2/groups/{}".format(environmentObj['marathon_endpoint'], appName),
+                                             data=data,
+                                             headers={'Content-type': 'application/json'},
+                                             auth=(self.user, self.passw),
+                                             allow_redirects=True)
             else:
-                resp = requests.put("{}/v2/groups/{}".format(environmentObj['marathon_endpoint'], appName),
-                                    data=data,
-                                    headers={'Content-type': 'application/json', 'act-as-user': act_as_user},
-                                    auth=(self.user, self.passw),
-                                    allow_redirects=True)
+                resp = self.session_pool.put("{}/v2/groups/{}".format(environmentObj['marathon_endpoint'], appName),
+                                             data=data,
+                                             headers={'Content-type': 'application/json', 'act-as-user': act_as_user},
+                                             auth=(self.user, self.passw),
+                                             allow_redirects=True)
 
             print(colored("curl -X PUT -H 'Content-type: application/json' --data-binary @{} {}/v2/groups/{}".format(
                 file_path, environmentObj['marathon_endpoint'], appName), "cyan"))
@@ -75,15 +92,15 @@ class Marathon(Framework):
             endpoint = environmentObj['marathon_endpoint']
             deploy_url = "{}/v2/apps/{}".format(endpoint, appName)
             if not act_as_user:
-                resp = requests.put(deploy_url, data=data, headers={
-                                    'Content-type': 'application/json'},
-                                    auth=(self.user, self.passw),
-                                    allow_redirects=True)
+                resp = self.session_pool.put(deploy_url, data=data, headers={
+                                             'Content-type': 'application/json'},
+                                             auth=(self.user, self.passw),
+                                             allow_redirects=True)
             else:
-                resp = requests.put(deploy_url, data=data,
-                                    headers={'Content-type': 'application/json', 'act-as-user': act_as_user},
-                                    auth=(self.user, self.passw),
-                                    allow_redirects=True)
+                resp = self.session_pool.put(deploy_url, data=data,
+                                             headers={'Content-type': 'application/json', 'act-as-user': act_as_user},
+                                             auth=(self.user, self.passw),
+                                             allow_redirects=True)
             print(colored("curl -X PUT -H 'Content-type: application/json' --data-binary @{} {}/v2/apps/{}".format(
                 file_path, environmentObj['marathon_endpoint'], appName), "yellow"))
             color = "green"
@@ -94,6 +111,46 @@ class Marathon(Framework):
         task_id_list = utils.generate_task_id_list(data)
         return resp, task_id_list
 
+    def getAppIds(self, data, parent_id='/'):
+        '''Returns the ids of the apps of an app or group definition.'''
+        app_id = data['id']
+        if not app_id.startswith('/'):
+            app_id = parent_id.rstrip('/') + '/' + app_id
+        if 'apps' not in data and 'groups' not in data:
+            return [app_id]
+        app_ids = []
+        for item in data.get('apps', []) + data.get('groups', []):
+            app_ids.extend(self.getAppIds(item, app_id))
+        return app_ids
+
+    def getDeployment(self, resp, file_path):
+        if resp.status_code // 100 != 2 or resp.status_code == 204:
+            return None
+        deployment_id = resp.json().get('deploymentId')
+        if deployment_id is None:
+            return None
+        with open(file_path) as f:
+            return deployment_id, self.getAppIds(json.load(f))
+
+    def waitForDeployments(self, environmentObj, environment, deployments, timeout):
+        from cli.deploymentwatcher import DeploymentWatcher
+        self.fetchUserPass(environment)
+        watcher = DeploymentWatcher(environmentObj['marathon_endpoint'], self.session_pool,
+                                    auth=(self.user, self.passw))
+        for name, deployment_id, app_ids in deployments:
+            watcher.add(name, deployment_id, app_ids)
+
+        def report(name, deployment):
+            print("Deployment of {}: step {}/{}".format(name, deployment.get('currentStep'),
+                                                        deployment.get('totalSteps')))
+        return watcher.wait(timeout, on_progress=report)
+
+    def getEventStream(self, roger_env, environment):
+        from cli.marathonevents import MarathonEventStream
+        self.fetchUserPass(environment)
+        return MarathonEventStream(roger_env['environments'][environment]['marathon_endpoint'],
+                                   self.session_pool, auth=(self.user, self.passw))
+
     def getGroupDetails(self, data):
         group_details = {}
         base_id = data['id']
@@ -244,29 +301,77 @@ class Marathon(Framework):
         latest_version = versions[-1]
         return images[latest_version]
 
+    def get_image_names(self, username, password, env, app_ids, config_dir, config_file,
+                        app_config_object=AppConfig()):
+        """
+        returns {app id: image name} for all of app_ids, from a single listing
+        of /v2/apps instead of a GET of every app
+
+        :params:
+        :app_ids [list]: ids of the apps, with or without the leading /
+        other params as for get_image_name
+        """
+        if not app_ids:
+            return {}
+        config = app_config_object.getRogerEnv(config_dir)
+        location = config['environments'][env]['marathon_endpoint']
+        ids = dict((app_id, '/' + app_id.lstrip('/')) for app_id in app_ids)
+        # marathon only lists the apps whose id contains the filter
+        prefix = os.path.commonprefix(ids.values())
+        url = '{location}/v2/apps'.format(location=location)
+        if prefix.strip('/'):
+            url = '{}?id={}'.format(url, urllib.quote(prefix, safe='/'))
+        res = self.session_pool.get(url, auth=(username, password))
+        res.raise_for_status()
+        index = {}
+        for app in res.json().get('apps', []):
+            container = app.get('container') or {}
+            docker = container.get('docker') or {}
+            if 'image' in docker:
+                index[app['id']] = docker['image']
+        images = {}
+        for app_id, full_id in ids.items():
+            if full_id not in index:
+                raise ValueError("App {} not found in {}, or it has no docker image.".format(full_id, env))
+            images[app_id] = index[full_id]
+        return images
+
+    def getAppSummaries(self, roger_env, environment):
+        """
+        returns an AppSummary of every app, with its running tasks, from a
+        single GET of /v2/apps?embed=apps.tasks
+
+        Only the id, the env and the tasks of every app are kept from the app
+        definitions. Callers needing both the tasks and the apps (like roger
+        ps) should build both from one call, see get_instance_details and
+        get_app_envs.
+        """
+        self.fetchUserPass(environment)
+        headers = {'Accept': 'application/json',
+                   'Accept-Encoding': 'gzip, deflate', 'Content-Type': 'application/json'}
+        url = roger_env['environments'][environment][
+            'marathon_endpoint'] + '/v2/apps?embed=apps.tasks'
+        resp = self.session_pool.get(url, headers=headers, auth=(self.user, self.passw))
+        color = "green"
+        if re.compile("[45]\d{2}").match(str(resp.status_code)):
+            color = "red"
+        print(colored("Server response for apps: [ {} - {} ]".format(resp.status_code, resp.reason), color))
+        summaries = []
+        for app in resp.json().get('apps', []):
+            tasks = []
+            for task in app.get('tasks') or []:
+                # staged tasks are embedded too, only the running ones are wanted
+                if task.get('state', 'TASK_RUNNING') != 'TASK_RUNNING' or not task.get('startedAt'):
+                    continue
+                tasks.append(TaskSummary(task['id'], task['host'], task.get('ports', []), task['startedAt']))
+            summaries.append(AppSummary(app['id'], app.get('env') or {}, tasks))
+        return summaries
+
     def getInstanceDetails(self, roger_env, environment):
-        tasks = self.getTasks(roger_env, environment)
-        instance_details = {}
-        for task in tasks:
-            app_id = task['appId']
-            started_at = task['startedAt']
-            mesos_task_id = task['id']
-            hostname = task['host']
-            ports = task['ports']
-            instance_details[mesos_task_id] = (
-                app_id, hostname, ports, started_at)
-
-        return instance_details
+        return get_instance_details(self.getAppSummaries(roger_env, environment))
 
     def getAppEnvDetails(self, roger_env, environment):
-        apps = self.getApps(roger_env, environment)
-        app_envs = {}
-        for app in apps:
-            app_id = app['id']
-            if 'env' in app:
-                app_envs[app_id] = app['env']
-
-        return app_envs
+        return get_app_envs(self.getAppSummaries(roger_env, environment))
 
     def getApps(self, roger_env, environment):
         self.fetchUserPass(environment)
@@ -274,8 +379,8 @@ class Marathon(Framework):
                    'Accept-Encoding': 'gzip, deflate', 'Content-Type': 'application/json'}
         url = roger_env['environments'][environment][
             'marathon_endpoint'] + '/v2/apps'
-        resp = requests.get("{}".format(url), headers=headers,
-                            auth=(self.user, self.passw))
+        resp = self.session_pool.get("{}".format(url), headers=headers,
+                                     auth=(self.user, self.passw))
         color = "green"
         if re.compile("[45]\d{2}").match(str(resp.status_code)):
             color = "red"
@@ -290,8 +395,8 @@ class Marathon(Framework):
                    'Accept-Encoding': 'gzip, deflate', 'Content-Type': 'application/json'}
         url = roger_env['environments'][environment][
             'marathon_endpoint'] + '/v2/tasks?status=running'
-        resp = requests.get("{}".format(url), headers=headers,
-                            auth=(self.user, self.passw))
+        resp = self.session_pool.get("{}".format(url), headers=headers,
+                                     auth=(self.user, self.passw))
         color = "green"
         if re.compile("[45]\d{2}").match(str(resp.status_code)):
             color = "red"
@@ -327,6 +432,6 @@ class Marathon(Framework):
         location = config['environments'][env]['marathon_endpoint']
         url = '{location}/v2/apps/{app_id}'.format(
             location=location, app_id=app_id)
-        res = requests.get(url, auth=(username, password))
+        res = self.session_pool.get(url, auth=(username, password))
         image = res.json()['app']['container']['docker']['image']
         return image
@@ -0,0 +1,215 @@
+#!/usr/bin/python
+
+from __future__ import print_function
+import json
+import threading
+import urllib
+from collections import namedtuple
+
+try:
+    import Queue as queue
+except ImportError:
+    import queue
+
+# Events roger ps --watch needs to keep its task and app index up to date
+WATCH_EVENT_TYPES = ['status_update_event', 'api_post_event', 'app_terminated_event']
+
+ServerSentEvent = namedtuple('ServerSentEvent', ['event', 'data'])
+
+
+def iter_sse(lines):
+    '''Yields a ServerSentEvent for every event in lines, the lines of a
+    text/event-stream body. Events without data (keep-alives) are skipped.'''
+    event = None
+    data = []
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode('utf-8')
+        line = line.rstrip('\r')
+        if not line:
+            if data:
+                yield ServerSentEvent(event or 'message', '\n'.join(data))
+            event = None
+            data = []
+            continue
+        if line.startswith(':'):
+            continue
+        field, _, value = line.partition(':')
+        if value.startswith(' '):
+            value = value[1:]
+        if field == 'event':
+            event = value
+        elif field == 'data':
+            data.append(value)
+    if data:
+        yield ServerSentEvent(event or 'message', '\n'.join(data))
+
+
+class BufferedEvents(object):
+    '''Reads events in a background thread as they arrive and yields them in
+    order when iterated, so that none are lost while the caller is busy, e.g.
+    loading the state the events apply to. An error reading the events is
+    raised once the events before it were yielded.
+
+    close() stops the reader at the next event; the connection the events are
+    read from has to be closed too so that a reader waiting on it returns.'''
+
+    def __init__(self, events):
+        self.queue = queue.Queue()
+        self.closed = False
+        self.thread = threading.Thread(target=self.read, args=(events,))
+        self.thread.daemon = True
+        self.thread.start()
+
+    def read(self, events):
+        try:
+            for event in events:
+                if self.closed:
+                    break
+                self.queue.put(('event', event))
+        except Exception as e:
+            self.queue.put(('error', e))
+        else:
+            self.queue.put(('end', None))
+        finally:
+            # a generator can only be closed from the thread running it
+            close = getattr(events, 'close', None)
+            if close is not None:
+                close()
+
+    def close(self):
+        self.closed = True
+
+    def __iter__(self):
+        while True:
+            try:
+                # a timeout keeps Ctrl-C working while waiting
+                kind, value = self.queue.get(timeout=1)
+            except queue.Empty:
+                continue
+            if kind == 'end':
+                return
+            if kind == 'error':
+                raise value
+            yield value
+
+
+class TaskIndex(object):
+    '''In-memory index of the running tasks and the app environments of a
+    Marathon, loaded once from /v2/tasks and /v2/apps and then kept up to date
+    from the event stream. Tasks are the (app id, host, ports, started at)
+    tuples returned by Marathon.getInstanceDetails.'''
+
+    def __init__(self, instance_details=None, app_envs=None):
+        self.tasks = {}
+        self.app_tasks = {}
+        self.app_envs = dict(app_envs or {})
+        for task_id, task in (instance_details or {}).items():
+            self.addTask(task_id, task)
+
+    def addTask(self, task_id, task):
+        self.removeTask(task_id)
+        self.tasks[task_id] = task
+        self.app_tasks.setdefault(task[0], set()).add(task_id)
+
+    def removeTask(self, task_id):
+        task = self.tasks.pop(task_id, None)
+        if task is None:
+            return None
+        task_ids = self.app_tasks.get(task[0], set())
+        task_ids.discard(task_id)
+        if not task_ids:
+            self.app_tasks.pop(task[0], None)
+        return task[0]
+
+    def getInstanceDetails(self, app_ids=None):
+        '''The tasks of app_ids (all of them by default), by task id.'''
+        if app_ids is None:
+            return dict(self.tasks)
+        instance_details = {}
+        for app_id in app_ids:
+            for task_id in self.app_tasks.get(app_id, ()):
+                instance_details[task_id] = self.tasks[task_id]
+        return instance_details
+
+    def apply(self, event_type, data):
+        '''Updates the index with a Marathon event. Returns the ids of the apps it changed.'''
+        if event_type == 'status_update_event':
+            task_id = data.get('taskId')
+            if data.get('taskStatus') == 'TASK_RUNNING':
+                task = (data.get('appId'), data.get('host'), data.get('ports', []), data.get('timestamp'))
+                if self.tasks.get(task_id) == task:
+                    return set()
+                self.addTask(task_id, task)
+                return set([task[0]])
+            # any other status means the task is no longer running
+            app_id = self.removeTask(task_id)
+            return set([app_id]) if app_id is not None else set()
+        if event_type == 'api_post_event':
+            app = data.get('appDefinition') or {}
+            app_id = app.get('id')
+            if app_id is None:
+                return set()
+            if 'env' in app:
+                self.app_envs[app_id] = app['env']
+            else:
+                self.app_envs.pop(app_id, None)
+            return set([app_id])
+        if event_type == 'app_terminated_event':
+            app_id = data.get('appId')
+            for task_id in list(self.app_tasks.get(app_id, ())):
+                self.removeTask(task_id)
+            self.app_envs.pop(app_id, None)
+            return set([app_id])
+        return set()
+
+
+class MarathonEventStream(object):
+    '''Subscribes to the /v2/events server-sent-event stream of a Marathon.
+
+    A single long-lived GET replaces polling /v2/apps and /v2/tasks: Marathon
+    pushes an event for every task status change and app update, and only the
+    event_types asked for are sent (older Marathons ignore the filter and send
+    all of them, the others are then dropped here).'''
+
+    def __init__(self, endpoint, session_pool, auth=None, event_types=None, connect_timeout=10):
+        self.endpoint = endpoint
+        self.session_pool = session_pool
+        self.auth = auth
+        self.event_types = event_types if event_types is not None else WATCH_EVENT_TYPES
+        self.connect_timeout = connect_timeout
+
+    def getUrl(self):
+        params = urllib.urlencode([('event_type', event_type) for event_type in self.event_types])
+        return "{}/v2/events{}".format(self.endpoint, "?" + params if params else "")
+
+    def open(self):
+        '''Connects to the stream and returns the response once Marathon accepted
+        it: every event from then on is sent on it.'''
+        # no read timeout, the stream can stay quiet for as long as nothing changes
+        resp = self.session_pool.get(self.getUrl(), auth=self.auth, stream=True,
+                                     headers={'Accept': 'text/event-stream'},
+                                     timeout=(self.connect_timeout, None))
+        try:
+            resp.raise_for_status()
+        except:
+            resp.close()
+            raise
+        return resp
+
+    def events(self, resp=None):
+        '''Yields (event type, data) for every event until the stream is closed,
+        read from resp (returned by open()) or from a new connection.'''
+        if resp is None:
+            resp = self.open()
+        try:
+            for event in iter_sse(resp.iter_lines(chunk_size=1024)):
+                if self.event_types and event.event not in self.event_types:
+                    continue
+                try:
+                    data = json.loads(event.data)
+                except ValueError:
+                    continue
+                yield event.event, data
+        finally:
+            resp.close()
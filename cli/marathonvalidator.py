@@ -19,7 +19,7 @@ class MarathonValidator:
 
     def check_path_begin_value(self, proxy_parser_obj, path_begin_value, affinity, acl_name, message_list):
         path_begin_values = proxy_parser_obj.get_path_begin_values()
-        if path_begin_value in path_begin_values.keys():
+        if path_begin_value in path_begin_values:
             if path_begin_values[path_begin_value] != acl_name:
                 if affinity is False:
                     message_list.append("HTTP PREFIX validation check failed. The HTTP PREFIX '{}' you are trying "
@@ -37,7 +37,7 @@ class MarathonValidator:
     def check_tcp_port(self, proxy_parser_obj, tcp_port_list, acl_name, message_list):
         backend_services_tcp_ports = proxy_parser_obj.get_backend_tcp_ports()
         for tcp_port in tcp_port_list:
-            if tcp_port in backend_services_tcp_ports.keys():
+            if tcp_port in backend_services_tcp_ports:
                 if backend_services_tcp_ports[tcp_port] != acl_name:
                     message_list.append("TCP PORT validation check failed. The TCP PORT '{}' you are trying "
                                         "to use is already in use by app id: '{}'".format(tcp_port, backend_services_tcp_ports[tcp_port]))
@@ -0,0 +1,66 @@
+#!/usr/bin/python
+
+from __future__ import print_function
+import contextlib
+import multiprocessing
+
+# Stages of a deploy, in order, and how many apps can be in each at a time by default.
+# gitpull covers the checkout of the app and of its private projects.
+# Builds are CPU and disk bound, the other stages mostly wait on the network.
+STAGES = ['gitpull', 'build', 'image-push', 'render', 'framework-push']
+DEFAULT_STAGE_JOBS = {'gitpull': 4, 'build': 1, 'image-push': 2, 'render': 4, 'framework-push': 4}
+
+
+def parse_stage_jobs(value):
+    '''"build=2,image-push=4" > {'build': 2, 'image-push': 4}'''
+    stage_jobs = {}
+    for item in (value or '').split(','):
+        if not item.strip():
+            continue
+        stage, _, jobs = item.partition('=')
+        stage = stage.strip()
+        if stage not in STAGES:
+            raise ValueError("Unknown deploy stage '{}', expected one of: {}.".format(stage, ', '.join(STAGES)))
+        try:
+            stage_jobs[stage] = max(1, int(jobs))
+        except ValueError:
+            raise ValueError("Number of jobs for stage '{}' should be a number, got '{}'.".format(stage, jobs))
+    return stage_jobs
+
+
+class Pipeline(object):
+    '''Limits how many apps of a deploy are in each stage at the same time.
+
+    Every app is deployed in its own worker process (see WorkerPool) and goes
+    through the stages in order, waiting in stage() for a free slot; as soon
+    as an app leaves a stage the next one enters it, so the image push of one
+    app overlaps the build of the next. The semaphores are created before the
+    workers are forked and shared by all of them. Without stage_jobs there
+    are no limits and stage() does nothing.'''
+
+    def __init__(self, stage_jobs=None):
+        self.semaphores = {}
+        for stage, jobs in (stage_jobs or {}).items():
+            self.semaphores[stage] = multiprocessing.BoundedSemaphore(jobs)
+
+    @classmethod
+    def create(cls, stage_jobs=None):
+        '''A pipeline with the default limits, overridden by stage_jobs.'''
+        jobs = dict(DEFAULT_STAGE_JOBS)
+        jobs.update(stage_jobs or {})
+        return cls(jobs)
+
+    def isEnabled(self):
+        return bool(self.semaphores)
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        semaphore = self.semaphores.get(name)
+        if semaphore is None:
+            yield
+            return
+        semaphore.acquire()
+        try:
+            yield
+        finally:
+            semaphore.release()
@@ -2,13 +2,34 @@
 
 from __future__ import print_function
 import os
-import requests
 import subprocess
 import sys
 import re
+import threading
+import time
 from cli.appconfig import AppConfig
 from cli.settings import Settings
-requests.packages.urllib3.disable_warnings()
+from cli.sessionpool import get_session_pool
+
+
+class ProxyState(object):
+    '''Snapshot of the proxy /api/state for one environment, indexed by
+    HTTP_PREFIX and by TCP port (both map to the owning app id).'''
+
+    def __init__(self, config, fetched_at=None):
+        self.path_begin_values = {}
+        self.backend_tcp_ports = {}
+        self.fetched_at = fetched_at if fetched_at is not None else time.time()
+
+        for app in config['Apps']:
+            if 'HTTP_PREFIX' in app['Env']:
+                self.path_begin_values[app['Env']['HTTP_PREFIX']] = app['Id']
+            if app['TcpPorts'] is not None:
+                for port in app['TcpPorts'].keys():
+                    self.backend_tcp_ports[port] = app['Id']
+
+    def is_fresh(self, ttl):
+        return (time.time() - self.fetched_at) < ttl
 
 
 class ProxyParser:
@@ -16,8 +37,20 @@ class ProxyParser:
     path_begin_values = {}
     backend_services_tcp_ports = {}
 
-    def get_proxy_config(self, environment):
-        proxy_config = ""
+    # Snapshots are shared by every parser in the process so that one command
+    # fetches the proxy state once per environment, however many apps and
+    # containers it validates. They are keyed by environment and proxy url,
+    # each key with its own lock so that a slow proxy only holds up the
+    # callers waiting for its own state.
+    _states = {}
+    _state_locks = {}
+    _states_lock = threading.Lock()
+
+    def __init__(self, session_pool=None, ttl=None):
+        self.session_pool = session_pool if session_pool is not None else get_session_pool()
+        self.ttl = ttl if ttl is not None else Settings().getProxyStateTtl()
+
+    def get_proxy_url(self, environment):
         settingObj = Settings()
         appObj = AppConfig()
         config_dir = settingObj.getConfigDir()
@@ -25,24 +58,32 @@ class ProxyParser:
         host = roger_env['environments'][environment]['host']
         proxy_config_path = roger_env['environments'][
             environment]['proxy_config_path']
-        url = "{}{}".format(host, proxy_config_path)
-        proxy_config = requests.get(url).json()
-        return proxy_config
+        return "{}{}".format(host, proxy_config_path)
 
-    def parseConfig(self, environment):
-        path_begin_values = {}
-        backend_tcp_ports = {}
-        config = self.get_proxy_config(environment)
+    def get_proxy_config(self, environment):
+        return self.session_pool.get(self.get_proxy_url(environment)).json()
 
-        for app in config['Apps']:
-            if 'HTTP_PREFIX' in app['Env']:
-                path_begin_values[app['Env']['HTTP_PREFIX']] = app['Id']
-            if app['TcpPorts'] is not None:
-                for port in app['TcpPorts'].keys():
-                    backend_tcp_ports[port] = app['Id']
+    def get_state(self, environment):
+        key = (environment, self.get_proxy_url(environment))
+        with ProxyParser._states_lock:
+            lock = ProxyParser._state_locks.setdefault(key, threading.Lock())
+        with lock:
+            state = ProxyParser._states.get(key)
+            if state is None or not state.is_fresh(self.ttl):
+                state = ProxyState(self.get_proxy_config(environment))
+                ProxyParser._states[key] = state
+            return state
 
-        self.set_path_begin_values(path_begin_values)
-        self.set_backend_tcp_ports(backend_tcp_ports)
+    def invalidate(self, environment=None):
+        with ProxyParser._states_lock:
+            for key in list(ProxyParser._states.keys()):
+                if environment is None or key[0] == environment:
+                    ProxyParser._states.pop(key, None)
+
+    def parseConfig(self, environment):
+        state = self.get_state(environment)
+        self.set_path_begin_values(state.path_begin_values)
+        self.set_backend_tcp_ports(state.backend_tcp_ports)
 
     def set_path_begin_values(self, path_begin_values_aclnames):
         self.path_begin_values = path_begin_values_aclnames
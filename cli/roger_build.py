@@ -12,7 +12,9 @@ from cli.hooks import Hooks
 from cli.utils import Utils
 from cli.utils import printException, printErrorMsg
 from cli.dockerutils import DockerUtils
-from cli.docker_build import Docker
+from cli.docker_build import Docker, swaparoo_fetches_dependencies
+from cli.fingerprint import FINGERPRINT_LABEL, TAG_LABEL, build_fingerprint, fingerprint_repository
+from cli.pipeline import Pipeline
 from termcolor import colored
 from datetime import datetime
 
@@ -42,6 +44,8 @@ class RogerBuild(object):
         self.outcome = 1
         self.registry = ""
         self.tag_name = ""
+        self.reused_tag = None
+        self.pipeline = Pipeline()
 
     def parse_args(self):
         self.parser = argparse.ArgumentParser(prog='roger build', description=describe())
@@ -60,10 +64,50 @@ class RogerBuild(object):
         self.parser.add_argument('--build-arg', action='append',
                                  help='docker build-arg; Use flags multiple times to pass more than one arg')
         self.parser.add_argument('-ns', '--disable-swaparoo', help="Disables swaparoo functionality", action="store_true")
+        self.parser.add_argument('--reuse-image', action="store_true",
+                                 help="skip the build and push if an image built from the same inputs is in the registry. "
+                                      "Not done when the swaparoo downloads private gems or npm modules. "
+                                      "Defaults to false.")
         return self.parser
 
+    def getFingerprint(self, file_path, build_filename, docker_build_args, project_shas):
+        '''Returns the build fingerprint of the image (see cli.fingerprint), None if it can't be computed.
+        project_shas are the revisions of the private projects that were checked out.'''
+        if project_shas is None:
+            return None
+        try:
+            return build_fingerprint(file_path, build_filename, docker_build_args, project_shas)
+        except (IOError, OSError) as e:
+            printException(e)
+            return None
+
+    def findImage(self, dockerUtilsObj, registry, image_prefix, fingerprint):
+        '''Returns the tag name of an image in the registry built with fingerprint, or None.
+        The registry is asked for the fingerprint tag pushed by pushFingerprint, whose labels
+        name the image it was pushed along with.'''
+        try:
+            labels = dockerUtilsObj.image_labels(registry, fingerprint_repository(image_prefix), fingerprint)
+            if not labels or labels.get(FINGERPRINT_LABEL) != fingerprint or not labels.get(TAG_LABEL):
+                return None
+            tag_name = labels[TAG_LABEL]
+            if dockerUtilsObj.image_exists(registry, tag_name):
+                return tag_name
+        except (Exception) as e:
+            printException(e)
+        return None
+
+    def pushFingerprint(self, dockerUtilsObj, image, registry, image_prefix, fingerprint, verbose):
+        '''Tags the pushed image with its fingerprint and pushes the tag too, so that findImage
+        finds it from any machine. Only the manifest is uploaded, the layers are in the registry.'''
+        fingerprint_image = "{}/{}:{}".format(registry, fingerprint_repository(image_prefix), fingerprint)
+        if dockerUtilsObj.docker_tag(image, fingerprint_image, verbose) != 0 or \
+                dockerUtilsObj.docker_push(fingerprint_image, verbose) != 0:
+            print(colored("Unable to push [{}], later builds won't reuse the image.".format(fingerprint_image),
+                          "yellow"))
+
     def main(self, settingObj, appObj, hooksObj, dockerUtilsObj, dockerObj, args):
         print(colored("******Building the Docker image now******", "grey"))
+        self.reused_tag = None
         try:
             config_dir = settingObj.getConfigDir()
             root = settingObj.getCliDir()
@@ -91,7 +135,7 @@ class RogerBuild(object):
             if 'build-args' in data:
                 if 'environment' in data['build-args']:
                     if args.env in data['build-args']['environment']:
-                        docker_build_args = data['build-args']['environment'][args.env]
+                        docker_build_args = dict(data['build-args']['environment'][args.env])
 
             # read the build-args from commandline like docker does as well
             # build-args defined on command line will override the ones from the config file, for the same keys
@@ -100,6 +144,8 @@ class RogerBuild(object):
                 docker_build_args.update(dict(arg_key_val_str.split('=') for arg_key_val_str in args.build_arg))
 
             projects = data.get('privateProjects', [])
+            # images whose layers docker can reuse, e.g. the previous build of the app
+            cache_from = data.get('cache_from', [])
 
 
             # get/update target source(s)
@@ -159,35 +205,69 @@ class RogerBuild(object):
                     self.registry = roger_env['registry']
                 self.tag_name = args.tag_name
                 image = "{0}/{1}".format(roger_env['registry'], args.tag_name)
-                try:
-                    if checkout_dir == args.directory:
-                        try:
-                            dockerObj.docker_build(
-                                dockerUtilsObj, appObj, args.directory, repo, projects, dockerfile_rel_repo_path, image, docker_build_args, args.verbose, build_filename, args.disable_swaparoo)
-                        except ValueError:
-                            raise ValueError("Docker build failed")
+                image_prefix = "{0}-{1}".format(config_name, args.app_name)
+                build_dir = args.directory if checkout_dir == args.directory else os.path.join(cur_dir, args.directory)
+                project_shas = {}
+                if projects != 'none':
+                    # checked out first, the fingerprint has the revisions the image is built from;
+                    # like the checkout of the app this waits on the network, not on a build slot
+                    with self.pipeline.stage('gitpull'):
+                        project_shas = dockerObj.fetch_private_repos(appObj, build_dir, repo, projects)
+                fingerprint = None
+                if args.push and getattr(args, 'reuse_image', False):
+                    if not args.disable_swaparoo and swaparoo_fetches_dependencies(file_path):
+                        # the fingerprint doesn't cover what the swaparoo downloads or installs
+                        print(colored("Not reusing an image, the swaparoo downloads private dependencies "
+                                      "the build fingerprint doesn't cover.", "yellow"))
                     else:
-                        directory = os.path.join(cur_dir, args.directory)
-                        try:
-                            dockerObj.docker_build(
-                                dockerUtilsObj, appObj, directory, repo, projects, dockerfile_rel_repo_path, image, docker_build_args, args.verbose, build_filename, args.disable_swaparoo)
-                        except ValueError:
-                            print('Docker build failed.')
-                            raise
-                    print(colored("******Successfully built Docker image******", "green"))
-                    build_message = "Image [{}]".format(image)
-                    if(args.push):
-                        print(colored("******Pushing Docker image to registry******", "grey"))
-                        exit_code = dockerUtilsObj.docker_push(image, args.verbose)
-                        if exit_code != 0:
-                            raise ValueError(
-                                'Docker push failed.')
-                        build_message += " successfully pushed to registry [{}]*******".format(roger_env[
-                                                                             'registry'])
-                    print(colored(build_message, "green"))
-                except (IOError) as e:
-                    printException(e)
-                    raise
+                        fingerprint = self.getFingerprint(file_path, build_filename, docker_build_args, project_shas)
+                labels = None
+                if fingerprint is not None:
+                    labels = {FINGERPRINT_LABEL: fingerprint, TAG_LABEL: args.tag_name}
+                reused_tag = None
+                if fingerprint is not None:
+                    reused_tag = self.findImage(dockerUtilsObj, roger_env['registry'], image_prefix, fingerprint)
+                self.reused_tag = reused_tag
+                if reused_tag is not None:
+                    self.tag_name = reused_tag
+                    print(colored("******Reusing image [{}/{}], it was built from the same inputs******".format(
+                        roger_env['registry'], reused_tag), "green"))
+                else:
+                    try:
+                        if checkout_dir == args.directory:
+                            try:
+                                with self.pipeline.stage('build'):
+                                    dockerObj.docker_build(
+                                        dockerUtilsObj, appObj, args.directory, repo, projects, dockerfile_rel_repo_path, image, docker_build_args, args.verbose, build_filename, args.disable_swaparoo, labels, cache_from, fetch_projects=False)
+                            except ValueError:
+                                raise ValueError("Docker build failed")
+                        else:
+                            directory = os.path.join(cur_dir, args.directory)
+                            try:
+                                with self.pipeline.stage('build'):
+                                    dockerObj.docker_build(
+                                        dockerUtilsObj, appObj, directory, repo, projects, dockerfile_rel_repo_path, image, docker_build_args, args.verbose, build_filename, args.disable_swaparoo, labels, cache_from, fetch_projects=False)
+                            except ValueError:
+                                print('Docker build failed.')
+                                raise
+                        print(colored("******Successfully built Docker image******", "green"))
+                        build_message = "Image [{}]".format(image)
+                        if(args.push):
+                            print(colored("******Pushing Docker image to registry******", "grey"))
+                            with self.pipeline.stage('image-push'):
+                                exit_code = dockerUtilsObj.docker_push(image, args.verbose)
+                                if exit_code == 0 and fingerprint is not None:
+                                    self.pushFingerprint(dockerUtilsObj, image, roger_env['registry'], image_prefix,
+                                                         fingerprint, args.verbose)
+                            if exit_code != 0:
+                                raise ValueError(
+                                    'Docker push failed.')
+                            build_message += " successfully pushed to registry [{}]*******".format(roger_env[
+                                                                                 'registry'])
+                        print(colored(build_message, "green"))
+                    except (IOError) as e:
+                        printException(e)
+                        raise
             else:
                 print(colored("Dockerfile does not exist in dir: {}".format(file_path), "red"))
 
@@ -202,7 +282,8 @@ class RogerBuild(object):
             # todo: maybe send a datadog event? 
             pass
 
-if __name__ == "__main__":
+def main(argv=None):
+    '''Runs roger build with the given arguments (sys.argv[1:] by default) and returns the exit code.'''
     settingObj = Settings()
     appObj = AppConfig()
     hooksObj = Hooks()
@@ -210,8 +291,13 @@ if __name__ == "__main__":
     dockerObj = Docker()
     roger_build = RogerBuild()
     roger_build.parser = roger_build.parse_args()
-    args = roger_build.parser.parse_args()
+    args = roger_build.parser.parse_args(argv)
     try:
         roger_build.main(settingObj, appObj, hooksObj, dockerUtilsObj, dockerObj, args)
     except (Exception) as e:
         printException(e)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,20 +3,20 @@
 from __future__ import print_function
 from tempfile import mkdtemp
 import argparse
+import copy
+import functools
 from decimal import *
-from jinja2 import Environment, FileSystemLoader
 from datetime import datetime
 from termcolor import colored
 import subprocess
 import json
 import os
-import requests
 import sys
 from cli.roger_build import RogerBuild
 from cli.roger_gitpull import RogerGitPull
 import re
 import shutil
-from cli.roger_push import RogerPush
+from cli.roger_push import RogerPush, DEFAULT_PUSH_JOBS, DEFAULT_WAIT_TIMEOUT
 from cli.settings import Settings
 from cli.appconfig import AppConfig
 from cli.utils import Utils
@@ -28,7 +28,9 @@ from cli.frameworkUtils import FrameworkUtils
 from cli.gitutils import GitUtils
 from cli.dockerutils import DockerUtils
 from cli.docker_build import Docker
-requests.packages.urllib3.disable_warnings()
+from cli.versionresolver import VersionResolver, split_version
+from cli.workerpool import WorkerPool
+from cli.pipeline import Pipeline, DEFAULT_STAGE_JOBS, STAGES, parse_stage_jobs
 
 import contextlib
 import urllib
@@ -53,13 +55,6 @@ def getGitSha(work_dir, repo, branch, gitObj):
     return gitObj.getGitSha(repo, branch, work_dir)
 
 
-def verify(value):
-    for item in value.split("."):
-        if not item.isdigit():
-            return False
-    return True
-
-
 class Slack:
 
     def __init__(self, config, token_file):
@@ -101,10 +96,12 @@ class RogerDeploy(object):
         self.rogerBuildObject = RogerBuild()
         self.dockerUtilsObject = DockerUtils()
         self.dockerObject = Docker()
+        self.versionResolver = VersionResolver(dockerUtils=self.dockerUtilsObject)
         self.utils = Utils()
         self.slack = None
         self.registry = ""
         self.image_name = ""
+        self.pipeline = Pipeline()
 
         # To remove a temporary directory created by roger-deploy if this
         # script exits
@@ -114,29 +111,21 @@ class RogerDeploy(object):
             shutil.rmtree(work_dir)
             print("Deleted temporary dir:{0}".format(work_dir))
 
+    def setPipeline(self, pipeline):
+        self.pipeline = pipeline
+        self.rogerBuildObject.pipeline = pipeline
+        self.rogerPushObject.pipeline = pipeline
+
+    def needsCheckout(self, data):
+        '''Whether pushing the app reads files from its repository or runs hooks in it.'''
+        return any(key in data for key in ['template_path', 'extra_variables_path', 'hooks'])
+
     def getNextVersion(self, config, roger_env, application, branch, work_dir, repo, args, gitObj):
         sha = getGitSha(work_dir, repo, branch, gitObj)
-        docker_search = self.dockerUtilsObject.docker_search(roger_env['registry'], config['name'], application)
-        image_version_list = []
         version = ''
-        envs = []
-        for each_key in roger_env["environments"].keys():
-            envs.append(each_key)
-        for line in docker_search.split('\n'):
-            image = line.split(' ')[0]
-            # (vmahedia) todo: This belongs in a separate DockerImage class. This class should know
-            # how to generate the image name, how to search the image or return this name pattern we
-            # then use to search this image on the registry.
-            matchObj = re.match("^{0}-{1}-.*/v.*".format(config['name'], application), image)
-            if matchObj and matchObj.group().startswith(config['name'] + '-' + application):
-                skip_image = False
-                for env in envs:
-                    if matchObj.group().startswith("{0}-{1}-{2}".format(config['name'], application, env)):
-                        skip_image = True
-                        break
-                if skip_image is False:
-                    if verify(str(matchObj.group().split('v')[-1])):
-                        image_version_list.append(matchObj.group().split('v')[-1])
+        envs = list(roger_env["environments"].keys())
+        image_version_list = self.versionResolver.getVersions(roger_env['registry'], config['name'],
+                                                              application, envs)
 
         if len(image_version_list) == 0:  # Create initial version
             version = "{0}/v0.1.0".format(sha)
@@ -164,10 +153,7 @@ class RogerDeploy(object):
         return latest_version
 
     def splitVersion(self, version):
-        major, _, rest = version.partition('.')
-        minor, _, rest = rest.partition('.')
-        patch, _, rest = rest.partition('.')
-        return int(major), int(minor) if minor else 0, int(patch) if patch else 0
+        return split_version(version)
 
     def parseArgs(self):
         self.parser = argparse.ArgumentParser(
@@ -195,6 +181,29 @@ class RogerDeploy(object):
         self.parser.add_argument('--build-arg', action='append',
                                  help='docker build-arg; Use flags multiple times to pass more than one arg')
         # (vmahedia) todo Changing this name is slightly more complicated, so making it more verbose for now
+        self.parser.add_argument('-j', '--jobs', type=int, default=1,
+                                 help="number of applications to deploy concurrently. Each application is deployed "
+                                      "in its own process and sub directory of the working dir, and its output is "
+                                      "printed once it finishes. Defaults to 1.")
+        self.parser.add_argument('--pipeline', action="store_true",
+                                 help="deploy all the applications concurrently, limiting how many of them are in each "
+                                      "stage ({}) at a time, so that the image push of one overlaps the build of the "
+                                      "next. Defaults to false.".format(', '.join(STAGES)))
+        self.parser.add_argument('--stage-jobs', metavar='stage=jobs,...',
+                                 help="with --pipeline, number of applications in a stage at a time. Defaults to "
+                                      "'{}'.".format(','.join("{}={}".format(stage, DEFAULT_STAGE_JOBS[stage])
+                                                              for stage in STAGES)))
+        self.parser.add_argument('--reuse-image', action="store_true",
+                                 help="skip the build if an image built from the same inputs is in the registry and "
+                                      "deploy that image. Defaults to false.")
+        self.parser.add_argument('--wait', '-w', action="store_true",
+                                 help="wait until the deployments triggered by the push are over and the tasks of "
+                                      "the applications are running and healthy. Defaults to false.")
+        self.parser.add_argument('--wait-timeout', type=int, default=DEFAULT_WAIT_TIMEOUT,
+                                 help="seconds to wait for with --wait. Defaults to {}.".format(DEFAULT_WAIT_TIMEOUT))
+        self.parser.add_argument('--push-jobs', dest='push_jobs', type=int, default=DEFAULT_PUSH_JOBS,
+                                 help="number of containers of an application to render, validate and push "
+                                      "concurrently. Defaults to {}.".format(DEFAULT_PUSH_JOBS))
         self.parser.add_argument('-d', '--directory',
                                  help="App Repo will be checked out here, this is the working dir CLI will use."
                                       "A temporary directory is created if no directory specified."
@@ -292,6 +301,15 @@ class RogerDeploy(object):
                 branch = args.branch
 
             try:
+                jobs = getattr(args, 'jobs', 1) or 1
+                if getattr(args, 'pipeline', False):
+                    self.setPipeline(Pipeline.create(parse_stage_jobs(args.stage_jobs)))
+                    # every app gets a worker, the stages limit how many of them do the same thing
+                    jobs = max(jobs, len(apps))
+                if jobs > 1 and len(apps) > 1:
+                    self.deployApps(settingObject, appObject, frameworkUtilsObject, gitObj, hooksObj,
+                                    root, args, config, roger_env, work_dir, config_dir, environment, apps, branch, self.slack, args.config_file, common_repo, temp_dir_created, apps_container_dict, jobs)
+                    apps = []
                 for app in apps:
                     if app not in config['apps']:
                         raise ValueError('Application {} specified not found.'.format(app))
@@ -316,6 +334,49 @@ class RogerDeploy(object):
             # todo: maybe send the datadog event, need to look
             pass 
 
+    def deployApps(self, settingObject, appObject, frameworkUtilsObject, gitObj, hooksObj, root, args, config,
+                   roger_env, work_dir, config_dir, environment, apps, branch, slack, config_file, common_repo, temp_dir_created, apps_container_dict, jobs):
+        '''Deploys several apps concurrently, each in its own worker process, and prints a summary table.'''
+        for app in apps:
+            if app not in config['apps']:
+                raise ValueError('Application {} specified not found.'.format(app))
+
+        deploy_jobs = []
+        for app in apps:
+            app_args = copy.copy(args)
+            app_work_dir = work_dir
+            # every app gets its own checkout unless the caller provided one
+            if not args.skip_gitpull:
+                app_work_dir = os.path.join(work_dir, app)
+            deploy_jobs.append((app, functools.partial(
+                self.deployApp, settingObject, appObject, frameworkUtilsObject, gitObj, hooksObj, root, app_args,
+                config, roger_env, app_work_dir, config_dir, environment, app, branch, slack, config_file,
+                common_repo, temp_dir_created, apps_container_dict)))
+
+        if args.skip_gitpull and not args.skip_build and jobs > 1 and len(apps) > 1:
+            # the builds would rewrite the Gemfile or package.json and fetch into git/ of the same checkout
+            print(colored("******The applications share the checkout in {}, building them one at a time******".format(
+                work_dir), "yellow"))
+            jobs = 1
+        print(colored("******Deploying {} applications, {} at a time******".format(len(apps), jobs), "grey"))
+        # ask for the password once, the workers can't share the terminal
+        settingObject.getPass(environment)
+
+        def report(result):
+            print(colored("******Output of deploy for {}******".format(result.name), "grey"))
+            print(result.output, end='')
+            if not result.succeeded:
+                printErrorMsg("Error when deploying {}: {}".format(result.name, result.error))
+
+        results = WorkerPool(jobs).run(deploy_jobs, on_complete=report)
+        summary = []
+        for result in results:
+            summary.append([result.name, "SUCCESS" if result.succeeded else "FAILURE",
+                            "{:.1f}".format(result.elapsed), result.error or ""])
+        from tabulate import tabulate
+        print(tabulate(summary, headers=["App", "Result", "Time (s)", "Error"], tablefmt="simple"))
+        return results
+
     def deployApp(self, settingObject, appObject, frameworkUtilsObject, gitObj, hooksObj, root, args, config,
                   roger_env, work_dir, config_dir, environment, app, branch, slack, config_file, common_repo, temp_dir_created, apps_container_dict):
 
@@ -338,13 +399,17 @@ class RogerDeploy(object):
         image = ''
 
         skip_gitpull = True if args.skip_gitpull else False
+        if args.skip_build and not self.needsCheckout(data):
+            # the image is already built and the templates aren't in the repo
+            skip_gitpull = True
 
         # get/update target source(s)
         if not skip_gitpull:
             args.app_name = app
             args.directory = work_dir
             self.rogerGitPullObject.identifier = self.identifier
-            self.rogerGitPullObject.main(settingObj, appObj, gitObj, hooksObj, args)
+            with self.pipeline.stage('gitpull'):
+                self.rogerGitPullObject.main(settingObj, appObj, gitObj, hooksObj, args)
 
         skip_build = True if args.skip_build else False
         skip_push = True if args.skip_push else False
@@ -355,8 +420,6 @@ class RogerDeploy(object):
 
         # todo (vmahedia) ExtractClass GitInfo, no need to pass args, we already have the information.
         # We deal with only one repo at a time. It may change in future but we can change the code then.
-        image_git_sha = getGitSha(work_dir, repo, branch, gitObj)
-        image_name = "{0}-{1}-{2}/v0.1.0".format(config['name'], app, image_git_sha)
         print(colored("******Fetching current version deployed or latest version from registry."
                        "This is used to bump to next version.******", "grey"))
         if skip_build:
@@ -367,13 +430,9 @@ class RogerDeploy(object):
             self.image_name = curr_image_ver
             if args.verbose:
                 print("Current image version deployed on {0} is :{1}".format(framework, curr_image_ver))
-            if curr_image_ver is not None:
-                image_name = "{0}-{1}-{2}".format(config['name'], app, curr_image_ver)
-                if args.verbose:
-                    print("Image current version from {0} endpoint is:{1}".format(framework, image_name))
-            else:
-                if args.verbose:
-                    print("Using base version for image:{0}".format(image_name))
+            image_name = "{0}-{1}-{2}".format(config['name'], app, curr_image_ver)
+            if args.verbose:
+                print("Image current version from {0} endpoint is:{1}".format(framework, image_name))
         else:
             # Docker build,tag and push
             image_name = self.getNextVersion(config, roger_env, app, branch, work_dir, repo, args, gitObj)
@@ -395,6 +454,10 @@ class RogerDeploy(object):
                                            self.dockerUtilsObject, self.dockerObject, build_args)
             except ValueError:
                 raise
+            if self.rogerBuildObject.reused_tag is not None:
+                # an image built from the same inputs is deployed instead
+                image_name = self.rogerBuildObject.reused_tag
+                self.image_name = image_name
 
         print("Image Version is: {}".format(colored(image_name, "cyan")))
 
@@ -422,16 +485,16 @@ class RogerDeploy(object):
         print(colored(deployMessage, "green"))
 
 
-if __name__ == "__main__":
-
+def main(argv=None):
+    '''Runs roger deploy with the given arguments (sys.argv[1:] by default) and returns the exit code.'''
     roger_deploy = RogerDeploy()
     roger_deploy.parser = roger_deploy.parseArgs()
-    args = roger_deploy.parser.parse_args()
+    args = roger_deploy.parser.parse_args(argv)
     if args.skip_gitpull and not args.directory:
         printErrorMsg("Define 'directory' arg, dir where app repo is checked out, needed to deploy "
                       "or remove skip_gitpull flag, in which case a tmp dir will be created to "
                       "checkout the app repo and app will be built and deployed from repo under tmp dir.")
-        sys.exit(-1)
+        return -1
 
     gitObj = GitUtils()
     settingObj = Settings()
@@ -443,5 +506,10 @@ if __name__ == "__main__":
         roger_deploy.main(settingObj, appObj, frameworkUtils,
                           gitObj, hooksObj, args)
     except (Exception) as e:
-        error_msg = "Error when deploying {}: {}".format(app, repr(e))
+        error_msg = "Error when deploying {}: {}".format(args.application, repr(e))
         printErrorMsg(error_msg)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
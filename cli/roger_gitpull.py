@@ -123,15 +123,21 @@ class RogerGitPull(object):
             pass
         print(colored("******Completed the GIT PULL step successfully******", "green"))
 
-if __name__ == "__main__":
+def main(argv=None):
+    '''Runs roger gitpull with the given arguments (sys.argv[1:] by default) and returns the exit code.'''
     settingObj = Settings()
     appObj = AppConfig()
     gitObj = GitUtils()
     hooksObj = Hooks()
     roger_gitpull = RogerGitPull()
     roger_gitpull.parser = roger_gitpull.parse_args()
-    args = roger_gitpull.parser.parse_args()
+    args = roger_gitpull.parser.parse_args(argv)
     try:
         roger_gitpull.main(settingObj, appObj, gitObj, hooksObj, args)
     except (Exception) as e:
         printException(e)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -121,9 +121,7 @@ class RogerInit(object):
         json_output = json.dumps(json_dict, indent=2)
         self.writeJson(json_output, templ_dir, filename)
 
-    def main(self):
-        self.parser = self.parse_args()
-        args = self.parser.parse_args()
+    def main(self, settingObj, args):
         config_dir = settingObj.getConfigDir()
 
         templ_dir = settingObj.getTemplatesDir()
@@ -152,7 +150,14 @@ class RogerInit(object):
             print("Sample Marathon file {0} created under {1}".format(
                 framework_filename, templ_dir))
 
-if __name__ == "__main__":
+def main(argv=None):
+    '''Runs roger init with the given arguments (sys.argv[1:] by default) and returns the exit code.'''
     settingObj = Settings()
     roger_init = RogerInit()
-    roger_init.main()
+    roger_init.parser = roger_init.parse_args()
+    args = roger_init.parser.parse_args(argv)
+    roger_init.main(settingObj, args)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,14 +5,12 @@ import argparse
 import subprocess
 import json
 import os
-import requests
 import subprocess
 import sys
 from cli.settings import Settings
 from cli.appconfig import AppConfig
 from cli.containerconfig import ContainerConfig
 from cli.utils import printException, printErrorMsg
-requests.packages.urllib3.disable_warnings()
 
 
 def describe():
@@ -40,9 +38,7 @@ class RogerLogs(object):
             '-T', '--tail', help="number of lines to show from the end of the logs. If a negative number is given, it shows all.")
         return self.parser
 
-    def main(self):
-        self.parser = self.parse_args()
-        args = self.parser.parse_args()
+    def main(self, settingObj, appObj, containerconfig, args):
         config_dir = settingObj.getConfigDir()
         roger_env = appObj.getRogerEnv(config_dir)
         environment = roger_env.get('default_environment', '')
@@ -105,9 +101,20 @@ class RogerLogs(object):
         else:
             print("No Container found on host {0} with application Task Id {1}".format(hostname, args.appTaskId))
 
-if __name__ == '__main__':
+def main(argv=None):
+    '''Runs roger logs with the given arguments (sys.argv[1:] by default) and returns the exit code.'''
     settingObj = Settings()
     appObj = AppConfig()
     containerconfig = ContainerConfig()
     roger_logs = RogerLogs()
-    roger_logs.main()
+    roger_logs.parser = roger_logs.parse_args()
+    args = roger_logs.parser.parse_args(argv)
+    try:
+        roger_logs.main(settingObj, appObj, containerconfig, args)
+    except (Exception) as e:
+        printException(e)
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
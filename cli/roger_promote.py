@@ -18,24 +18,43 @@ supported Mesos frameworks.
 RogerPromoteError: Generic exception for errors in RogerPromote
 """
 
+from __future__ import print_function
+
 # ~
 # stdlib
 import argparse
+import functools
 import tempfile
 import os
 import os.path
 import shutil
 import sys
 import subprocess
+from collections import namedtuple
 
 
 # ~
 # core
 from cli.settings import Settings
 from cli.appconfig import AppConfig
+from cli.gitmirror import GitMirror, get_clone_dir_name
+from cli.gitsparse import SparseCheckout
 from cli.frameworkUtils import FrameworkUtils
 from cli.marathon import Marathon
 from cli.chronos import Chronos
+from cli.hooks import Hooks
+from cli.proxyparser import ProxyParser
+from cli.roger_push import RogerPush
+from cli.workerpool import WorkerPool
+
+DEFAULT_PROMOTE_JOBS = 4
+PROMOTE_ATTEMPTS = 3
+
+PromotionResult = namedtuple('PromotionResult', ['container', 'image', 'succeeded', 'error', 'elapsed'])
+
+
+class RogerPromoteError(Exception):
+    pass
 
 
 def describe():
@@ -71,10 +90,11 @@ class RogerPromote(object):
         self._temp_dir = None
 
     @classmethod
-    def promote(cls, instance=None):
+    def promote(cls, instance=None, argv=None):
         """
         :Params:
         :instance [cli.roger_promote.RogerPromote]: Avalailable for test
+        :argv [list]: Arguments to parse. Default: sys.argv[1:]
 
         :Raises:
         :cli.roger_utils.RogerPromoteError:
@@ -88,7 +108,7 @@ class RogerPromote(object):
             rp = cls()
 
         # Get Namespace obj
-        args = rp.arg_parse().parse_args()
+        args = rp.arg_parse().parse_args(argv)
 
         # Set framework based on app config
         rp._set_framework(args.config, args.app_name)
@@ -98,18 +118,15 @@ class RogerPromote(object):
         if not repo:
             raise RogerPromoteError('Repo not found')
 
-        # Clone the repo
-        rp._clone_repo(repo)
-
-        # Locate roger_push.py
-        roger_push = rp._roger_push_script()
-
         app_data = rp._app_config.getAppData(
             rp.config_dir,
             args.config,
             args.app_name
         )
 
+        # Clone the repo
+        rp._clone_repo(repo, rp._checkout_paths(app_data, args))
+
         container_names= []
         for container in app_data['containers']:
             if isinstance(container, dict):
@@ -119,50 +136,13 @@ class RogerPromote(object):
                 container_names.append(container)
         print("Containers being promoted: {}".format(container_names))
 
-        failed_images = []
-        for container in container_names:
-            template_path = rp._get_template_path(
-                container,
-                rp.config_dir,
-                args,
-                args.app_name
-            )
-
-            full_image_name = rp._image_name(
-                args.from_env,
-                args.config,
-                template_path
-            )
-            if "/" in full_image_name:
-                image_name = full_image_name.split('/', 1)[1]
-            else:
-                image_name = full_image_name
+        try:
+            results = rp._promote_containers(container_names, args)
+        finally:
+            # CleanUp
+            shutil.rmtree(rp._temp_dir)
 
-            # Execute the script
-            cmd = [
-                roger_push,
-                '--env', args.to_env,
-                args.app_name, rp._temp_dir, image_name, args.config
-            ]
-            string_cmd = ' '.join(cmd)
-
-            ret_val = None
-            x = 0
-            while x < 3:
-                x += 1
-                ret_val = os.system(string_cmd)
-                if ret_val == 0:
-                    print("Container - {}, image - {}, promoted from - {} to - {}".
-                          format(container, image_name, args.from_env, args.to_env))
-                    break
-
-            if ret_val != 0:
-                print("Failed to deploy Container - {}, with Image - {image} to {env}".
-                      format(container,image_name, args.to))
-                failed_images.append(image_name)
-
-        # CleanUp
-        shutil.rmtree(rp._temp_dir)
+        failed_images = [result.image for result in results if not result.succeeded]
         if len(failed_images) > 0:
             print("Images that failed")
             for failed_image in failed_images:
@@ -170,6 +150,108 @@ class RogerPromote(object):
             return False
         return True
 
+    def _promote_containers(self, container_names, args):
+        """
+        Pushes the image of every container in args.from_env to
+        args.to_env, up to args.jobs containers at a time
+
+        Every push runs RogerPush in a worker process forked from this one, so
+        the configs and the proxy state loaded here are shared instead of
+        being loaded again for every container.
+
+        :Params:
+        :container_names [list]: Names of the containers to promote
+        :args [argparse.NameSpace]: Arguments of roger promote
+
+        :Return [list]: A PromotionResult for each container
+        """
+        jobs = max(1, args.jobs)
+        template_paths = [
+            self._get_template_path(container, self.config_dir, args, args.app_name)
+            for container in container_names
+        ]
+        image_names = []
+        for full_image_name in self._image_names(args.from_env, args.config, template_paths):
+            if "/" in full_image_name:
+                image_names.append(full_image_name.split('/', 1)[1])
+            else:
+                image_names.append(full_image_name)
+
+        self._load_proxy_state(args.to_env)
+
+        images = dict(zip(container_names, image_names))
+        promote_jobs = []
+        for container, image in zip(container_names, image_names):
+            promote_jobs.append((container, functools.partial(
+                self._push_container, container, image, args)))
+
+        def report(result):
+            print(result.output, end='')
+            if not result.succeeded:
+                print("Failed to deploy Container - {}, with Image - {} to {}: {}".
+                      format(result.name, images[result.name], args.to_env, result.error))
+
+        job_results = WorkerPool(jobs).run(promote_jobs, on_complete=report)
+        results = []
+        for result in job_results:
+            results.append(PromotionResult(result.name, images[result.name],
+                                           result.succeeded, result.error, result.elapsed))
+
+        summary = []
+        for result in results:
+            summary.append([result.container, result.image, "SUCCESS" if result.succeeded else "FAILURE",
+                            "{:.1f}".format(result.elapsed)])
+        from tabulate import tabulate
+        print(tabulate(summary, headers=["Container", "Image", "Result", "Time (s)"], tablefmt="simple"))
+        return results
+
+    def _load_proxy_state(self, environment):
+        """
+        Fetches the proxy state used by the deployment checks of Marathon
+        apps, once, before the workers are forked
+
+        :Params:
+        :environment [str]: Environment the containers are promoted to
+        """
+        if self._framework.getName() != 'Marathon':
+            return
+        try:
+            ProxyParser().get_state(environment)
+        except (Exception) as e:
+            # every worker will try again on its own
+            print("Unable to fetch the proxy state of {}: {}".format(environment, e))
+
+    def _push_container(self, container, image_name, args, roger_push=None):
+        """
+        Pushes image_name for container with RogerPush, retrying up to
+        PROMOTE_ATTEMPTS times
+
+        :Params:
+        :container [str]: Name of the container
+        :image_name [str]: Image to push, without the registry
+        :args [argparse.NameSpace]: Arguments of roger promote
+        :roger_push [cli.roger_push.RogerPush]: Avalailable for test
+
+        :Raises:
+        :ValueError: if the last attempt failed
+        """
+        for attempt in range(1, PROMOTE_ATTEMPTS + 1):
+            push = roger_push if roger_push is not None else RogerPush()
+            push_args = push.parse_args().parse_args([
+                '--env', args.to_env,
+                "{}:{}".format(args.app_name, container), self._temp_dir, image_name, args.config
+            ])
+            try:
+                push.main(self._settings, self._app_config, self._framework_utils, Hooks(), push_args)
+            except ValueError as e:
+                print("Attempt {} of {} to push {} failed: {}".format(attempt, PROMOTE_ATTEMPTS, container, e))
+                if attempt == PROMOTE_ATTEMPTS:
+                    raise
+                continue
+            print("Container - {}, image - {}, promoted from - {} to - {}".
+                  format(container, image_name, args.from_env, args.to_env))
+            return
+
     def arg_parse(self):
         """
         Returns a argparse.NameSpace instance holding argument data
@@ -189,6 +271,16 @@ class RogerPromote(object):
         )
         parser.add_argument('app_name', help='The name of the application')
         parser.add_argument('config', help='The name of the config file')
+        parser.add_argument(
+            '--full-clone', action='store_true',
+            help='Clone the whole repo instead of only checking out the '
+                 'templates of the application at the last commit'
+        )
+        parser.add_argument(
+            '--jobs', '-j', type=int, default=DEFAULT_PROMOTE_JOBS,
+            help='Number of containers to promote concurrently. '
+                 'Default: {}'.format(DEFAULT_PROMOTE_JOBS)
+        )
 
         return parser
 
@@ -243,13 +335,7 @@ class RogerPromote(object):
         :template_file [str]: file that contains a template
         :Return [str]: image name with version
         """
-        username = os.environ['ROGER_USER']
-        if environment == 'dev':
-            password = os.environ['ROGER_USER_PASS_DEV']
-        elif environment == 'stage':
-            password = os.environ['ROGER_USER_PASS_STAGE']
-        elif environment == 'prod':
-            password = os.environ['ROGER_USER_PASS_PROD']
+        username, password = self._credentials(environment)
 
         app_id = self._framework.get_app_id(template_file, self._framework.getName())
 
@@ -263,6 +349,50 @@ class RogerPromote(object):
         )
         return image
 
+    def _image_names(self, environment, config_file, template_files):
+        """
+        Returns the image names of several templates, looked up with a
+        single listing of the framework's apps
+
+        :Params:
+        :environment [str]: Environment as found in roger-mesos-tools.config
+        :config_file [dict]: Data loaded from roger-mesos-tools.config
+        :template_files [list]: files that contain a template
+        :Return [list]: image names with version, in the order of template_files
+        """
+        username, password = self._credentials(environment)
+        framework_name = self._framework.getName()
+        app_ids = [
+            self._framework.get_app_id(template_file, framework_name)
+            for template_file in template_files
+        ]
+        images = self._framework.get_image_names(
+            username,
+            password,
+            environment,
+            sorted(set(app_ids)),
+            self.config_dir,
+            config_file
+        )
+        return [images[app_id] for app_id in app_ids]
+
+    def _credentials(self, environment):
+        """
+        Returns the (username, password) to use for environment
+
+        :Params:
+        :environment [str]: Environment as found in roger-mesos-tools.config
+        """
+        username = os.environ['ROGER_USER']
+        password = None
+        if environment == 'dev':
+            password = os.environ['ROGER_USER_PASS_DEV']
+        elif environment == 'stage':
+            password = os.environ['ROGER_USER_PASS_STAGE']
+        elif environment == 'prod':
+            password = os.environ['ROGER_USER_PASS_PROD']
+        return username, password
+
     def _config_resolver(self, key, application, config_file):
         """
         Returns the value for the desired key within the application's
@@ -287,12 +417,38 @@ class RogerPromote(object):
                     break
         return found
 
-    def _clone_repo(self, repo):
+    def _checkout_paths(self, app_data, args):
+        """
+        Returns the paths of the repo promote reads, or None if the whole repo
+        is needed
+
+        :Params:
+        :app_data [dict]: Data of the application in its config file
+        :args [argparse.NameSpace]: Arguments of roger promote
+
+        :Return [list]: Paths relative to the root of the repo
+        """
+        # hooks run in the template dir and can use any file of the repo
+        if args.full_clone or 'hooks' in app_data:
+            return None
+        paths = []
+        template_path = self._config_resolver(
+            'template_path', args.app_name, args.config)
+        if template_path and not os.path.isabs(template_path):
+            paths.append(template_path)
+        if 'extra_variables_path' in app_data:
+            paths.append(app_data['extra_variables_path'])
+        return paths
+
+    def _clone_repo(self, repo, paths=None, sparse_checkout=None):
         """
         Clone the repo
 
         :Params:
         :repo [str] The name of the repo
+        :paths [list] Only check out these paths of the repo (shallow, sparse
+                      and cached by commit). Default: the whole repo
+        :sparse_checkout [cli.gitsparse.SparseCheckout]: Avalailable for test
 
         :Raises:
         :subprocess.CalledProcessError:
@@ -301,17 +457,24 @@ class RogerPromote(object):
         """
         repo_url = self._app_config.getRepoUrl(repo)
         self._temp_dir = tempfile.mkdtemp()
+        target_dir = os.path.join(self._temp_dir, get_clone_dir_name(repo_url))
+        if paths is not None:
+            if not paths:
+                # the templates aren't in the repo, there's nothing to fetch
+                return
+            if sparse_checkout is None:
+                sparse_checkout = SparseCheckout()
+            commit = sparse_checkout.checkout(repo_url, None, paths, target_dir, verbose=True)
+            print("Checked out {} of {} at {}".format(", ".join(paths), repo_url, commit))
+            return
+        mirror = GitMirror()
+        if mirror.isEnabled():
+            exit_code = mirror.checkout(repo_url, None, target_dir, verbose=True)
+            if exit_code != 0:
+                raise subprocess.CalledProcessError(exit_code, 'git clone')
+            return
         subprocess.check_call(['git', 'clone', repo_url], cwd=self._temp_dir)
 
-    def _roger_push_script(self):
-        """
-        Returns path [str] to the roger_push.py executable
-
-        :Return [str]: Path to the script
-        """
-        code_dir = os.path.abspath(os.path.dirname(__file__))
-        return os.path.join(code_dir, 'roger_push.py')
-
     def _get_template_path(
         self,
         container_name,
@@ -353,6 +516,17 @@ class RogerPromote(object):
         return os.path.join(app_path, file_name)
 
 
+def main(argv=None):
+    """
+    Runs roger promote with the given arguments
+
+    :Params:
+    :argv [list]: Arguments to parse. Default: sys.argv[1:]
+
+    :Return [int]: The exit code
+    """
+    return 0 if RogerPromote.promote(argv=argv) else 1
+
+
 if __name__ == '__main__':
-    if not RogerPromote.promote():
-        sys.exit(1)
+    sys.exit(main())
@@ -5,16 +5,15 @@ import argparse
 import subprocess
 import json
 import os
-import requests
 import subprocess
 import sys
-from tabulate import tabulate
+import time
 from termcolor import colored
 from cli.settings import Settings
 from cli.appconfig import AppConfig
-from cli.marathon import Marathon
+from cli.marathon import Marathon, get_instance_details, get_app_envs
 from cli.proxyparser import ProxyParser
-requests.packages.urllib3.disable_warnings()
+from cli.workerpool import thread_map
 
 
 def describe():
@@ -23,6 +22,9 @@ def describe():
 
 class RogerPS(object):
 
+    def __init__(self):
+        self.sleep = time.sleep
+
     def parse_args(self):
         parser = argparse.ArgumentParser(
             prog='roger ps', description=describe())
@@ -30,46 +32,55 @@ class RogerPS(object):
                             help="environment to search. Example: 'dev' or 'stage'")
         parser.add_argument(
             '-v', '--verbose', help="show extended information for each task", action="store_true")
+        parser.add_argument(
+            '-w', '--watch', help="keep running and print the apps that change, as Marathon reports them",
+            action="store_true")
         return parser
 
     def get_app_details(self, framework, proxyparser, environment, args, roger_env):
-        app_details = {}
+        instance_details, app_envs = self.fetch_sources(framework, proxyparser, environment, roger_env)
+        return self.build_app_details(instance_details, app_envs, proxyparser, environment, args, roger_env)
+
+    def fetch_sources(self, framework, proxyparser, environment, roger_env):
+        '''Fetches the apps with their tasks and the proxy state concurrently.
+        Returns (instance details, app envs), both built from the one listing of
+        the apps; the proxy state is parsed into proxyparser.'''
+        # ask for credentials once, before the requests are sent concurrently
+        framework.fetchUserPass(environment)
+        summaries, _ = thread_map(lambda fetch: fetch(), [
+            lambda: framework.getAppSummaries(roger_env, environment),
+            lambda: proxyparser.parseConfig(environment)], 2)
+        return get_instance_details(summaries), get_app_envs(summaries)
+
+    def get_proxy_indexes(self, proxyparser):
+        '''Returns {app id: http prefixes} and {app id: tcp ports} from the parsed
+        proxy state, so that every app is joined with it in one lookup.'''
+        app_http_prefixes = {}
+        for http_prefix, app_id in proxyparser.get_path_begin_values().iteritems():
+            app_http_prefixes.setdefault(app_id, []).append(http_prefix)
+        app_tcp_ports = {}
+        for tcp_port, app_id in proxyparser.get_backend_tcp_ports().iteritems():
+            app_tcp_ports.setdefault(app_id, []).append(tcp_port)
+        return app_http_prefixes, app_tcp_ports
+
+    def build_app_details(self, instance_details, app_envs, proxyparser, environment, args, roger_env,
+                          proxy_indexes=None):
         instances = {}
-        instance_details = self.get_instance_details(
-            framework, roger_env, environment)
-        app_envs = self.get_app_envs(framework, roger_env, environment)
         for task_id in instance_details:
             app_id = instance_details[task_id][0]
-            if app_id in instances.keys():
-                tasks_list = instances[app_id]
-                tasks_list.append(task_id)
-                instances[app_id] = tasks_list
-            else:
-                tasks_list = []
-                tasks_list.append(task_id)
-                instances[app_id] = tasks_list
+            instances.setdefault(app_id, []).append(task_id)
 
-        proxyparser.parseConfig(environment)
-        http_prefixes = proxyparser.get_path_begin_values()
-        tcp_ports = proxyparser.get_backend_tcp_ports()
+        app_http_prefixes, app_tcp_ports = proxy_indexes or self.get_proxy_indexes(proxyparser)
 
         app_ids = {}
         for app_id in instances.keys():
-            http_prefix = ""
             http_url = "-"
-            tcp_port_list = []
+            tcp_port_list = app_tcp_ports.get(app_id, [])
             num_instances = len(instances[app_id])
-            for k, v in http_prefixes.iteritems():
-                if app_id == v:
-                    http_prefix = k
-                    if app_id in app_envs.keys():
-                        if 'HTTP_PORT' in app_envs[app_id]:
-                            http_url = "{}{}".format(roger_env['environments'][
-                                                     environment]['host'], http_prefix)
-                            break
-            for k, v in tcp_ports.iteritems():
-                if app_id == v:
-                    tcp_port_list.append(k)
+            http_prefixes = app_http_prefixes.get(app_id)
+            if http_prefixes and 'HTTP_PORT' in app_envs.get(app_id, {}):
+                http_url = "{}{}".format(roger_env['environments'][
+                                         environment]['host'], http_prefixes[0])
             app_details = {}
             app_details["instances"] = num_instances
             app_details["http_url"] = http_url
@@ -88,12 +99,13 @@ class RogerPS(object):
                 app_details["tasks"] = task_ids
             app_ids[app_id] = app_details
 
-        app_details["apps"] = app_ids
-        return app_details
+        return {"apps": app_ids}
 
-    def print_app_details(self, app_details, args):
-        apps = []
+    def get_rows(self, app_details, args):
+        '''Returns the table rows of every app, by app id.'''
+        rows = {}
         for app_id in app_details["apps"].keys():
+            apps = []
             app = []
             app_data = app_details["apps"][app_id]
             app.append("{} ({} instances)".format(app_id, app_data[
@@ -103,8 +115,7 @@ class RogerPS(object):
             app.append(app_data["tcp_port_list"])
             apps.append(app)
             if args.verbose:
-                tasks = []
-                for task_id in app_data["tasks"]:
+                for task_id in sorted(app_data["tasks"]):
                     task_data = app_data["tasks"][task_id]
                     app = []
                     app.append("|--{}".format(task_id))
@@ -113,21 +124,103 @@ class RogerPS(object):
                     app.append(task_data["started_at"])
                     apps.append(app)
                 apps.append(["", "", ""])
+            rows[app_id] = apps
+        return rows
 
+    def get_headers(self, args):
         if args.verbose:
-            headers = [
-                "App Id (Task Id)", "Http Url (Host:[Ports])", "TCP Ports (Started At)"]
-        else:
-            headers = ["App Id", "Instances", "Http Url", "TCP Ports"]
-        print("{}".format(tabulate(apps, headers=headers, tablefmt="simple")))
+            return ["App Id (Task Id)", "Http Url (Host:[Ports])", "TCP Ports (Started At)"]
+        return ["App Id", "Instances", "Http Url", "TCP Ports"]
 
-    def get_app_envs(self, framework, roger_env, environment):
-        app_envs = framework.getAppEnvDetails(roger_env, environment)
-        return app_envs
+    def print_rows(self, apps, args):
+        from tabulate import tabulate
+        print("{}".format(tabulate(apps, headers=self.get_headers(args), tablefmt="simple")))
 
-    def get_instance_details(self, framework, roger_env, environment):
-        instance_details = framework.getInstanceDetails(roger_env, environment)
-        return instance_details
+    def print_app_details(self, app_details, args):
+        apps = []
+        rows = self.get_rows(app_details, args)
+        for app_id in rows.keys():
+            apps.extend(rows[app_id])
+        self.print_rows(apps, args)
+
+    def print_changes(self, rows, changed_rows, args):
+        '''Prints the rows of the apps in changed_rows that differ from rows, apps
+        missing from changed_rows being stopped. Returns the updated rows.'''
+        apps = []
+        rows = dict(rows)
+        for app_id in sorted(changed_rows):
+            new_rows = changed_rows[app_id]
+            if new_rows == rows.get(app_id):
+                continue
+            if new_rows is None:
+                if app_id not in rows:
+                    continue
+                del rows[app_id]
+                apps.append(["{} (stopped)".format(app_id), "-", "-"] if args.verbose
+                            else [app_id, 0, "-", "-"])
+                continue
+            rows[app_id] = new_rows
+            apps.extend(new_rows)
+        if apps:
+            print(time.strftime("%H:%M:%S"))
+            self.print_rows(apps, args)
+        return rows
+
+    def watch(self, framework, proxyparser, environment, args, roger_env):
+        '''Prints the apps, then the rows of the apps that change as Marathon
+        reports them on its event stream, until interrupted. The stream is opened
+        before the tasks and apps are fetched and the events sent in between are
+        applied on top of them. If the stream is lost everything is fetched
+        again, since events were missed.'''
+        from cli.marathonevents import BufferedEvents, TaskIndex
+        stream = framework.getEventStream(roger_env, environment)
+        rows = None
+        failures = 0
+        try:
+            while True:
+                try:
+                    resp = stream.open()
+                    events = BufferedEvents(stream.events(resp))
+                    try:
+                        index = TaskIndex(*self.fetch_sources(framework, proxyparser, environment, roger_env))
+                        proxy_indexes = self.get_proxy_indexes(proxyparser)
+                        app_rows = self.get_rows(self.build_app_details(
+                            index.getInstanceDetails(), index.app_envs, proxyparser, environment, args, roger_env,
+                            proxy_indexes), args)
+                        if rows is None:
+                            rows = app_rows
+                            self.print_rows([row for app_id in sorted(rows) for row in rows[app_id]], args)
+                        else:
+                            changed_rows = dict((app_id, None) for app_id in rows)
+                            changed_rows.update(app_rows)
+                            rows = self.print_changes(rows, changed_rows, args)
+                        for event_type, data in events:
+                            failures = 0
+                            app_ids = index.apply(event_type, data)
+                            if not app_ids:
+                                continue
+                            if event_type == 'api_post_event':
+                                # a new or updated app can have new http prefixes or tcp ports
+                                proxyparser.invalidate(environment)
+                                proxyparser.parseConfig(environment)
+                                proxy_indexes = self.get_proxy_indexes(proxyparser)
+                            app_details = self.build_app_details(index.getInstanceDetails(app_ids), index.app_envs,
+                                                                 proxyparser, environment, args, roger_env,
+                                                                 proxy_indexes)
+                            changed_rows = dict((app_id, None) for app_id in app_ids)
+                            changed_rows.update(self.get_rows(app_details, args))
+                            rows = self.print_changes(rows, changed_rows, args)
+                    finally:
+                        # also stops the reader thread waiting on the connection
+                        events.close()
+                        resp.close()
+                    print(colored("Marathon closed the event stream, reconnecting.", "yellow"))
+                except (Exception) as e:
+                    print(colored("Lost the Marathon event stream: {}".format(e), "yellow"))
+                failures += 1
+                self.sleep(min(30, 2 ** failures))
+        except KeyboardInterrupt:
+            pass
 
     def main(self, settings, appconfig, framework, proxyparser, args):
         config_dir = settings.getConfigDir()
@@ -149,17 +242,25 @@ class RogerPS(object):
         if environment not in roger_env['environments']:
             raise ValueError(colored("Environment not found in roger-mesos-tools.config file.", "red"))
 
+        if getattr(args, 'watch', False):
+            self.watch(framework, proxyparser, environment, args, roger_env)
+            return
         app_details = self.get_app_details(
             framework, proxyparser, environment, args, roger_env)
         self.print_app_details(app_details, args)
 
 
-if __name__ == '__main__':
+def main(argv=None):
+    '''Runs roger ps with the given arguments (sys.argv[1:] by default) and returns the exit code.'''
     settings = Settings()
     appconfig = AppConfig()
     framework = Marathon()
     proxyparser = ProxyParser()
     roger_ps = RogerPS()
     roger_ps.parser = roger_ps.parse_args()
-    roger_ps.args = roger_ps.parser.parse_args()
+    roger_ps.args = roger_ps.parser.parse_args(argv)
     roger_ps.main(settings, appconfig, framework, proxyparser, roger_ps.args)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
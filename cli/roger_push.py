@@ -2,15 +2,15 @@
 
 from __future__ import print_function
 import argparse
-from jinja2 import Environment, FileSystemLoader, StrictUndefined, exceptions
 from datetime import datetime
-import requests
 import json
+import errno
 import os
 import sys
+import threading
 import traceback
 import logging
-import yaml
+from cli import loader
 from cli.settings import Settings
 from cli.appconfig import AppConfig
 from cli.utils import Utils
@@ -19,9 +19,11 @@ from cli.marathon import Marathon
 from cli.hooks import Hooks
 from cli.chronos import Chronos
 from cli.frameworkUtils import FrameworkUtils
+from cli.templates import get_environment
+from cli.workerpool import thread_map
+from cli.pipeline import Pipeline
 from datetime import datetime
 from termcolor import colored
-requests.packages.urllib3.disable_warnings()
 
 import contextlib
 import urllib
@@ -38,6 +40,12 @@ def chdir(dirname):
         os.chdir(curdir)
 
 
+DEFAULT_PUSH_JOBS = 1
+
+# Seconds push --wait waits for the deployments to finish
+DEFAULT_WAIT_TIMEOUT = 600
+
+
 def describe():
     return 'pushes the application into roger mesos.'
 
@@ -50,6 +58,9 @@ class RogerPush(object):
         self.outcome = 1
         self.registry = ""
         self.image_name = ""
+        self.pipeline = Pipeline()
+        self.deployments = []
+        self.deployments_lock = threading.Lock()
 
     def parse_args(self):
         self.parser = argparse.ArgumentParser(
@@ -79,6 +90,15 @@ class RogerPush(object):
             '--force-push', '-f', help="force push. Not Recommended. Forces push even if validation checks failed. Defaults to false.", action="store_true")
         self.parser.add_argument('--secrets-file', '-S',
                                  help="specifies an optional secrets file for deploy runtime variables.")
+        self.parser.add_argument('--jobs', '-j', dest='push_jobs', type=int, default=DEFAULT_PUSH_JOBS,
+                                 help="number of containers to render, validate and push concurrently. Once a "
+                                      "push fails no other container is pushed, the ones being pushed finish. "
+                                      "Defaults to {}.".format(DEFAULT_PUSH_JOBS))
+        self.parser.add_argument('--wait', '-w', action="store_true",
+                                 help="wait until the deployments triggered by the push are over and the tasks of "
+                                      "the applications are running and healthy. Defaults to false.")
+        self.parser.add_argument('--wait-timeout', type=int, default=DEFAULT_WAIT_TIMEOUT,
+                                 help="seconds to wait for with --wait. Defaults to {}.".format(DEFAULT_WAIT_TIMEOUT))
         return self.parser
 
     def loadSecrets(self, secrets_dir, file_name, args, environment):
@@ -88,7 +108,12 @@ class RogerPush(object):
 
         exists = os.path.exists(secrets_dir)
         if exists is False:
-            os.makedirs(secrets_dir)
+            try:
+                os.makedirs(secrets_dir)
+            except OSError as e:
+                # another container may have created it concurrently
+                if e.errno != errno.EEXIST:
+                    raise
 
         # (vmahedia) WE SHOULD NOT DO ANY GUESSING GAME BE EXPLICIT
         # about where we expect what and argument should make that very clear to customers
@@ -100,8 +125,8 @@ class RogerPush(object):
             if args.verbose:
                 print(colored("Trying to load secrets from file {}".format(secrets_file_path), "cyan"))
             try:
-                with open(secrets_file_path) as f:
-                    return_file = yaml.load(f) if secrets_file_path.lower().endswith('.yml') else json.load(f)
+                # secrets are never written to the parse cache
+                return_file = loader.load(secrets_file_path, cache=False)
                 if args.verbose:
                     print(colored("Loaded secrets from file {}".format(secrets_file_path), "cyan"))
                 return return_file
@@ -155,7 +180,7 @@ class RogerPush(object):
         # Copy variables from config-wide, app-wide, then container-wide variable
         # configs, each one from "global" and then environment-specific.
         for obj in [config, app_data, container]:
-            if type(obj) == dict and 'vars' in obj:
+            if isinstance(obj, dict) and 'vars' in obj:
                 variables.update(obj['vars'].get('global', {}))
                 variables.update(obj['vars'].get('environment', {}).get(environment, {}))
 
@@ -170,7 +195,7 @@ class RogerPush(object):
 
 
     def getContainerName(self, container):
-         return str(container.keys()[0]) if type(container) == dict else container
+         return str(container.keys()[0]) if isinstance(container, dict) else container
 
     def getContainersList(self, app_name):
         container_list = []
@@ -188,7 +213,7 @@ class RogerPush(object):
     def getConfiguredContainersList(self, app_data):
         configured_container_list = []
         for task in app_data['containers']:
-            if type(task) == dict:
+            if isinstance(task, dict):
                 configured_container_list.append(task.keys()[0])
             else:
                 configured_container_list.append(task)
@@ -227,10 +252,142 @@ class RogerPush(object):
             app_path = templ_dir
         return app_path
 
+    def getPushJobs(self, args):
+        push_jobs = getattr(args, 'push_jobs', None)
+        return push_jobs if push_jobs else DEFAULT_PUSH_JOBS
+
+    def getContainerConfig(self, config, container_name):
+        return "{0}-{1}.json".format(config['name'], container_name)
+
+    def renderContainer(self, container, env, app_path, config, data, args, roger_env, environment, extra_vars,
+                        secrets_dir, comp_dir):
+        '''Renders the template of one container into comp_dir/environment. Returns None on success or a
+        (container_name, error) tuple when the template uses undefined Jinja variables.'''
+        from jinja2 import exceptions
+        container_name = self.getContainerName(container)
+        if isinstance(container, dict):
+            container = container[container_name]
+        containerConfig = self.getContainerConfig(config, container_name)
+
+        template_with_path = os.path.join(app_path, containerConfig)
+        try:
+            template = env.get_template(containerConfig)
+        except exceptions.TemplateNotFound as e:
+            raise ValueError("The template file {} does not exist".format(template_with_path))
+        except Exception as e:
+            raise ValueError("Error while reading template from {} - {}".format(template_with_path, e))
+
+        additional_vars = {}
+        # (vmahedia)variables likes this should be at least visible within one
+        # scroll up or down, move this code to near to context
+        # Why are we getting the secrets everytime, this requires the file to be
+        # present
+        additional_vars.update(extra_vars)
+        secret_vars = self.loadSecrets(secrets_dir, containerConfig, args, environment)
+        if secret_vars is not None:
+            additional_vars.update(secret_vars)
+
+        image_path = "{0}/{1}".format(roger_env['registry'], args.image_name)
+        print("Rendering content from template {} for environment [{}]".format(template_with_path, environment))
+        try:
+            output = self.renderTemplate(template, environment, image_path, data,
+                                         config, container, container_name, additional_vars)
+        except exceptions.UndefinedError as e:
+            error_str = "The following Undefined Jinja variable error occurred. %s.\n" % e
+            print(colored(error_str, "red"), file=sys.stderr)
+            # we are going to fail even if one of the container config is not valid but we will
+            # still go through all the containers and collect all the errors before we bail out
+            return (container_name, error_str)
+
+        # Adding check so that not all apps try to mergeSecrets
+        try:
+            outputObj = json.loads(output)
+        except Exception as e:
+            raise ValueError("Error while loading json from {} - {}".format(template_with_path, e))
+
+        if '\"SECRET\"' in output and not args.secrets_file:
+            raise ValueError('"SECRET" string present in template, replace'
+                             'with template variables named in sercrets file')
+        output = self.mergeSecrets(output, secret_vars)
+        if output == "StandardError":
+            raise ValueError("Error while loading secrets to render template file variables")
+        # (vmahedia) Should we write out the files even though there is an error with one of the
+        # containers. Although maybe users would want to see some output
+        with open("{0}/{1}/{2}".format(comp_dir, environment, containerConfig), 'wb') as fh:
+            fh.write(output)
+        return None
+
+    def runDeploymentChecks(self, frameworkObj, container, config, comp_dir, environment):
+        container_name = self.getContainerName(container)
+        containerConfig = self.getContainerConfig(config, container_name)
+        config_file_path = "{0}/{1}/{2}".format(comp_dir, environment, containerConfig)
+        result = frameworkObj.runDeploymentChecks(config_file_path, environment)
+        if not result:
+            # need to give more indication about what can they do to fix this and what exactly failed
+            # in the deployment check function, we should print an error in that function as well
+            print(colored("Deployment checks failed for container - {}".format(container_name), "red"))
+        return result
+
+    def pushContainer(self, frameworkObj, container, config, comp_dir, environmentObj, environment, act_as_user,
+                      push_failed=None):
+        '''Pushes the rendered config of one container to the framework. Returns a (task_id, error) tuple,
+        errors are returned rather than raised so that the pushes already running can finish. Once a push
+        failed, push_failed (a threading.Event) is set and the containers not pushed yet are skipped.'''
+        container_name = self.getContainerName(container)
+        if push_failed is not None and push_failed.is_set():
+            print(colored("Skipping the push of {}, an earlier push failed".format(container_name), "yellow"))
+            return ([], None)
+        try:
+            containerConfig = self.getContainerConfig(config, container_name)
+            config_file_path = "{0}/{1}/{2}".format(comp_dir, environment, containerConfig)
+            # this is where actual push is happening
+            # we only push if forced, in case of failures
+            # in deployment checks
+            #
+            # (vmahedia) todo:
+            # list down scenarios in which this features
+            # will be useful
+            resp, task_id = frameworkObj.put(config_file_path, environmentObj,
+                                             container_name, environment, act_as_user)
+            deployment = frameworkObj.getDeployment(resp, config_file_path)
+            if deployment is not None:
+                with self.deployments_lock:
+                    self.deployments.append((container_name,) + tuple(deployment))
+            # // operator does floor division, rounds up to integer
+            color = "green" if resp.status_code // 100 == 2 else "red"
+            if not resp.status_code == 204:  # empty response
+                print(colored(json.dumps(resp.json(), indent=4), color))
+            return (task_id, None)
+        except (Exception) as e:
+            if push_failed is not None:
+                push_failed.set()
+            print("ERROR - : %s" % e, file=sys.stderr)
+            return ([], e)
+
+    def waitForDeployments(self, frameworkObj, environmentObj, environment, timeout):
+        '''Waits for the deployments of the pushed containers and prints how they went.
+        Raises a ValueError if one didn't converge in time.'''
+        if not self.deployments:
+            return
+        print(colored("******Waiting for {} deployment(s) to finish******".format(len(self.deployments)), "grey"))
+        results = frameworkObj.waitForDeployments(environmentObj, environment, self.deployments, timeout)
+        summary = []
+        for result in results:
+            tasks = ", ".join("{} {}/{} running{}".format(
+                app_id, health.running, health.instances,
+                ", {} healthy".format(health.healthy) if health.has_health_checks else "")
+                for app_id, health in sorted(result.health.items()))
+            summary.append([result.name, result.status.upper(), "{:.1f}".format(result.elapsed), tasks])
+        from tabulate import tabulate
+        print(tabulate(summary, headers=["Container", "Result", "Time (s)", "Tasks"], tablefmt="simple"))
+        failed = [result.name for result in results if result.status != 'succeeded']
+        if failed:
+            raise ValueError("Deployment of {} did not converge.".format(", ".join(failed)))
+
     def main(self, settings, appConfig, frameworkObject, hooksObj, args):
         print(colored("******Deploying application to framework******", "grey"))
+        self.deployments = []
         try:
-            validation_failed = False
             settingObj = settings
             appObj = appConfig
             frameworkUtils = frameworkObject
@@ -289,10 +446,14 @@ class RogerPush(object):
 
             # Create comp_dir if it doesn't exist
             if not os.path.isdir(comp_dir):
-                os.makedirs(comp_dir)
+                try:
+                    os.makedirs(comp_dir)
+                except OSError as e:
+                    # another push, e.g. of a promote, may have created it concurrently
+                    if e.errno != errno.EEXIST:
+                        raise
 
             data_containers = data['containers'] if not container_list else container_list
-            failed_container_dict = {}
 
             # (vmahedia) upto this point it's all getting and checking the
             # configuration parameters
@@ -302,12 +463,12 @@ class RogerPush(object):
             os.chdir(cur_file_path)
             app_path = self.getAppPath(appObj, args, data, repo, templ_dir)
 
-            env = Environment(loader = FileSystemLoader("{}".format(app_path)), undefined = StrictUndefined)
+            from jinja2 import StrictUndefined
+            env = get_environment(app_path, StrictUndefined)
             extra_vars = {}
             if 'extra_variables_path' in data:
                 ev_path = self.repo_relative_path(appObj, args, repo, data['extra_variables_path'])
-                with open(ev_path) as f:
-                    extra_vars = yaml.load(f) if ev_path.lower().endswith('.yml') else json.load(f)
+                extra_vars = loader.load(ev_path)
 
             if not hasattr(self, "identifier"):
                 self.identifier = self.utils.get_identifier(config_name, settingObj.getUser(), args.app_name)
@@ -325,100 +486,34 @@ class RogerPush(object):
             # it against the given config, checking to see if there are errors
             # ----------------------------------------------
             # (vmahedia) Meat starts from here, probably.
-            template = ''
-            for container in data_containers:
-                container_name = self.getContainerName(container)
-                if type(container) == dict:
-                    container = container[container_name]
-                containerConfig = "{0}-{1}.json".format(config['name'], container_name)
-
-                template_with_path = os.path.join(app_path, containerConfig)
-                try:
-                    template = env.get_template(containerConfig)
-                except exceptions.TemplateNotFound as e:
-                    raise ValueError("The template file {} does not exist".format(template_with_path))
-                except Exception as e:
-                    raise ValueError("Error while reading template from {} - {}".format(template_with_path, e))
-
-                additional_vars = {}
-                # (vmahedia)variables likes this should be at least visible within one
-                # scroll up or down, move this code to near to context
-                # Why are we getting the secrets everytime, this requires the file to be
-                # present
-                additional_vars.update(extra_vars)
-                secret_vars = self.loadSecrets(secrets_dir, containerConfig, args, environment)
-                if secret_vars is not None:
-                    additional_vars.update(secret_vars)
-
-                image_path = "{0}/{1}".format(roger_env['registry'], args.image_name)
-                print("Rendering content from template {} for environment [{}]".format(template_with_path, environment))
+            # Create the output dirs up front, the containers are rendered concurrently
+            comp_env_dir = "{0}/{1}".format(comp_dir, environment)
+            if not os.path.exists(comp_env_dir):
                 try:
-                    output = self.renderTemplate(template, environment, image_path, data,
-                                                 config, container, container_name, additional_vars)
-                except exceptions.UndefinedError as e:
-                    error_str = "The following Undefined Jinja variable error occurred. %s.\n" % e
-                    print(colored(error_str, "red"), file=sys.stderr)
-                    failed_container_dict[container_name] = error_str
-                    # we are going to fail even if one of the container config is not valid but we will
-                    # still go through the loop and collect all the errors before we bail out
-                    validation_failed = True
-                    pass
-                # ----------------------------------------------
-                # it seems the checks above can finish independent of the
-                # following code, decouple this two parts, later when  the code
-                # is well understood
-                # ----------------------------------------------
-                # Adding check to see if all jinja variables git resolved fot
-                # the container
-                if container_name not in failed_container_dict:
-                    # Adding check so that not all apps try to mergeSecrets
-                    try:
-                        outputObj = json.loads(output)
-                    except Exception as e:
-                        raise ValueError("Error while loading json from {} - {}".format(template_with_path, e))
-
-                    if '\"SECRET\"' in output and not args.secrets_file:
-                        raise ValueError('"SECRET" string present in template, replace'
-                                         'with template variables named in sercrets file')
-                    output = self.mergeSecrets(output, secret_vars)
-                    if output != "StandardError":
-                        try:
-                            comp_dir_exists = os.path.exists("{0}".format(comp_dir))
-                            if not comp_dir_exists:
-                                os.makedirs("{0}".format(comp_dir))
-                            comp_env_dir_exists = os.path.exists("{0}/{1}".format(comp_dir, environment))
-                            if not comp_env_dir_exists:
-                                os.makedirs("{0}/{1}".format(comp_dir, environment))
-                        except Exception as e:
-                            logging.error(traceback.format_exc())
-                        # (vmahedia) Should we write out the files even though there is an error with one of the
-                        # containers. Although maybe users would want to see some output
-                        with open("{0}/{1}/{2}".format(comp_dir, environment, containerConfig), 'wb') as fh:
-                            fh.write(output)
-                    else:
-                        raise ValueError("Error while loading secrets to render template file variables")
-
-            # Notify container error messages
-            # let failed_container_dict just be for now, but report all the errors
-            if validation_failed:
-                raise Exception("Unable to render Jinja template")
-
-            deployment_check_failed = False
-            # fail if the deployment check fails
-
-            for container in data_containers:
-                container_name = self.getContainerName(container)
-                containerConfig = "{0}-{1}.json".format(config['name'], container_name)
-                config_file_path = "{0}/{1}/{2}".format(comp_dir, environment, containerConfig)
-                result = frameworkObj.runDeploymentChecks(config_file_path, environment)
-                if not result:
-                    # need to give more indication about what can they do to fix this and what exactly failed
-                    # in the deployment check function, we should print an error in that function as well
-                    print(colored("Deployment checks failed for container - {}".format(framework, container)), "red")
-                    deployment_check_failed = True
-
-            if deployment_check_failed:
-                raise Exception("Deployment Check failed for one or more containers, check logs for more info!")
+                    os.makedirs(comp_env_dir)
+                except OSError as e:
+                    if e.errno != errno.EEXIST:
+                        raise
+            push_jobs = self.getPushJobs(args)
+
+            with self.pipeline.stage('render'):
+                # Render every container first. Undefined Jinja variables don't stop the loop so that all
+                # the errors are reported before we bail out.
+                failed_container_dict = dict(error for error in thread_map(
+                    lambda container: self.renderContainer(container, env, app_path, config, data, args, roger_env,
+                                                           environment, extra_vars, secrets_dir, comp_dir),
+                    data_containers, push_jobs) if error is not None)
+                # Notify container error messages
+                # let failed_container_dict just be for now, but report all the errors
+                if failed_container_dict:
+                    raise Exception("Unable to render Jinja template")
+
+                # fail if the deployment check fails for any container, nothing is pushed unless all of them pass
+                deployment_check_results = thread_map(
+                    lambda container: self.runDeploymentChecks(frameworkObj, container, config, comp_dir, environment),
+                    data_containers, push_jobs)
+                if not all(deployment_check_results):
+                    raise Exception("Deployment Check failed for one or more containers, check logs for more info!")
 
             if args.skip_push:
                 print(colored("Skipping push to {} framework. The rendered config file(s) are under {}/{}/".format(
@@ -432,39 +527,25 @@ class RogerPush(object):
                 if self.registry not in args.image_name:
                     image_name = self.registry + "/" + args.image_name
 
-                for container in data_containers:
-                    try:
-                        function_execution_start_time = datetime.now()
-                        # Assume SUCCESS unless exception
-                        execution_result = 'SUCCESS'
-                    except (Exception) as e:
-                        raise ValueError("{} Error : {}".format(getDebugInfo(), e))
-                    try:
-                        container_name = self.getContainerName(container)
-                        containerConfig = "{0}-{1}.json".format(config['name'], container_name)
-                        config_file_path = "{0}/{1}/{2}".format(comp_dir, environment, containerConfig)
-                        # this is where actual push is happening
-                        # we only push if forced, in case of failures
-                        # in deployment checks
-                        #
-                        # (vmahedia) todo:
-                        # list down scenarios in which this features
-                        # will be useful
-                        resp, task_id = frameworkObj.put(config_file_path, environmentObj,
-                                                         container_name, environment, act_as_user)
-                        # // operator does floor division, rounds up to integer
-                        color = "green" if resp.status_code // 100 == 2 else "red"
-                        if not resp.status_code == 204: # empty response
-                            print(colored(json.dumps(resp.json(), indent=4), color))
-                        container_task_id = self.utils.modify_task_id(task_id)
-                        self.task_id.extend(container_task_id)
-                    except (Exception) as e:
-                        print("ERROR - : %s" %e, file=sys.stderr)
-                        execution_result = 'FAILURE'
-                        raise
-                    finally:
-                        # todo: maybe send datadog event from here?
-                        pass
+                with self.pipeline.stage('framework-push'):
+                    # ask for credentials once, before the containers are pushed concurrently
+                    frameworkObj.fetchUserPass(environment)
+                    # like a serial push, no new container is pushed once one failed
+                    push_failed = threading.Event()
+                    push_results = thread_map(
+                        lambda container: self.pushContainer(frameworkObj, container, config, comp_dir, environmentObj,
+                                                             environment, act_as_user, push_failed),
+                        data_containers, push_jobs)
+                errors = [error for task_id, error in push_results if error is not None]
+                for task_id, error in push_results:
+                    if error is None:
+                        self.task_id.extend(self.utils.modify_task_id(task_id))
+                if errors:
+                    raise errors[0]
+
+                if getattr(args, 'wait', False):
+                    self.waitForDeployments(frameworkObj, environmentObj, environment,
+                                            getattr(args, 'wait_timeout', DEFAULT_WAIT_TIMEOUT))
 
             hookname = "post_push"
             exit_code = hooksObj.run_hook(hookname, data, app_path, args.env, settingObj.getUser())
@@ -475,15 +556,21 @@ class RogerPush(object):
         except (Exception) as e:
             raise ValueError("ERROR - {}".format(e))
 
-if __name__ == "__main__":
+def main(argv=None):
+    '''Runs roger push with the given arguments (sys.argv[1:] by default) and returns the exit code.'''
     settingObj = Settings()
     appObj = AppConfig()
     frameworkUtils = FrameworkUtils()
     hooksObj = Hooks()
     roger_push = RogerPush()
+    roger_push.parser = roger_push.parse_args()
+    roger_push.args = roger_push.parser.parse_args(argv)
     try:
-        roger_push.parser = roger_push.parse_args()
-        roger_push.args = roger_push.parser.parse_args()
         roger_push.main(settingObj, appObj, frameworkUtils, hooksObj, roger_push.args)
     except (Exception) as e:
         printException(e)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
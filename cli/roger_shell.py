@@ -5,7 +5,6 @@ import argparse
 import subprocess
 import json
 import os
-import requests
 import subprocess
 import sys
 from cli.settings import Settings
@@ -13,7 +12,6 @@ from cli.appconfig import AppConfig
 from cli.containerconfig import ContainerConfig
 from cli.utils import printException, printErrorMsg
 from termcolor import colored
-requests.packages.urllib3.disable_warnings()
 
 def describe():
     return 'starts an interactive bash session into a task.'
@@ -33,9 +31,7 @@ class RogerShell(object):
                                  help="hostname to search. Example: 'daldevmesos01' or 'daldevmesos04'")
         return self.parser
 
-    def main(self):
-        self.parser = self.parse_args()
-        args = self.parser.parse_args()
+    def main(self, settingObj, appObj, containerconfig, args):
         config_dir = settingObj.getConfigDir()
         roger_env = appObj.getRogerEnv(config_dir)
         environment = roger_env.get('default_environment', '')
@@ -87,9 +83,20 @@ class RogerShell(object):
             print(colored("No Container found on host {0} with application Task Id {1}".format(
                 hostname, args.appTaskId), "red"))
 
-if __name__ == '__main__':
+def main(argv=None):
+    '''Runs roger shell with the given arguments (sys.argv[1:] by default) and returns the exit code.'''
     settingObj = Settings()
     appObj = AppConfig()
     containerconfig = ContainerConfig()
     roger_shell = RogerShell()
-    roger_shell.main()
+    roger_shell.parser = roger_shell.parse_args()
+    args = roger_shell.parser.parse_args(argv)
+    try:
+        roger_shell.main(settingObj, appObj, containerconfig, args)
+    except (Exception) as e:
+        printException(e)
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,79 @@
+#!/usr/bin/python
+
+from __future__ import print_function
+import threading
+from cli.settings import Settings
+
+try:
+    from urlparse import urlparse
+except ImportError:
+    from urllib.parse import urlparse
+
+
+class SessionPool(object):
+    '''Keeps one keep-alive requests.Session per endpoint (scheme://host:port)
+    so that repeated calls against the same Marathon, Chronos or proxy host
+    reuse their TCP/TLS connections instead of reconnecting on every request.'''
+
+    def __init__(self, pool_size=None, timeout=None, retries=None, backoff_factor=None):
+        settings = Settings()
+        self.pool_size = pool_size if pool_size is not None else settings.getHttpPoolSize()
+        self.timeout = timeout if timeout is not None else settings.getHttpTimeout()
+        self.retries = retries if retries is not None else settings.getHttpRetries()
+        self.backoff_factor = backoff_factor if backoff_factor is not None else settings.getHttpBackoff()
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def endpoint(self, url):
+        parsed = urlparse(url)
+        return "{}://{}".format(parsed.scheme, parsed.netloc)
+
+    def createSession(self):
+        # requests is only imported once a command talks to an endpoint
+        import requests
+        from requests.adapters import HTTPAdapter
+        from requests.packages.urllib3.util.retry import Retry
+        requests.packages.urllib3.disable_warnings()
+        session = requests.Session()
+        retry = Retry(total=self.retries, backoff_factor=self.backoff_factor,
+                      status_forcelist=(502, 503, 504), raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=retry)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def session(self, url):
+        endpoint = self.endpoint(url)
+        with self._lock:
+            if endpoint not in self._sessions:
+                self._sessions[endpoint] = self.createSession()
+            return self._sessions[endpoint]
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        return self.session(url).request(method, url, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def put(self, url, **kwargs):
+        return self.request('PUT', url, **kwargs)
+
+    def close(self):
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions = {}
+
+
+_default_pool = None
+_default_pool_lock = threading.Lock()
+
+
+def get_session_pool():
+    '''Returns the process-wide SessionPool shared by all framework clients.'''
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = SessionPool()
+        return _default_pool
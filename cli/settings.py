@@ -5,6 +5,10 @@ import os
 import sys
 import getpass
 
+# passwords typed in, by environment; worker processes forked after the
+# parent asked for one inherit it instead of prompting on the terminal again
+_passwords = {}
+
 
 class Settings:
 
@@ -53,6 +57,70 @@ class Settings:
         cli_dir = os.path.abspath(os.path.join(own_dir, os.pardir))
         return cli_dir
 
+    def getCacheDir(self):
+        # ROGER_CACHE_DIR > ~/.cache/roger-mesos-tools
+        cache_dir = os.environ.get('ROGER_CACHE_DIR', '')
+        if cache_dir.strip() == '':
+            cache_dir = os.path.join(os.path.expanduser('~'), '.cache', 'roger-mesos-tools')
+        return os.path.abspath(cache_dir)
+
+    def getGitMirrorDir(self):
+        # ROGER_GIT_MIRROR_DIR > None, repositories are cloned from the remote every time
+        mirror_dir = os.environ.get('ROGER_GIT_MIRROR_DIR', '')
+        if mirror_dir.strip() == '':
+            return None
+        return os.path.abspath(mirror_dir)
+
+    def getNumber(self, envvar, default, convert=int):
+        value = os.environ.get(envvar, '')
+        if value.strip() == '':
+            return default
+        try:
+            return convert(value)
+        except ValueError:
+            raise ValueError(
+                "Environment variable ${} should be a number, got '{}'.".format(envvar, value))
+
+    def getHttpPoolSize(self):
+        # ROGER_HTTP_POOL_SIZE > 10 connections kept alive per endpoint
+        return self.getNumber("ROGER_HTTP_POOL_SIZE", 10)
+
+    def getHttpTimeout(self):
+        # ROGER_HTTP_TIMEOUT > 60 seconds
+        return self.getNumber("ROGER_HTTP_TIMEOUT", 60.0, float)
+
+    def getHttpRetries(self):
+        # ROGER_HTTP_RETRIES > 3 retries on connection errors and 502/503/504
+        return self.getNumber("ROGER_HTTP_RETRIES", 3)
+
+    def getHttpBackoff(self):
+        # ROGER_HTTP_BACKOFF > 0.5 (sleeps 0.5s, 1s, 2s, ... between retries)
+        return self.getNumber("ROGER_HTTP_BACKOFF", 0.5, float)
+
+    def getProxyStateTtl(self):
+        # ROGER_PROXY_STATE_TTL > 60 seconds a fetched proxy state is reused
+        return self.getNumber("ROGER_PROXY_STATE_TTL", 60.0, float)
+
+    def getCatalogSnapshotTtl(self):
+        # ROGER_CATALOG_SNAPSHOT_TTL > 3600 seconds before a registry catalog snapshot is crawled again in full
+        return self.getNumber("ROGER_CATALOG_SNAPSHOT_TTL", 3600.0, float)
+
+    def getGitJobs(self):
+        # ROGER_GIT_JOBS > 4 repositories fetched or cloned at a time
+        return self.getNumber("ROGER_GIT_JOBS", 4)
+
+    def getGitShaTtl(self):
+        # ROGER_GIT_SHA_TTL > 30 seconds a branch resolved with git ls-remote is reused
+        return self.getNumber("ROGER_GIT_SHA_TTL", 30.0, float)
+
+    def getDockerBackend(self):
+        # ROGER_DOCKER_BACKEND > 'cli' runs the docker binary, 'api' talks to the Docker Engine API on $DOCKER_HOST
+        backend = os.environ.get('ROGER_DOCKER_BACKEND', '').strip() or 'cli'
+        if backend not in ('cli', 'api'):
+            raise ValueError("Environment variable $ROGER_DOCKER_BACKEND should be 'cli' or 'api', got '{}'.".format(
+                backend))
+        return backend
+
     def getUser(self):
         user = None
         # ROGER_USER_ID env var > getpass.getuser()
@@ -68,4 +136,6 @@ class Settings:
         envvar = "ROGER_USER_PASS_{}".format(env.upper())
         if envvar in os.environ:
             return os.environ.get(envvar)
-        return getpass.getpass("password for [{}] env (to avoid getting this message set the environment variable {})? ".format(env, envvar))
+        if env not in _passwords:
+            _passwords[env] = getpass.getpass("password for [{}] env (to avoid getting this message set the environment variable {})? ".format(env, envvar))
+        return _passwords[env]
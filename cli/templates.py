@@ -0,0 +1,62 @@
+#!/usr/bin/python
+
+from __future__ import print_function
+import errno
+import os
+import threading
+from cli.settings import Settings
+
+_environments = {}
+_environments_lock = threading.Lock()
+_bytecode_cache = None
+
+
+def make_dirs(path):
+    try:
+        os.makedirs(path)
+    except OSError as e:
+        if e.errno != errno.EEXIST:
+            raise
+
+
+def get_bytecode_cache():
+    '''Returns the on-disk cache of compiled templates shared by all the
+    environments, or None if the cache dir can't be created. Jinja checks
+    the source of a template against the cached bytecode, so an edited
+    template is compiled again.'''
+    global _bytecode_cache
+    if _bytecode_cache is None:
+        from jinja2 import FileSystemBytecodeCache
+        cache_dir = os.path.join(Settings().getCacheDir(), 'jinja')
+        try:
+            make_dirs(cache_dir)
+            _bytecode_cache = FileSystemBytecodeCache(cache_dir)
+        except OSError:
+            _bytecode_cache = False
+    return _bytecode_cache or None
+
+
+def get_environment(path, undefined=None):
+    '''Returns the Jinja environment loading templates from path. Environments
+    are kept for the life of the process so a template is parsed once and
+    then served from the environment's cache (reloaded if the file changes).
+    undefined defaults to jinja2.Undefined.'''
+    from jinja2 import Environment, FileSystemLoader, Undefined
+    undefined = undefined or Undefined
+    key = (os.path.abspath(path), undefined)
+    with _environments_lock:
+        env = _environments.get(key)
+        if env is None:
+            env = Environment(loader=FileSystemLoader(key[0]), undefined=undefined,
+                              bytecode_cache=get_bytecode_cache(), auto_reload=True)
+            _environments[key] = env
+        return env
+
+
+def clear():
+    '''Forgets all the environments and their compiled templates, and the
+    bytecode cache so that it is looked up again in $ROGER_CACHE_DIR.'''
+    global _bytecode_cache
+    with _environments_lock:
+        _environments.clear()
+        _bytecode_cache = None
@@ -9,32 +9,59 @@ from cli.appconfig import AppConfig
 import hashlib
 import time
 import json
-from pkg_resources import get_distribution
 # todo: use https://pypi.python.org/pypi/colorama instead of termcolor
 from termcolor import colored
-import inspect
 import logging
+from collections import namedtuple
+
+
+class ErrorRecord(namedtuple('ErrorRecord', ['filename', 'lineno', 'function', 'message'])):
+    '''An error message and the place in the code it was reported from.'''
+    __slots__ = ()
+
+    def __str__(self):
+        return "{}:{} fn:{} - {}".format(self.filename, self.lineno, self.function, self.message)
+
+
+def getFrame(stack_depth):
+    # stack_depth
+    # 0 represents the function calling getFrame
+    # 1 represents its caller, and so on
+    # Falls back to 1 if the stack is not that deep.
+    # sys._getframe only follows the frame pointers, unlike inspect.stack() which
+    # reads the source lines of every frame in the stack from disk.
+    try:
+        return sys._getframe(stack_depth + 1)
+    except ValueError:
+        return sys._getframe(2)
+
 
 # Prints filename, line number and function name we need to print in
 # front of each line.
 def getDebugInfo(stack_depth):
-  if stack_depth < len(inspect.stack()):
-      # stack_depth
-      # 0 represents this line
-      # 1 represents line at caller
-      callerframerecord = inspect.stack()[stack_depth]
-  else:
-      callerframerecord = inspect.stack()[1]
-  frame = callerframerecord[0]
-  info = inspect.getframeinfo(frame)
-  return "{}:{} fn:{}".format(info.filename, info.lineno, info.function)
+    # stack_depth
+    # 0 represents this line
+    # 1 represents line at caller
+    frame = getFrame(stack_depth)
+    return "{}:{} fn:{}".format(frame.f_code.co_filename, frame.f_lineno, frame.f_code.co_name)
+
+
+def getErrorRecord(error_msg, stack_depth=1):
+    '''Returns an ErrorRecord for error_msg. stack_depth works as in getDebugInfo,
+    the default of 1 records the caller of getErrorRecord.'''
+    frame = getFrame(stack_depth)
+    return ErrorRecord(frame.f_code.co_filename, frame.f_lineno, frame.f_code.co_name, error_msg)
+
 
 def printException(e):
     logging.exception(e)
-    printErrorMsg(repr(e), 3)
+    return printErrorMsg(repr(e), 3)
+
 
 def printErrorMsg(error_msg, stack_depth = 2):
-    print(colored("{} - {}".format(getDebugInfo(stack_depth), error_msg), "red"))
+    record = getErrorRecord(error_msg, stack_depth)
+    print(colored(str(record), "red"))
+    return record
 
 class Utils:
 
@@ -44,6 +71,8 @@ class Utils:
     def roger_version(self, root_dir):
         version = "Unknown!"
         try:
+            # pkg_resources scans every installed distribution, only import it when needed
+            from pkg_resources import get_distribution
             version = get_distribution('roger_mesos_tools').version
         except Exception:
             fname = os.path.join(root_dir, "VERSION")
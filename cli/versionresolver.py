@@ -0,0 +1,81 @@
+#!/usr/bin/python
+
+from __future__ import print_function
+import re
+from termcolor import colored
+from cli.dockerutils import DockerUtils
+from cli.utils import printException
+
+
+def split_version(version):
+    '''"1.2" > (1, 2, 0)'''
+    major, _, rest = version.partition('.')
+    minor, _, rest = rest.partition('.')
+    patch, _, rest = rest.partition('.')
+    return int(major), int(minor) if minor else 0, int(patch) if patch else 0
+
+
+def is_version(value):
+    for item in value.split("."):
+        if not item.isdigit():
+            return False
+    return True
+
+
+class VersionResolver(object):
+    '''Finds the versions of an application that were pushed to the docker registry.
+
+    Images are pushed as <config name>-<application>-<git sha>/v<version>, so the
+    version is part of the repository name rather than a tag. The registry lists
+    its catalog in lexical order, so instead of reading the whole catalog the
+    resolver starts listing right before the application's prefix (last=<prefix>)
+    and stops at the first repository that doesn't start with it.'''
+
+    def __init__(self, dockerUtils=None):
+        self.dockerUtils = dockerUtils if dockerUtils is not None else DockerUtils()
+
+    def getImages(self, registry, prefix):
+        '''Returns the repositories in the registry whose name starts with prefix.'''
+        images = []
+        for repository in self.dockerUtils.iter_catalog(registry, last=prefix):
+            if not repository.startswith(prefix):
+                # the catalog is sorted, no more images of the app past this point
+                break
+            images.append(repository)
+        return images
+
+    def searchImages(self, registry, name, application):
+        prefix = "{0}-{1}-".format(name, application)
+        try:
+            return self.getImages(registry, prefix)
+        except (Exception) as e:
+            error_message = "Error when attempting search using docker v2 catalog: {} ".format(e)
+            printException(error_message)
+            print(colored("Attempting docker v1 search", "yellow"))
+            result = self.dockerUtils.docker_search_v1(registry, name, application)
+            return [line.split(' ')[0] for line in result.split('\n')]
+
+    def parseVersion(self, image, name, application, environments):
+        '''Returns the version of the image or None if it is not an image of the application.
+        Images of environment specific apps (<name>-<application>-<env>...) are skipped.'''
+        prefix = "{0}-{1}-".format(name, application)
+        if not re.match("^{0}.*/v.*".format(re.escape(prefix)), image):
+            return None
+        for environment in environments:
+            if image.startswith("{0}{1}".format(prefix, environment)):
+                return None
+        version = image.split('v')[-1]
+        return version if is_version(version) else None
+
+    def getVersions(self, registry, name, application, environments):
+        '''Returns the versions of the application in the registry, oldest first.'''
+        versions = set()
+        for image in self.searchImages(registry, name, application):
+            version = self.parseVersion(image, name, application, environments)
+            if version is not None:
+                versions.add(version)
+        return sorted(versions, key=split_version)
+
+    def getLatestVersion(self, registry, name, application, environments):
+        versions = self.getVersions(registry, name, application, environments)
+        return versions[-1] if versions else None
@@ -1,7 +1,5 @@
-import slackweb
 from sets import Set
 from datetime import datetime
-from slackclient import SlackClient
 
 from cli.settings import Settings
 from cli.appconfig import AppConfig
@@ -46,6 +44,8 @@ class WebHook:
             Not using slack." % e)
             return
         try:
+            import slackweb
+            from slackclient import SlackClient
             self.sc = SlackClient(self.token)
             self.client = slackweb.Slack(url=self.webhookURL)
             self.disabled = False
@@ -0,0 +1,120 @@
+#!/usr/bin/python
+
+from __future__ import print_function
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+import traceback
+from collections import namedtuple
+from multiprocessing.pool import ThreadPool
+from cli.sessionpool import get_session_pool
+
+JobResult = namedtuple('JobResult', ['name', 'succeeded', 'error', 'output', 'elapsed'])
+
+# AsyncResult.get() without a timeout can't be interrupted with Ctrl-C on python 2
+_WAIT_FOREVER = 60 * 60 * 24 * 365
+
+
+def thread_map(function, items, size):
+    '''Like map(function, items) but runs up to `size` calls concurrently in
+    threads; meant for I/O bound work such as HTTP requests or git fetches.
+    Results keep the order of items and the first exception raised by a call
+    is re-raised once the pool has been shut down.'''
+    items = list(items)
+    if size <= 1 or len(items) <= 1:
+        return [function(item) for item in items]
+    pool = ThreadPool(min(size, len(items)))
+    try:
+        return pool.map_async(function, items, chunksize=1).get(_WAIT_FOREVER)
+    finally:
+        pool.close()
+        pool.join()
+
+
+def _run_job(function, log_path, error_path):
+    '''Body of a worker process: runs function() with stdout/stderr (including
+    the output of any os.system/subprocess calls) redirected to log_path.'''
+    sys.stdout.flush()
+    sys.stderr.flush()
+    log = open(log_path, 'a', 1)
+    os.dup2(log.fileno(), 1)
+    os.dup2(log.fileno(), 2)
+    sys.stdout = sys.stderr = log
+    # Keep-alive connections inherited from the parent must not be shared
+    # between processes.
+    get_session_pool().close()
+    exit_code = 0
+    try:
+        function()
+    except BaseException as e:
+        traceback.print_exc()
+        with open(error_path, 'w') as f:
+            f.write(repr(e))
+        exit_code = 1
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+    sys.exit(exit_code)
+
+
+class WorkerPool(object):
+    '''Runs named jobs in forked worker processes, at most `size` at a time.
+
+    Every job has its own process, so os.chdir() and other process-wide state
+    in one job cannot leak into another, and its output is buffered and handed
+    back in the JobResult instead of being interleaved with the other jobs.'''
+
+    def __init__(self, size, poll_interval=0.1):
+        self.size = max(1, size)
+        self.poll_interval = poll_interval
+
+    def run(self, jobs, on_complete=None):
+        '''jobs is a list of (name, function) tuples. Returns a list of
+        JobResult in the order the jobs were given; on_complete(result) is
+        called as soon as each job finishes.'''
+        pending = list(enumerate(jobs))
+        running = {}
+        results = [None] * len(jobs)
+        log_dir = tempfile.mkdtemp(prefix='roger-jobs-')
+        try:
+            while pending or running:
+                while pending and len(running) < self.size:
+                    index, (name, function) = pending.pop(0)
+                    log_path = os.path.join(log_dir, "{}.log".format(index))
+                    error_path = os.path.join(log_dir, "{}.err".format(index))
+                    process = multiprocessing.Process(target=_run_job, args=(function, log_path, error_path))
+                    process.start()
+                    running[index] = (name, process, log_path, error_path, time.time())
+
+                for index in list(running.keys()):
+                    name, process, log_path, error_path, started = running[index]
+                    process.join(self.poll_interval / max(1, len(running)))
+                    if process.is_alive():
+                        continue
+                    del running[index]
+                    result = self._collect(name, process, log_path, error_path, time.time() - started)
+                    results[index] = result
+                    if on_complete is not None:
+                        on_complete(result)
+        finally:
+            for name, process, log_path, error_path, started in running.values():
+                process.terminate()
+            for filename in os.listdir(log_dir):
+                os.remove(os.path.join(log_dir, filename))
+            os.rmdir(log_dir)
+        return results
+
+    def _collect(self, name, process, log_path, error_path, elapsed):
+        output = ''
+        error = None
+        if os.path.exists(log_path):
+            with open(log_path) as f:
+                output = f.read()
+        if os.path.exists(error_path):
+            with open(error_path) as f:
+                error = f.read()
+        if process.exitcode != 0 and error is None:
+            error = "worker exited with code {}".format(process.exitcode)
+        return JobResult(name, process.exitcode == 0, error, output, elapsed)
@@ -31,3 +31,68 @@ def fake_marathon_response():
     )
     with open(config_file, 'r') as f:
         return json.loads(f.read())
+
+
+class FakeResponse(object):
+
+    def __init__(self, status_code, body=None, headers=None):
+        self.status_code = status_code
+        self.body = body
+        self.headers = headers or {}
+
+    def json(self):
+        return self.body
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise ValueError("HTTP {}".format(self.status_code))
+
+
+class FakeRegistry(object):
+    '''Stands in for the session pool in front of a docker registry. Serves a
+    lexically sorted catalog, page_size repositories per page, and the manifests
+    and config blobs of images, a {(repository, tag): labels} dict.'''
+
+    def __init__(self, repositories, page_size=2, etag=None, links=True, images=None):
+        self.repositories = sorted(repositories)
+        self.images = images or {}
+        self.page_size = page_size
+        self.etag = etag
+        self.links = links
+        self.calls = []
+
+    def request(self, method, url, headers=None):
+        '''HEAD /v2/<repository>/manifests/<tag>: 200 for the repositories in the catalog.'''
+        self.calls.append((url, headers or {}))
+        repository, tag = url.split('/v2/', 1)[1].rsplit('/manifests/', 1)
+        return FakeResponse(200 if repository in self.repositories or (repository, tag) in self.images else 404)
+
+    def get(self, url, headers=None):
+        headers = headers or {}
+        self.calls.append((url, headers))
+        if '/manifests/' in url or '/blobs/' in url:
+            return self.get_image(url)
+        if self.etag and headers.get('If-None-Match') == self.etag:
+            return FakeResponse(304)
+        last = ''
+        if 'last=' in url:
+            last = url.split('last=')[1].split('&')[0].replace('%2F', '/')
+        following = [name for name in self.repositories if name > last]
+        page = following[:self.page_size]
+        response_headers = {}
+        if self.links and len(following) > self.page_size:
+            response_headers['Link'] = '</v2/_catalog?last={}&n={}>; rel="next"'.format(
+                page[-1].replace('/', '%2F'), self.page_size)
+        if self.etag:
+            response_headers['ETag'] = self.etag
+        return FakeResponse(200, {'repositories': page}, response_headers)
+
+    def get_image(self, url):
+        '''GET /v2/<repository>/manifests/<tag> and the /v2/<repository>/blobs/<digest> it points to.'''
+        if '/manifests/' in url:
+            image = tuple(url.split('/v2/', 1)[1].rsplit('/manifests/', 1))
+            if image not in self.images:
+                return FakeResponse(404)
+            return FakeResponse(200, {'config': {'digest': 'sha256:{}:{}'.format(*image)}})
+        image = tuple(url.split('/blobs/sha256:', 1)[1].rsplit(':', 1))
+        return FakeResponse(200, {'config': {'Labels': self.images[image]}})
@@ -3,10 +3,14 @@
 from __future__ import print_function
 import unittest
 import argparse
+import copy
 import os
+import shutil
+import tempfile
 import sys
 sys.path.insert(0, os.path.abspath(os.path.join(
     os.path.dirname(os.path.realpath(__file__)), os.pardir, "cli")))
+from cli import appconfig
 from cli.appconfig import AppConfig
 from cli.settings import Settings
 
@@ -49,7 +53,38 @@ class TestAppConfig(unittest.TestCase):
         assert app_data['imageBase'] == "test_app_base"
         assert len(app_data['containers']) == 2
 
+    def test_getConfig_is_parsed_once(self):
+        config = self.appObj.getConfig(self.configs_dir, "app.json")
+        assert AppConfig().getConfig(self.configs_dir, "app.json") is config
+        assert self.appObj.getRogerEnv(self.configs_dir) is self.appObj.getRogerEnv(self.configs_dir)
+
+    def test_getConfig_reloads_changed_file(self):
+        config_dir = tempfile.mkdtemp()
+        try:
+            config_file = os.path.join(config_dir, "app.json")
+            with open(config_file, 'w') as f:
+                f.write('{"name": "test-app", "apps": {}}')
+            assert self.appObj.getConfig(config_dir, "app.json")['name'] == "test-app"
+            with open(config_file, 'w') as f:
+                f.write('{"name": "other-test-app", "apps": {}}')
+            assert self.appObj.getConfig(config_dir, "app.json")['name'] == "other-test-app"
+        finally:
+            shutil.rmtree(config_dir)
+
+    def test_getConfig_is_read_only(self):
+        config = self.appObj.getConfig(self.configs_dir, "app.json")
+        with self.assertRaises(TypeError):
+            config['name'] = "other-test-app"
+        with self.assertRaises(TypeError):
+            config['apps']['test_app']['containers'].append("container_name3")
+        assert isinstance(config, dict)
+        config_copy = copy.deepcopy(config)
+        config_copy['apps']['test_app']['containers'].append("container_name3")
+        assert type(config_copy) == dict
+        assert len(config['apps']['test_app']['containers']) == 2
+
     def tearDown(self):
+        appconfig.clear_snapshots()
         pass
 
 if __name__ == "__main__":
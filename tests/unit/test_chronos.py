@@ -11,7 +11,10 @@ from cli.marathon import Marathon
 from cli.framework import Framework
 from cli.appconfig import AppConfig
 from cli.utils import Utils
+from cli.sessionpool import SessionPool
 from mockito import mock, when
+from tests.helper import FakeResponse
+from tests.unit.test_marathon import FakeAppConfig, FakeSessionPool
 utils = Utils()
 
 
@@ -32,11 +35,12 @@ class TestChronos(unittest.TestCase):
         config_file = 'test.yml'
 
         app_config_object = mock(AppConfig)
+        session_pool = mock(SessionPool)
         when(app_config_object).getRogerEnv(config_dir).thenReturn(data)
-        when(requests).get(url, auth=(username, password)).thenReturn(res)
+        when(session_pool).get(url, auth=(username, password)).thenReturn(res)
         when(res).json().thenReturn(image_data)
 
-        c = Chronos()
+        c = Chronos(session_pool=session_pool)
         img = c.get_image_name(
             username,
             password,
@@ -47,3 +51,22 @@ class TestChronos(unittest.TestCase):
             app_config_object
         )
         assert img == image_data[0]['container']['image']
+
+    def test_get_image_names(self):
+        jobs = [{'name': 'example_team-app', 'container': {'image': 'registry:5000/app/v0.1.0'}},
+                {'name': 'example_team-app-nightly', 'container': {'image': 'registry:5000/nightly/v0.2.0'}}]
+        search = [{'name': 'example_team-other-job', 'container': {'image': 'registry:5000/other/v0.3.0'}}]
+        session_pool = FakeSessionPool({
+            'https://example.com/scheduler/jobs': FakeResponse(200, jobs),
+            'https://example.com/scheduler/jobs/search?name=example_team-other': FakeResponse(200, search)})
+        app_config = FakeAppConfig({'environments': {'dev': {'chronos_endpoint': 'https://example.com'}}})
+        c = Chronos(session_pool=session_pool)
+        images = c.get_image_names('user', 'pass', 'dev',
+                                   ['example_team-app', 'example_team-app-nightly', 'example_team-other'],
+                                   '/vagrant/config', 'test.yml', app_config)
+        assert images == {'example_team-app': 'registry:5000/app/v0.1.0',
+                          'example_team-app-nightly': 'registry:5000/nightly/v0.2.0',
+                          'example_team-other': 'registry:5000/other/v0.3.0'}
+        # only the job that is not listed under its exact name is searched for
+        assert session_pool.calls == ['https://example.com/scheduler/jobs',
+                                      'https://example.com/scheduler/jobs/search?name=example_team-other']
@@ -0,0 +1,113 @@
+#!/usr/bin/python
+
+from __future__ import print_function
+import unittest
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(
+    os.path.dirname(os.path.realpath(__file__)), os.pardir, "cli")))
+from tests.helper import FakeResponse
+from cli.deploymentwatcher import DeploymentWatcher
+
+# Test basic functionalities of DeploymentWatcher class
+
+
+class FakeMarathon(object):
+    '''Stands in for the session pool in front of Marathon. Every GET of
+    /v2/deployments returns the next list of deployments in polls.'''
+
+    def __init__(self, polls, apps):
+        self.polls = polls
+        self.apps = apps
+        self.calls = []
+
+    def get(self, url, auth=None, headers=None):
+        self.calls.append(url)
+        path = url[len('http://marathon'):]
+        if path == '/v2/deployments':
+            return FakeResponse(200, self.polls.pop(0) if len(self.polls) > 1 else self.polls[0])
+        app_id = path[len('/v2/apps'):]
+        if app_id in self.apps:
+            return FakeResponse(200, {'app': self.apps[app_id]})
+        return FakeResponse(404, {'message': 'not found'})
+
+
+class FakeClock(object):
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def deployment(deployment_id, step, apps):
+    return {'id': deployment_id, 'currentStep': step, 'totalSteps': 2, 'affectedApps': apps}
+
+
+class TestDeploymentWatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.apps = {
+            '/test/app1': {'instances': 2, 'tasksRunning': 2, 'tasksHealthy': 2, 'healthChecks': [{}]},
+            '/test/app2': {'instances': 2, 'tasksRunning': 2, 'tasksHealthy': 1, 'healthChecks': [{}]},
+            '/test/app3': {'instances': 1, 'tasksRunning': 1, 'tasksHealthy': 0, 'healthChecks': []},
+        }
+
+    def watcher(self, marathon):
+        return DeploymentWatcher('http://marathon', marathon, initial_interval=1.0, max_interval=4.0,
+                                 sleep=self.clock.sleep, clock=self.clock.time)
+
+    def test_wait_shares_one_poll_between_deployments(self):
+        marathon = FakeMarathon([
+            [deployment('d1', 1, ['/test/app1']), deployment('d2', 1, ['/test/app2'])],
+            [deployment('d1', 1, ['/test/app1']), deployment('d2', 1, ['/test/app2'])],
+            [deployment('d1', 1, ['/test/app1']), deployment('d2', 1, ['/test/app2'])],
+            [deployment('d2', 2, ['/test/app2'])],
+            [],
+        ], self.apps)
+        watcher = self.watcher(marathon)
+        watcher.add('app1', 'd1', ['/test/app1'])
+        watcher.add('app2', 'd2', ['/test/app2'])
+        progress = []
+        results = watcher.wait(timeout=60, on_progress=lambda name, item: progress.append(
+            (name, item['currentStep'])))
+        assert [(result.name, result.status) for result in results] == [('app1', 'succeeded'), ('app2', 'unhealthy')]
+        assert results[1].health['/test/app2'].healthy == 1
+        assert sorted(progress) == [('app1', 1), ('app2', 1), ('app2', 2)]
+        assert marathon.calls.count('http://marathon/v2/deployments') == 5
+        # backs off while nothing changes, back to the initial interval once something does
+        assert self.clock.sleeps == [1.0, 1.5, 2.25, 1.0]
+
+    def test_wait_for_deployment_already_over(self):
+        watcher = self.watcher(FakeMarathon([[]], self.apps))
+        watcher.add('app3', 'd3', ['/test/app3'])
+        results = watcher.wait(timeout=60)
+        assert results[0].status == 'succeeded'
+        assert results[0].apps == ['/test/app3']
+        assert self.clock.sleeps == []
+
+    def test_wait_for_missing_app_is_unhealthy(self):
+        watcher = self.watcher(FakeMarathon([[]], self.apps))
+        watcher.add('missing', 'd4', ['/test/missing'])
+        assert watcher.wait(timeout=60)[0].status == 'unhealthy'
+
+    def test_wait_times_out(self):
+        watcher = self.watcher(FakeMarathon([[deployment('d1', 1, ['/test/app1'])]], self.apps))
+        watcher.add('app1', 'd1', ['/test/app1'])
+        results = watcher.wait(timeout=20)
+        assert results[0].status == 'timeout'
+        assert self.clock.now == 20
+        assert max(self.clock.sleeps) == 4.0
+
+    def tearDown(self):
+        pass
+
+if __name__ == '__main__':
+    unittest.main()
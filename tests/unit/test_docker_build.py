@@ -5,7 +5,10 @@ import unittest
 import argparse
 import json
 import os
+import shutil
+import subprocess
 import sys
+import tempfile
 sys.path.insert(0, os.path.abspath(os.path.join(
     os.path.dirname(os.path.realpath(__file__)), os.pardir, "cli")))
 from cli.appconfig import AppConfig
@@ -13,11 +16,15 @@ from cli.settings import Settings
 from mockito import mock, when, verify
 from mockito.matchers import any
 from cli.dockerutils import DockerUtils
-from cli.docker_build import Docker
+from cli.docker_build import Docker, download_private_repos, private_repo_revisions, swaparoo_fetches_dependencies
 
 # Test basic functionalities of docker-build
 
 
+def git(*args, **kwargs):
+    return subprocess.check_output(('git',) + args, **kwargs).strip()
+
+
 class TestBuild(unittest.TestCase):
 
     def setUp(self):
@@ -54,6 +61,95 @@ class TestBuild(unittest.TestCase):
             raised_exception = True
         self.assertFalse(raised_exception)
 
+    def make_remote(self, work_dir, project):
+        remote = os.path.join(work_dir, 'remotes', project + '.git')
+        source = os.path.join(work_dir, 'sources', project)
+        git('init', '--bare', '-q', remote)
+        git('init', '-q', source)
+        git('config', 'user.email', 'test@example.com', cwd=source)
+        git('config', 'user.name', 'test', cwd=source)
+        self.commit(source, remote, 'first')
+        return remote, source
+
+    def commit(self, source, remote, name):
+        with open(os.path.join(source, name), 'w') as f:
+            f.write(name)
+        git('add', name, cwd=source)
+        git('commit', '-q', '-m', name, cwd=source)
+        git('push', '-q', remote, 'HEAD:refs/heads/master', cwd=source)
+
+    def download_private_repos(self, work_dir, mirror_dir, *args, **kwargs):
+        set_mirror_dir = os.environ.pop('ROGER_GIT_MIRROR_DIR', None)
+        if mirror_dir is not None:
+            os.environ['ROGER_GIT_MIRROR_DIR'] = mirror_dir
+        curdir = os.getcwd()
+        os.chdir(os.path.join(work_dir, 'build'))
+        try:
+            download_private_repos(*args, **kwargs)
+        finally:
+            os.chdir(curdir)
+            os.environ.pop('ROGER_GIT_MIRROR_DIR', None)
+            if set_mirror_dir is not None:
+                os.environ['ROGER_GIT_MIRROR_DIR'] = set_mirror_dir
+
+    def check_download_private_repos(self, use_mirror):
+        work_dir = tempfile.mkdtemp()
+        try:
+            os.makedirs(os.path.join(work_dir, 'build'))
+            mirror_dir = os.path.join(work_dir, 'mirrors') if use_mirror else None
+            remotes = [self.make_remote(work_dir, project) for project in ['gem1', 'gem2', 'gem3']]
+            projects = [remote for remote, source in remotes]
+            git_dir = os.path.join(work_dir, 'build', 'git')
+
+            self.download_private_repos(work_dir, mirror_dir, projects, 'v1', 2)
+            for project in ['gem1', 'gem2', 'gem3']:
+                assert os.path.exists(os.path.join(git_dir, project, 'first'))
+
+            remote, source = remotes[1]
+            self.commit(source, remote, 'second')
+            self.download_private_repos(work_dir, mirror_dir, projects, 'v2', 2)
+            assert os.path.exists(os.path.join(git_dir, 'gem2', 'second'))
+            assert os.path.isdir(os.path.join(work_dir, 'mirrors')) is use_mirror
+            assert private_repo_revisions(projects, git_dir) == dict(
+                (project, git('rev-parse', 'HEAD', cwd=source)) for project, (remote, source) in
+                zip(['gem1', 'gem2', 'gem3'], remotes))
+            assert private_repo_revisions(['missing'], git_dir) is None
+
+            with self.assertRaises(ValueError) as context:
+                self.download_private_repos(work_dir, mirror_dir,
+                                            projects + [os.path.join(work_dir, 'remotes', 'missing.git')], 'v3', 2)
+            assert 'missing' in str(context.exception)
+            with open(os.path.join(git_dir, '.roger_docker_build_update_id')) as f:
+                assert f.read() == 'v2'
+        finally:
+            shutil.rmtree(work_dir)
+
+    def test_download_private_repos(self):
+        self.check_download_private_repos(False)
+
+    def test_download_private_repos_with_mirror(self):
+        self.check_download_private_repos(True)
+
+    def test_swaparoo_fetches_dependencies(self):
+        work_dir = tempfile.mkdtemp()
+        try:
+            assert not swaparoo_fetches_dependencies(work_dir)
+            with open(os.path.join(work_dir, 'Gemfile'), 'w') as f:
+                f.write("gem 'rails'\n")
+            assert not swaparoo_fetches_dependencies(work_dir)
+            with open(os.path.join(work_dir, 'Gemfile'), 'a') as f:
+                f.write("gem 'gem1', git: 'git@github.com:seomoz/gem1.git', branch: 'feature'\n")
+            assert swaparoo_fetches_dependencies(work_dir)
+            # the package.json swaparoo is picked over the Gemfile one
+            with open(os.path.join(work_dir, 'package.json'), 'w') as f:
+                json.dump({'dependencies': {'express': '^4.0.0'}}, f)
+            assert not swaparoo_fetches_dependencies(work_dir)
+            with open(os.path.join(work_dir, 'package.json'), 'w') as f:
+                json.dump({'dependencies': {'module1': 'git+ssh://git@github.com:seomoz/module1.git'}}, f)
+            assert swaparoo_fetches_dependencies(work_dir)
+        finally:
+            shutil.rmtree(work_dir)
+
     def tearDown(self):
         pass
 
@@ -0,0 +1,247 @@
+#!/usr/bin/python
+
+from __future__ import print_function
+import unittest
+import BaseHTTPServer
+import SocketServer
+import base64
+import json
+import os
+import shutil
+import sys
+import tarfile
+import tempfile
+import threading
+import time
+import urlparse
+from StringIO import StringIO
+sys.path.insert(0, os.path.abspath(os.path.join(
+    os.path.dirname(os.path.realpath(__file__)), os.pardir, "cli")))
+from cli.dockerapi import DockerClient, DockerError, split_image, registry_host, read_registry_auth
+from cli.dockerutils import DockerUtils
+
+# Test basic functionalities of DockerClient class against a fake docker daemon
+
+
+class FakeDockerHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_events(self, events, delay=0):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        self.wfile.flush()
+        time.sleep(delay)
+        body = ''.join(json.dumps(event) + '\r\n' for event in events)
+        # split the events across chunks of arbitrary size
+        for start in range(0, len(body), 50):
+            chunk = body[start:start + 50]
+            self.wfile.write('{:x}\r\n{}\r\n'.format(len(chunk), chunk))
+        self.wfile.write('0\r\n\r\n')
+
+    def do_POST(self):
+        url = urlparse.urlparse(self.path)
+        params = dict(urlparse.parse_qsl(url.query))
+        body = self.rfile.read(int(self.headers.getheader('Content-Length', '0')))
+        self.server.requests.append((url.path, params, dict(self.headers), body))
+        if url.path == '/build':
+            if 'slow' in params['t']:
+                # longer than the client's timeout between two events
+                self.send_events([{'stream': 'Step 1/1 : RUN sleep 1\n'}], delay=1)
+                return
+            if 'broken' in params['t']:
+                self.send_events([{'stream': 'Step 1/1 : RUN false\n'},
+                                  {'errorDetail': {'code': 1}, 'error': "The command '/bin/sh -c false' returned "
+                                                                        "a non-zero code: 1"}])
+                return
+            self.send_events([{'stream': 'Step 1/2 : FROM scratch\n'},
+                              {'stream': ' ---> 0123456789ab\n'},
+                              {'stream': 'Step 2/2 : COPY . /app\n'},
+                              {'aux': {'ID': 'sha256:abcdef'}},
+                              {'stream': 'Successfully built abcdef\n'},
+                              {'stream': 'Successfully tagged {}\n'.format(params['t'])}])
+        elif url.path.endswith('/tag'):
+            if url.path.startswith('/images/missing'):
+                self.send_response(404)
+                message = json.dumps({'message': 'No such image: missing'})
+                self.send_header('Content-Length', str(len(message)))
+                self.end_headers()
+                self.wfile.write(message)
+                return
+            self.send_response(201)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+        elif url.path.endswith('/push'):
+            if url.path.startswith('/images/missing'):
+                self.send_response(404)
+                message = json.dumps({'message': 'No such image: missing'})
+                self.send_header('Content-Length', str(len(message)))
+                self.end_headers()
+                self.wfile.write(message)
+                return
+            self.send_events([{'status': 'The push refers to repository [example.com:5000/app/v0.1.0]'},
+                              {'status': 'Preparing', 'progressDetail': {}, 'id': 'layer1'},
+                              {'status': 'Preparing', 'progressDetail': {}, 'id': 'layer2'},
+                              {'status': 'Pushing', 'progressDetail': {'current': 512, 'total': 1024},
+                               'id': 'layer1'},
+                              {'status': 'Layer already exists', 'progressDetail': {}, 'id': 'layer2'},
+                              {'status': 'Pushed', 'progressDetail': {}, 'id': 'layer1'},
+                              {'status': 'latest: digest: sha256:123 size: 528'},
+                              {'progressDetail': {}, 'aux': {'Tag': 'latest', 'Digest': 'sha256:123', 'Size': 528}}])
+
+
+class FakeDockerDaemon(SocketServer.ThreadingMixIn, SocketServer.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path):
+        SocketServer.UnixStreamServer.__init__(self, path, FakeDockerHandler)
+        self.requests = []
+
+
+class TestDockerClient(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        self.socket_path = os.path.join(self.work_dir, 'docker.sock')
+        self.daemon = FakeDockerDaemon(self.socket_path)
+        self.thread = threading.Thread(target=self.daemon.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        self.client = DockerClient('unix://' + self.socket_path,
+                                   docker_config=os.path.join(self.work_dir, 'missing.json'))
+        self.context_dir = os.path.join(self.work_dir, 'context')
+        os.makedirs(os.path.join(self.context_dir, 'logs'))
+        for path, content in [('Dockerfile', 'FROM scratch\nCOPY . /app\n'), ('app.py', 'print("hello")\n'),
+                              ('logs/debug.log', 'debug\n'), ('.dockerignore', 'logs\n')]:
+            with open(os.path.join(self.context_dir, path), 'w') as f:
+                f.write(content)
+
+    def test_split_image(self):
+        assert split_image('example.com:5000/app/v0.1.0') == ('example.com:5000/app/v0.1.0', 'latest')
+        assert split_image('example.com:5000/app:1.0') == ('example.com:5000/app', '1.0')
+        assert split_image('app') == ('app', 'latest')
+
+    def test_build(self):
+        events = []
+        result = self.client.build(self.context_dir, 'example.com:5000/app/v0.1.0', build_args={'VERSION': '1'},
+                                   labels={'roger.build.fingerprint': 'abc'}, cache_from=['example.com:5000/app/v0.0.9'],
+                                   on_event=events.append)
+        assert result.image_id == 'sha256:abcdef'
+        assert [(step.step, step.command) for step in result.steps] == [(1, 'FROM scratch'), (2, 'COPY . /app')]
+        assert len(events) == 6
+        path, params, headers, body = self.daemon.requests[0]
+        assert path == '/build'
+        assert params['t'] == 'example.com:5000/app/v0.1.0'
+        assert params['dockerfile'] == 'Dockerfile'
+        assert json.loads(params['buildargs']) == {'VERSION': '1'}
+        assert json.loads(params['labels']) == {'roger.build.fingerprint': 'abc'}
+        assert json.loads(params['cachefrom']) == ['example.com:5000/app/v0.0.9']
+        names = tarfile.open(fileobj=StringIO(body)).getnames()
+        assert sorted(names) == ['.dockerignore', 'Dockerfile', 'app.py']
+
+    def test_build_failure(self):
+        with self.assertRaises(DockerError) as context:
+            self.client.build(self.context_dir, 'broken')
+        assert 'returned a non-zero code' in str(context.exception)
+
+    def test_push(self):
+        result = self.client.push('example.com:5000/app/v0.1.0')
+        assert result.digest == 'sha256:123'
+        assert [(layer.layer, layer.status) for layer in result.layers] == \
+            [('layer2', 'Layer already exists'), ('layer1', 'Pushed')]
+        path, params, headers, body = self.daemon.requests[0]
+        assert path == '/images/example.com:5000/app/v0.1.0/push'
+        assert params == {'tag': 'latest'}
+        assert 'x-registry-auth' in headers
+
+    def test_tag(self):
+        self.client.tag('example.com:5000/app/v0.1.0', 'example.com:5000/app-fingerprints:abc')
+        path, params, headers, body = self.daemon.requests[0]
+        assert path == '/images/example.com:5000/app/v0.1.0/tag'
+        assert params == {'repo': 'example.com:5000/app-fingerprints', 'tag': 'abc'}
+        with self.assertRaises(DockerError) as context:
+            self.client.tag('missing', 'example.com:5000/app-fingerprints:abc')
+        assert 'No such image: missing' in str(context.exception)
+
+    def test_streams_have_no_read_timeout(self):
+        client = DockerClient('unix://' + self.socket_path, timeout=0.2)
+        result = client.build(self.context_dir, 'slow')
+        assert [(step.step, step.command) for step in result.steps] == [(1, 'RUN sleep 1')]
+
+    def test_connection_errors(self):
+        client = DockerClient('unix://' + os.path.join(self.work_dir, 'missing.sock'))
+        with self.assertRaises(DockerError) as context:
+            client.push('example.com:5000/app/v0.1.0')
+        assert 'unable to talk to docker' in str(context.exception)
+
+    def write_docker_config(self, config):
+        path = os.path.join(self.work_dir, 'config.json')
+        with open(path, 'w') as f:
+            json.dump(config, f)
+        return path
+
+    def test_push_sends_registry_auth(self):
+        path = self.write_docker_config({'auths': {'https://example.com:5000': {
+            'auth': base64.b64encode('user:secret:pass')}}})
+        DockerClient('unix://' + self.socket_path, docker_config=path).push('example.com:5000/app/v0.1.0')
+        headers = self.daemon.requests[0][2]
+        assert json.loads(base64.urlsafe_b64decode(headers['x-registry-auth'])) == \
+            {'username': 'user', 'password': 'secret:pass', 'serveraddress': 'example.com:5000'}
+
+    def test_read_registry_auth(self):
+        assert registry_host('example.com:5000/app/v0.1.0') == 'example.com:5000'
+        assert registry_host('app/v0.1.0') == 'https://index.docker.io/v1/'
+        assert read_registry_auth('example.com:5000', os.path.join(self.work_dir, 'missing.json')) == {}
+        path = self.write_docker_config({'auths': {'example.com:5000': {'identitytoken': 'token'},
+                                                   'other.com': {}},
+                                         'credsStore': 'desktop'})
+        assert read_registry_auth('example.com:5000', path) == {'identitytoken': 'token',
+                                                                'serveraddress': 'example.com:5000'}
+        assert read_registry_auth('unknown.com', path) == {}
+        with self.assertRaises(DockerError) as context:
+            read_registry_auth('other.com', path)
+        assert 'credential helper' in str(context.exception)
+
+    def test_push_error(self):
+        with self.assertRaises(DockerError) as context:
+            self.client.push('missing')
+        assert 'No such image: missing' in str(context.exception)
+
+    def test_docker_utils_api_backend(self):
+        set_backend = os.environ.get('ROGER_DOCKER_BACKEND')
+        set_docker_host = os.environ.get('DOCKER_HOST')
+        set_docker_config = os.environ.get('DOCKER_CONFIG')
+        os.environ['ROGER_DOCKER_BACKEND'] = 'api'
+        os.environ['DOCKER_HOST'] = 'unix://' + self.socket_path
+        os.environ['DOCKER_CONFIG'] = self.work_dir
+        curdir = os.getcwd()
+        try:
+            os.chdir(self.context_dir)
+            docker_utils = DockerUtils(session_pool=object(), cache_dir=self.work_dir)
+            docker_utils.docker_build('example.com:5000/app/v0.1.0', 'Dockerfile', False, {})
+            with self.assertRaises(ValueError):
+                docker_utils.docker_build('broken', 'Dockerfile', False, {})
+            assert docker_utils.docker_push('example.com:5000/app/v0.1.0', False) == 0
+            assert docker_utils.docker_push('missing', False) == 1
+            assert docker_utils.docker_tag('example.com:5000/app/v0.1.0', 'example.com:5000/app:abc', False) == 0
+            assert docker_utils.docker_tag('missing', 'example.com:5000/app:abc', False) == 1
+        finally:
+            os.chdir(curdir)
+            for key, value in [('ROGER_DOCKER_BACKEND', set_backend), ('DOCKER_HOST', set_docker_host),
+                               ('DOCKER_CONFIG', set_docker_config)]:
+                if value is None:
+                    del os.environ[key]
+                else:
+                    os.environ[key] = value
+
+    def tearDown(self):
+        self.daemon.shutdown()
+        self.daemon.server_close()
+        shutil.rmtree(self.work_dir)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+#!/usr/bin/python
+
+from __future__ import print_function
+import unittest
+import os
+import shutil
+import sys
+import tempfile
+sys.path.insert(0, os.path.abspath(os.path.join(
+    os.path.dirname(os.path.realpath(__file__)), os.pardir, "cli")))
+from tests.helper import FakeRegistry
+from cli.dockerutils import DockerUtils, CatalogSnapshot
+
+# Test basic functionalities of DockerUtils class
+
+
+class TestDockerUtils(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.repositories = ['app-{}/v0.1.0'.format(index) for index in range(5)]
+
+    def docker_utils(self, registry):
+        return DockerUtils(session_pool=registry, cache_dir=self.cache_dir)
+
+    def test_iter_catalog_follows_link_header(self):
+        registry = FakeRegistry(self.repositories)
+        assert list(self.docker_utils(registry).iter_catalog('example.com:5000')) == self.repositories
+        assert [url for url, headers in registry.calls] == [
+            'http://example.com:5000/v2/_catalog?n=1000',
+            'http://example.com:5000/v2/_catalog?last=app-1%2Fv0.1.0&n=2',
+            'http://example.com:5000/v2/_catalog?last=app-3%2Fv0.1.0&n=2'
+        ]
+
+    def test_iter_catalog_without_link_header(self):
+        registry = FakeRegistry(self.repositories, page_size=2, links=False)
+        catalog = self.docker_utils(registry).iter_catalog('example.com:5000', page_size=2)
+        assert list(catalog) == self.repositories
+
+    def test_iter_catalog_stops_early(self):
+        registry = FakeRegistry(self.repositories)
+        for repository in self.docker_utils(registry).iter_catalog('example.com:5000', last='app-0'):
+            if repository == 'app-1/v0.1.0':
+                break
+        assert len(registry.calls) == 1
+        assert registry.calls[0][0] == 'http://example.com:5000/v2/_catalog?n=1000&last=app-0'
+
+    def test_catalog_pages_are_revalidated_with_etag(self):
+        registry = FakeRegistry(self.repositories[:2], etag='"abc"')
+        assert list(self.docker_utils(registry).iter_catalog('example.com:5000')) == self.repositories[:2]
+        assert list(self.docker_utils(registry).iter_catalog('example.com:5000')) == self.repositories[:2]
+        assert registry.calls[0][1] == {}
+        assert registry.calls[1][1] == {'If-None-Match': '"abc"'}
+
+    def test_docker_search_v2(self):
+        registry = FakeRegistry(self.repositories)
+        assert self.docker_utils(registry).docker_search_v2('example.com:5000') == \
+            '\n'.join(self.repositories) + '\n'
+        # the registry sends no ETag, the second search only lists what sorts after the snapshot
+        registry.calls = []
+        assert self.docker_utils(registry).docker_search_v2('example.com:5000') == \
+            '\n'.join(self.repositories) + '\n'
+        assert [url for url, headers in registry.calls] == [
+            'http://example.com:5000/v2/_catalog?n=1000&last=app-4%2Fv0.1.0']
+
+    def test_catalog_snapshot(self):
+        registry = FakeRegistry(self.repositories[:3])
+        path = os.path.join(self.cache_dir, 'catalog.json')
+        snapshot = CatalogSnapshot('example.com:5000', self.docker_utils(registry), path, ttl=3600)
+        assert snapshot.refresh() == self.repositories[:3]
+        registry.repositories = ['app-0-new/v0.1.0'] + self.repositories
+        registry.calls = []
+        snapshot = CatalogSnapshot('example.com:5000', self.docker_utils(registry), path, ttl=3600)
+        assert snapshot.refresh() == self.repositories
+        assert registry.calls[0][0] == 'http://example.com:5000/v2/_catalog?n=1000&last=app-2%2Fv0.1.0'
+        assert snapshot.search('app-3') == ['app-3/v0.1.0']
+        assert snapshot.search('other') == []
+        # names in the middle of the catalog need a full crawl, done once the snapshot is too old
+        assert snapshot.refresh(full=True) == registry.repositories
+        snapshot = CatalogSnapshot('example.com:5000', self.docker_utils(registry), path, ttl=0)
+        registry.calls = []
+        assert snapshot.refresh() == registry.repositories
+        assert registry.calls[0][0] == 'http://example.com:5000/v2/_catalog?n=1000'
+
+    def test_image_exists(self):
+        docker_utils = self.docker_utils(FakeRegistry(self.repositories))
+        assert docker_utils.image_exists('example.com:5000', 'app-1/v0.1.0') is True
+        assert docker_utils.image_exists('example.com:5000', 'app-9/v0.1.0') is False
+
+    def test_image_labels(self):
+        registry = FakeRegistry(self.repositories, images={('app-fingerprints', 'abc'): {'roger.build.tag': 'app-1'}})
+        docker_utils = self.docker_utils(registry)
+        assert docker_utils.image_labels('example.com:5000', 'app-fingerprints', 'abc') == {'roger.build.tag': 'app-1'}
+        assert registry.calls[0][1] == {'Accept': 'application/vnd.docker.distribution.manifest.v2+json'}
+        assert registry.calls[1][0] == 'http://example.com:5000/v2/app-fingerprints/blobs/sha256:app-fingerprints:abc'
+        assert docker_utils.image_labels('example.com:5000', 'app-fingerprints', 'def') is None
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+if __name__ == '__main__':
+    unittest.main()
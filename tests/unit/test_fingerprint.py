@@ -0,0 +1,82 @@
+#!/usr/bin/python
+
+from __future__ import print_function
+import unittest
+import os
+import shutil
+import sys
+import tempfile
+sys.path.insert(0, os.path.abspath(os.path.join(
+    os.path.dirname(os.path.realpath(__file__)), os.pardir, "cli")))
+from cli.fingerprint import build_fingerprint, fingerprint_repository, compile_pattern, is_ignored, read_dockerignore
+
+# Test basic functionalities of the fingerprint module
+
+
+class TestFingerprint(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        self.context_dir = os.path.join(self.work_dir, 'context')
+        self.write('Dockerfile', 'FROM scratch\nCOPY . /app\n')
+        self.write('app.py', 'print("hello")\n')
+        self.write('logs/debug.log', 'debug\n')
+
+    def write(self, path, content):
+        path = os.path.join(self.context_dir, path)
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, 'w') as f:
+            f.write(content)
+
+    def fingerprint(self, build_args=None, project_shas=None):
+        return build_fingerprint(self.context_dir, 'Dockerfile', build_args or {}, project_shas or {})
+
+    def test_compile_pattern(self):
+        assert compile_pattern('*.log').match('debug.log')
+        assert not compile_pattern('*.log').match('logs/debug.log')
+        assert compile_pattern('**/*.log').match('logs/debug.log')
+        assert compile_pattern('**/*.log').match('debug.log')
+        assert compile_pattern('logs/?.txt').match('logs/a.txt')
+
+    def test_is_ignored(self):
+        self.write('.dockerignore', '# comment\nlogs\n*.pyc\n!keep.pyc\n')
+        rules = read_dockerignore(self.context_dir)
+        assert is_ignored('logs/debug.log', rules)
+        assert is_ignored('app.pyc', rules)
+        assert not is_ignored('keep.pyc', rules)
+        assert not is_ignored('app.py', rules)
+
+    def test_fingerprint_changes_with_inputs(self):
+        fingerprint = self.fingerprint()
+        assert self.fingerprint() == fingerprint
+        assert self.fingerprint({'VERSION': '1'}) != fingerprint
+        assert self.fingerprint(project_shas={'gem1': 'a' * 40}) != fingerprint
+        self.write('app.py', 'print("bye")\n')
+        assert self.fingerprint() != fingerprint
+
+    def test_fingerprint_respects_dockerignore(self):
+        self.write('.dockerignore', 'logs\n.dockerignore\nDockerfile\n')
+        fingerprint = self.fingerprint()
+        self.write('logs/debug.log', 'more debug\n')
+        self.write('.git/HEAD', 'ref: refs/heads/master\n')
+        assert self.fingerprint() == fingerprint
+        # the Dockerfile is always part of the context
+        self.write('Dockerfile', 'FROM scratch\n')
+        assert self.fingerprint() != fingerprint
+
+    def test_fingerprint_skips_private_repos(self):
+        self.write('git/.roger_docker_build_update_id', 'v1')
+        fingerprint = self.fingerprint()
+        self.write('git/gem1/lib.rb', 'puts 1\n')
+        assert self.fingerprint() == fingerprint
+
+    def test_fingerprint_repository(self):
+        # no /v<version>, the version resolver doesn't take it for a version of the app
+        assert fingerprint_repository('test-app-grafana') == 'test-app-grafana-fingerprints'
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+#!/usr/bin/python
+
+from __future__ import print_function
+import unittest
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+sys.path.insert(0, os.path.abspath(os.path.join(
+    os.path.dirname(os.path.realpath(__file__)), os.pardir, "cli")))
+from cli.gitmirror import GitMirror, get_clone_dir_name
+
+# Test basic functionalities of the GitMirror class
+
+
+def git(*args, **kwargs):
+    return subprocess.check_output(('git',) + args, **kwargs).strip()
+
+
+class TestGitMirror(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        self.remote = os.path.join(self.work_dir, 'remote', 'test-app.git')
+        self.source = os.path.join(self.work_dir, 'source')
+        git('init', '--bare', '-q', self.remote)
+        git('init', '-q', self.source)
+        git('config', 'user.email', 'test@example.com', cwd=self.source)
+        git('config', 'user.name', 'test', cwd=self.source)
+        self.commit('app.json', '{"name": "test-app"}')
+        git('push', '-q', self.remote, 'HEAD:refs/heads/master', cwd=self.source)
+        self.mirror = GitMirror(os.path.join(self.work_dir, 'mirrors'))
+
+    def commit(self, name, content):
+        with open(os.path.join(self.source, name), 'w') as f:
+            f.write(content)
+        git('add', name, cwd=self.source)
+        git('commit', '-q', '-m', 'add {}'.format(name), cwd=self.source)
+
+    def test_get_clone_dir_name(self):
+        assert get_clone_dir_name('git@github.com:seomoz/test-app.git') == 'test-app'
+        assert get_clone_dir_name('https://github.com/seomoz/test-app') == 'test-app'
+        assert get_clone_dir_name('git@example.com:test-app.git') == 'test-app'
+
+    def test_isEnabled(self):
+        assert self.mirror.isEnabled() is True
+
+    def test_checkout(self):
+        target_dir = os.path.join(self.work_dir, 'checkout')
+        assert self.mirror.checkout(self.remote, 'master', target_dir) == 0
+        assert os.path.exists(os.path.join(target_dir, 'app.json'))
+        assert os.path.isdir(self.mirror.getPath(self.remote))
+        assert git('config', 'remote.origin.url', cwd=target_dir) == self.remote
+
+    def test_checkout_fetches_new_commits(self):
+        assert self.mirror.checkout(self.remote, 'master', os.path.join(self.work_dir, 'first')) == 0
+        self.commit('app.yml', 'name: test-app\n')
+        git('push', '-q', self.remote, 'HEAD:refs/heads/master', cwd=self.source)
+        target_dir = os.path.join(self.work_dir, 'second')
+        assert self.mirror.checkout(self.remote, 'master', target_dir) == 0
+        assert os.path.exists(os.path.join(target_dir, 'app.yml'))
+        assert git('rev-parse', 'HEAD', cwd=target_dir) == git('rev-parse', 'HEAD', cwd=self.source)
+
+    def test_checkout_unknown_repo(self):
+        target_dir = os.path.join(self.work_dir, 'checkout')
+        assert self.mirror.checkout(os.path.join(self.work_dir, 'missing.git'), 'master', target_dir) != 0
+        assert not os.path.exists(target_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir)
+
+if __name__ == '__main__':
+    unittest.main()
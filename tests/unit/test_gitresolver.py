@@ -0,0 +1,75 @@
+#!/usr/bin/python
+
+from __future__ import print_function
+import unittest
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+sys.path.insert(0, os.path.abspath(os.path.join(
+    os.path.dirname(os.path.realpath(__file__)), os.pardir, "cli")))
+from cli.gitmirror import GitMirror
+from cli.gitresolver import GitShaResolver, parse_ls_remote
+
+# Test basic functionalities of the GitShaResolver class
+
+
+def git(*args, **kwargs):
+    return subprocess.check_output(('git',) + args, **kwargs).strip()
+
+
+class TestGitShaResolver(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        self.remote = os.path.join(self.work_dir, 'test-app.git')
+        self.source = os.path.join(self.work_dir, 'source')
+        git('init', '--bare', '-q', self.remote)
+        git('init', '-q', self.source)
+        git('config', 'user.email', 'test@example.com', cwd=self.source)
+        git('config', 'user.name', 'test', cwd=self.source)
+        self.mirror = GitMirror(os.path.join(self.work_dir, 'mirrors'))
+        self.cache_dir = os.path.join(self.work_dir, 'cache')
+
+    def push(self, message):
+        git('commit', '-q', '--allow-empty', '-m', message, cwd=self.source)
+        git('push', '-q', self.remote, 'HEAD:refs/heads/master', cwd=self.source)
+        return git('rev-parse', 'HEAD', cwd=self.source)
+
+    def test_parse_ls_remote(self):
+        output = "\n".join([
+            "{}\trefs/heads/master".format('a' * 40),
+            "{}\trefs/tags/v1".format('b' * 40),
+            "{}\trefs/tags/v1^{{}}".format('c' * 40)])
+        assert parse_ls_remote(output, 'master') == 'a' * 40
+        assert parse_ls_remote(output, 'v1') == 'c' * 40
+        assert parse_ls_remote(output, 'missing') is None
+
+    def test_resolve(self):
+        sha = self.push('first')
+        resolver = GitShaResolver(self.mirror, 30, self.cache_dir)
+        assert resolver.resolve(self.remote, 'master') == sha
+        assert resolver.resolve(self.remote, 'missing') is None
+        assert resolver.resolve(self.remote, 'd' * 40) == 'd' * 40
+
+    def test_resolve_caches_for_ttl(self):
+        sha = self.push('first')
+        assert GitShaResolver(self.mirror, 30, self.cache_dir).resolve(self.remote, 'master') == sha
+        new_sha = self.push('second')
+        assert GitShaResolver(self.mirror, 30, self.cache_dir).resolve(self.remote, 'master') == sha
+        assert GitShaResolver(self.mirror, 0, self.cache_dir).resolve(self.remote, 'master') == new_sha
+
+    def test_resolve_falls_back_to_mirror(self):
+        sha = self.push('first')
+        assert self.mirror.update(self.remote) == 0
+        shutil.rmtree(self.remote)
+        assert GitShaResolver(self.mirror, 0, self.cache_dir).resolve(self.remote, 'master') == sha
+        assert GitShaResolver(GitMirror(os.path.join(self.work_dir, 'empty')), 0,
+                              self.cache_dir).resolve(self.remote, 'master') is None
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+#!/usr/bin/python
+
+from __future__ import print_function
+import unittest
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+sys.path.insert(0, os.path.abspath(os.path.join(
+    os.path.dirname(os.path.realpath(__file__)), os.pardir, "cli")))
+from cli.gitmirror import GitMirror
+from cli.gitresolver import GitShaResolver
+from cli.gitsparse import SparseCheckout, sparse_patterns
+
+# Test basic functionalities of the SparseCheckout class
+
+
+def git(*args, **kwargs):
+    return subprocess.check_output(('git',) + args, **kwargs).strip()
+
+
+class TestSparseCheckout(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        remote = os.path.join(self.work_dir, 'remote', 'test-app.git')
+        self.remote = 'file://' + remote
+        self.source = os.path.join(self.work_dir, 'source')
+        git('init', '--bare', '-q', remote)
+        git('config', 'uploadpack.allowFilter', 'true', cwd=remote)
+        git('symbolic-ref', 'HEAD', 'refs/heads/master', cwd=remote)
+        git('init', '-q', self.source)
+        git('config', 'user.email', 'test@example.com', cwd=self.source)
+        git('config', 'user.name', 'test', cwd=self.source)
+        self.commit('framework/prod/test-app-web.json', '{"id": "/test/web"}')
+        self.commit('config/vars.yml', 'name: test-app\n')
+        self.commit('src/app.py', 'print("hello")\n')
+        self.push()
+        resolver = GitShaResolver(mirror=GitMirror(None), ttl=0, cache_dir=self.work_dir)
+        self.sparse = SparseCheckout(os.path.join(self.work_dir, 'cache'), resolver)
+
+    def commit(self, name, content):
+        path = os.path.join(self.source, name)
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, 'w') as f:
+            f.write(content)
+        git('add', name, cwd=self.source)
+        git('commit', '-q', '-m', 'add {}'.format(name), cwd=self.source)
+
+    def push(self):
+        git('push', '-q', self.remote, 'HEAD:refs/heads/master', cwd=self.source)
+        return git('rev-parse', 'HEAD', cwd=self.source)
+
+    def test_sparse_patterns(self):
+        assert sparse_patterns(['framework/prod/', '/config/vars.yml', '']) == ['/framework/prod', '/config/vars.yml']
+
+    def test_checkout(self):
+        target_dir = os.path.join(self.work_dir, 'checkout')
+        commit = self.sparse.checkout(self.remote, None, ['framework/prod', 'config/vars.yml'], target_dir)
+        assert commit == git('rev-parse', 'HEAD', cwd=self.source)
+        assert os.path.exists(os.path.join(target_dir, 'framework', 'prod', 'test-app-web.json'))
+        assert os.path.exists(os.path.join(target_dir, 'config', 'vars.yml'))
+        assert not os.path.exists(os.path.join(target_dir, 'src'))
+        assert not os.path.exists(os.path.join(target_dir, '.git'))
+
+    def test_checkout_is_cached_by_commit(self):
+        paths = ['framework/prod']
+        first = self.sparse.checkout(self.remote, 'master', paths, os.path.join(self.work_dir, 'first'))
+        # the cached checkout is used while the branch doesn't move, even if the remote is gone
+        remote = self.remote[len('file://'):]
+        shutil.move(remote, remote + '.moved')
+        self.sparse.resolver.lsRemote = lambda repo_url, branch: first
+        assert self.sparse.checkout(self.remote, 'master', paths, os.path.join(self.work_dir, 'second')) == first
+        assert os.path.exists(os.path.join(self.work_dir, 'second', 'framework', 'prod', 'test-app-web.json'))
+        shutil.move(remote + '.moved', remote)
+        del self.sparse.resolver.lsRemote
+        self.commit('framework/prod/test-app-worker.json', '{"id": "/test/worker"}')
+        second = self.push()
+        assert self.sparse.checkout(self.remote, 'master', paths, os.path.join(self.work_dir, 'third')) == second
+        assert os.path.exists(os.path.join(self.work_dir, 'third', 'framework', 'prod', 'test-app-worker.json'))
+        assert sorted(os.listdir(self.sparse.getRepoDir(self.remote))) == sorted(
+            os.path.basename(self.sparse.getCachePath(self.remote, commit, paths)) for commit in [first, second])
+
+    def test_prune(self):
+        for index in range(3):
+            self.commit('framework/prod/app{}.json'.format(index), '{}')
+            self.push()
+            self.sparse.checkout(self.remote, 'master', ['framework'], os.path.join(self.work_dir, str(index)))
+        repo_dir = self.sparse.getRepoDir(self.remote)
+        self.sparse.prune(repo_dir, keep=1)
+        assert os.listdir(repo_dir) == [os.path.basename(self.sparse.getCachePath(
+            self.remote, git('rev-parse', 'HEAD', cwd=self.source), ['framework']))]
+
+    def test_checkout_failure(self):
+        with self.assertRaises(subprocess.CalledProcessError):
+            self.sparse.checkout(self.remote, 'missing', ['framework'], os.path.join(self.work_dir, 'checkout'))
+        assert os.listdir(self.sparse.getRepoDir(self.remote)) == []
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir)
+
+if __name__ == '__main__':
+    unittest.main()
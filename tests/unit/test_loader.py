@@ -0,0 +1,69 @@
+#!/usr/bin/python
+
+from __future__ import print_function
+import unittest
+import os
+import shutil
+import sys
+import tempfile
+sys.path.insert(0, os.path.abspath(os.path.join(
+    os.path.dirname(os.path.realpath(__file__)), os.pardir, "cli")))
+from cli import loader
+
+# Test basic functionalities of the loader module
+
+
+class TestLoader(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        self.set_cache_dir = os.environ.get('ROGER_CACHE_DIR')
+        os.environ['ROGER_CACHE_DIR'] = os.path.join(self.work_dir, 'cache')
+        self.cache_dir = os.path.join(self.work_dir, 'cache', 'parsed')
+
+    def write(self, name, content):
+        path = os.path.join(self.work_dir, name)
+        with open(path, 'w') as f:
+            f.write(content)
+        return path
+
+    def test_load_yaml_and_json(self):
+        assert loader.load(self.write('app.yml', 'name: test-app\napps: {}\n')) == {'name': 'test-app', 'apps': {}}
+        assert loader.load(self.write('roger-mesos-tools.config', 'registry: example.com:5000\n')) == \
+            {'registry': 'example.com:5000'}
+        assert loader.load(self.write('app.json', '{"name": "test-app"}')) == {'name': 'test-app'}
+
+    def test_load_uses_parse_cache(self):
+        path = self.write('app.yml', 'name: test-app\n')
+        assert loader.load(path) == {'name': 'test-app'}
+        entries = os.listdir(self.cache_dir)
+        assert len(entries) == 1
+        # a cached entry is returned without parsing the file again
+        loader.write_cache(os.path.join(self.cache_dir, entries[0]), {'name': 'cached'})
+        assert loader.load(path) == {'name': 'cached'}
+        # changed contents have a different key
+        self.write('app.yml', 'name: other-test-app\n')
+        assert loader.load(path) == {'name': 'other-test-app'}
+        assert len(os.listdir(self.cache_dir)) == 2
+
+    def test_load_ignores_broken_cache_entries(self):
+        path = self.write('app.yml', 'name: test-app\n')
+        loader.load(path)
+        entry = os.path.join(self.cache_dir, os.listdir(self.cache_dir)[0])
+        with open(entry, 'w') as f:
+            f.write('not a pickle')
+        assert loader.load(path) == {'name': 'test-app'}
+
+    def test_load_without_cache(self):
+        assert loader.load(self.write('secrets.yml', 'password: secret\n'), cache=False) == {'password': 'secret'}
+        assert not os.path.exists(self.cache_dir)
+
+    def tearDown(self):
+        if self.set_cache_dir is None:
+            del os.environ['ROGER_CACHE_DIR']
+        else:
+            os.environ['ROGER_CACHE_DIR'] = self.set_cache_dir
+        shutil.rmtree(self.work_dir)
+
+if __name__ == '__main__':
+    unittest.main()
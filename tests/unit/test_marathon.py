@@ -5,16 +5,39 @@ import unittest
 import json
 import os
 import sys
+import tempfile
 import requests
 sys.path.insert(0, os.path.abspath(os.path.join(
     os.path.dirname(os.path.realpath(__file__)), os.pardir, "cli")))
-from cli.marathon import Marathon
+from cli.marathon import Marathon, get_instance_details, get_app_envs
 from cli.appconfig import AppConfig
+from cli.sessionpool import SessionPool
 from mockito import mock, when
+from tests.helper import FakeResponse
 
 # Test basic functionalities of MarathonValidator class
 
 
+class FakeAppConfig(object):
+
+    def __init__(self, roger_env):
+        self.roger_env = roger_env
+
+    def getRogerEnv(self, config_dir):
+        return self.roger_env
+
+
+class FakeSessionPool(object):
+
+    def __init__(self, responses):
+        self.responses = responses
+        self.calls = []
+
+    def get(self, url, **kwargs):
+        self.calls.append(url)
+        return self.responses[url]
+
+
 class TestMarathon(unittest.TestCase):
 
     def setUp(self):
@@ -81,11 +104,12 @@ class TestMarathon(unittest.TestCase):
         config_file = 'test.yml'
 
         app_config_object = mock(AppConfig)
+        session_pool = mock(SessionPool)
         when(app_config_object).getRogerEnv(config_dir).thenReturn(data)
-        when(requests).get(url, auth=(username, password)).thenReturn(res)
+        when(session_pool).get(url, auth=(username, password)).thenReturn(res)
         when(res).json().thenReturn(image_data)
 
-        m = Marathon()
+        m = Marathon(session_pool=session_pool)
         img = m.get_image_name(
             username,
             password,
@@ -97,6 +121,66 @@ class TestMarathon(unittest.TestCase):
         )
         assert img == image_data['app']['container']['docker']['image']
 
+    def test_get_image_names(self):
+        apps = {'apps': [
+            {'id': '/test/app1', 'container': {'docker': {'image': 'registry:5000/app1/v1.0'}}},
+            {'id': '/test/app2', 'container': {'docker': {'image': 'registry:5000/app2/v2.0'}}},
+            {'id': '/test/cmd', 'container': None},
+        ]}
+        session_pool = FakeSessionPool({'https://example.com/v2/apps?id=/test/app': FakeResponse(200, apps),
+                                        'https://example.com/v2/apps?id=/test/': FakeResponse(200, apps)})
+        app_config = FakeAppConfig({'environments': {'dev': {'marathon_endpoint': 'https://example.com'}}})
+        m = Marathon(session_pool=session_pool)
+        images = m.get_image_names('user', 'pass', 'dev', ['test/app1', '/test/app2'], '/vagrant/config',
+                                   'test.yml', app_config)
+        assert images == {'test/app1': 'registry:5000/app1/v1.0', '/test/app2': 'registry:5000/app2/v2.0'}
+        # all the apps come from a single listing
+        assert session_pool.calls == ['https://example.com/v2/apps?id=/test/app']
+        with self.assertRaises(ValueError):
+            m.get_image_names('user', 'pass', 'dev', ['/test/app1', '/test/cmd'], '/vagrant/config',
+                              'test.yml', app_config)
+
+    def test_getAppSummaries(self):
+        apps = {'apps': [
+            {'id': '/test/app1', 'env': {'HTTP_PORT': 'PORT0', 'SECRET': 'value'}, 'cmd': 'run', 'tasks': [
+                {'id': 'test_app1.1', 'host': 'host1', 'ports': [31000], 'startedAt': '2017-01-01T00:00:00.000Z',
+                 'state': 'TASK_RUNNING'},
+                {'id': 'test_app1.2', 'host': 'host2', 'ports': [31001], 'startedAt': None,
+                 'state': 'TASK_STAGING'}]},
+            {'id': '/test/app2', 'tasks': []},
+        ]}
+        response = FakeResponse(200, apps)
+        response.reason = 'OK'
+        url = 'https://example.com/v2/apps?embed=apps.tasks'
+        session_pool = FakeSessionPool({url: response})
+        roger_env = {'environments': {'dev': {'marathon_endpoint': 'https://example.com'}}}
+        m = Marathon(session_pool=session_pool)
+        m.user, m.passw = 'user', 'pass'
+        summaries = m.getAppSummaries(roger_env, 'dev')
+        assert [(app.app_id, app.env, len(app.tasks)) for app in summaries] == [
+            ('/test/app1', {'HTTP_PORT': 'PORT0', 'SECRET': 'value'}, 1), ('/test/app2', {}, 0)]
+        # the tasks and the apps come from a single request
+        assert get_instance_details(summaries) == {
+            'test_app1.1': ('/test/app1', 'host1', [31000], '2017-01-01T00:00:00.000Z')}
+        assert get_app_envs(summaries) == {'/test/app1': {'HTTP_PORT': 'PORT0', 'SECRET': 'value'}}
+        assert session_pool.calls == [url]
+        assert m.getInstanceDetails(roger_env, 'dev') == get_instance_details(summaries)
+
+    def test_getAppIds(self):
+        assert self.marathon.getAppIds({'id': 'test-app'}) == ['/test-app']
+        group = {'id': '/test', 'apps': [{'id': 'app1'}, {'id': '/other/app2'}],
+                 'groups': [{'id': 'sub', 'apps': [{'id': 'app3'}]}]}
+        assert self.marathon.getAppIds(group) == ['/test/app1', '/other/app2', '/test/sub/app3']
+
+    def test_getDeployment(self):
+        with tempfile.NamedTemporaryFile(suffix='.json') as f:
+            f.write(json.dumps({'id': 'test-app'}))
+            f.flush()
+            resp = FakeResponse(200, {'version': '2017-01-01T00:00:00.000Z', 'deploymentId': 'abc'})
+            assert self.marathon.getDeployment(resp, f.name) == ('abc', ['/test-app'])
+            assert self.marathon.getDeployment(FakeResponse(204), f.name) is None
+            assert self.marathon.getDeployment(FakeResponse(409, {'message': 'locked'}), f.name) is None
+
     def tearDown(self):
         pass
 
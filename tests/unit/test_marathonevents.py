@@ -0,0 +1,145 @@
+#!/usr/bin/python
+
+from __future__ import print_function
+import unittest
+import json
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(
+    os.path.dirname(os.path.realpath(__file__)), os.pardir, "cli")))
+from cli.marathonevents import iter_sse, BufferedEvents, TaskIndex, MarathonEventStream
+
+# Test basic functionalities of the Marathon event stream client
+
+
+class FakeStreamResponse(object):
+
+    def __init__(self, status_code, lines):
+        self.status_code = status_code
+        self.lines = lines
+        self.closed = False
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise ValueError("HTTP {}".format(self.status_code))
+
+    def iter_lines(self, chunk_size=512):
+        return iter(self.lines)
+
+    def close(self):
+        self.closed = True
+
+
+class FakeSessionPool(object):
+
+    def __init__(self, response):
+        self.response = response
+        self.calls = []
+
+    def get(self, url, **kwargs):
+        self.calls.append((url, kwargs))
+        return self.response
+
+
+def status_update(task_id, app_id, status, host='host1', ports=None):
+    return {'eventType': 'status_update_event', 'taskId': task_id, 'appId': app_id, 'taskStatus': status,
+            'host': host, 'ports': ports or [31000], 'timestamp': '2017-01-01T00:00:00.000Z'}
+
+
+class TestMarathonEvents(unittest.TestCase):
+
+    def setUp(self):
+        self.index = TaskIndex({'/app1.1': ('/app1', 'host1', [31000], '2016-12-31T00:00:00.000Z'),
+                                '/app2.1': ('/app2', 'host2', [31001], '2016-12-31T00:00:00.000Z')},
+                               {'/app1': {'HTTP_PORT': 'PORT0'}})
+
+    def test_iter_sse(self):
+        lines = [':keep-alive', '', 'event: status_update_event', 'data: {"a":', 'data: 1}', '',
+                 b'data: plain', '', 'event: partial', 'data: last']
+        assert list(iter_sse(lines)) == [('status_update_event', '{"a":\n1}'), ('message', 'plain'),
+                                         ('partial', 'last')]
+
+    def test_apply_status_updates(self):
+        assert self.index.apply('status_update_event', status_update('/app1.2', '/app1', 'TASK_RUNNING')) == \
+            set(['/app1'])
+        assert sorted(self.index.getInstanceDetails(['/app1']).keys()) == ['/app1.1', '/app1.2']
+        # the same update twice changes nothing
+        assert self.index.apply('status_update_event', status_update('/app1.2', '/app1', 'TASK_RUNNING')) == set()
+        assert self.index.apply('status_update_event', status_update('/app2.1', '/app2', 'TASK_KILLED')) == \
+            set(['/app2'])
+        assert self.index.getInstanceDetails(['/app2']) == {}
+        assert '/app2' not in self.index.app_tasks
+        # updates of tasks that were not running are ignored
+        assert self.index.apply('status_update_event', status_update('/app3.1', '/app3', 'TASK_FAILED')) == set()
+
+    def test_apply_app_events(self):
+        assert self.index.apply('api_post_event', {'appDefinition': {'id': '/app2', 'env': {'HTTP_PORT': 'PORT0'}}}) \
+            == set(['/app2'])
+        assert self.index.app_envs['/app2'] == {'HTTP_PORT': 'PORT0'}
+        assert self.index.apply('app_terminated_event', {'appId': '/app1'}) == set(['/app1'])
+        assert '/app1' not in self.index.app_envs
+        assert self.index.getInstanceDetails().keys() == ['/app2.1']
+        assert self.index.apply('deployment_success', {}) == set()
+
+    def test_events(self):
+        update = status_update('/app1.2', '/app1', 'TASK_RUNNING')
+        response = FakeStreamResponse(200, [
+            'event: status_update_event', 'data: {}'.format(json.dumps(update)), '',
+            'event: framework_message_event', 'data: {}', '',
+            'event: api_post_event', 'data: not json', ''])
+        session_pool = FakeSessionPool(response)
+        stream = MarathonEventStream('http://marathon', session_pool, auth=('user', 'pass'))
+        assert list(stream.events()) == [('status_update_event', update)]
+        assert response.closed
+        url, kwargs = session_pool.calls[0]
+        assert url == 'http://marathon/v2/events?event_type=status_update_event&event_type=api_post_event' \
+                      '&event_type=app_terminated_event'
+        assert kwargs['stream'] is True
+        assert kwargs['headers'] == {'Accept': 'text/event-stream'}
+        assert kwargs['timeout'] == (10, None)
+
+    def test_events_error(self):
+        response = FakeStreamResponse(503, [])
+        stream = MarathonEventStream('http://marathon', FakeSessionPool(response))
+        with self.assertRaises(ValueError):
+            list(stream.events())
+        assert response.closed
+        response = FakeStreamResponse(503, [])
+        with self.assertRaises(ValueError):
+            MarathonEventStream('http://marathon', FakeSessionPool(response)).open()
+        assert response.closed
+
+    def test_buffered_events(self):
+        def events():
+            yield 'first'
+            yield 'second'
+            raise IOError("connection reset")
+        buffered = BufferedEvents(events())
+        buffered.thread.join()
+        received = []
+        with self.assertRaises(IOError):
+            for event in buffered:
+                received.append(event)
+        assert received == ['first', 'second']
+        assert list(BufferedEvents(iter(['only']))) == ['only']
+
+    def test_buffered_events_close(self):
+        closed = []
+
+        def events():
+            try:
+                while True:
+                    yield 'event'
+            finally:
+                closed.append(True)
+        buffered = BufferedEvents(events())
+        buffered.close()
+        buffered.thread.join(5)
+        assert not buffered.thread.is_alive()
+        assert closed == [True]
+
+    def tearDown(self):
+        pass
+
+if __name__ == '__main__':
+    unittest.main()
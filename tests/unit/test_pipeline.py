@@ -0,0 +1,78 @@
+#!/usr/bin/python
+
+from __future__ import print_function
+import unittest
+import multiprocessing
+import os
+import sys
+import time
+sys.path.insert(0, os.path.abspath(os.path.join(
+    os.path.dirname(os.path.realpath(__file__)), os.pardir, "cli")))
+from cli.pipeline import Pipeline, parse_stage_jobs
+from cli.workerpool import WorkerPool
+
+# Test basic functionalities of the Pipeline class
+
+
+class Counter(object):
+    '''Counts, across processes, how many jobs are in a stage and the most there ever were.'''
+
+    def __init__(self):
+        self.lock = multiprocessing.Lock()
+        self.current = multiprocessing.Value('i', 0, lock=False)
+        self.peak = multiprocessing.Value('i', 0, lock=False)
+
+    def enter(self):
+        with self.lock:
+            self.current.value += 1
+            self.peak.value = max(self.peak.value, self.current.value)
+
+    def leave(self):
+        with self.lock:
+            self.current.value -= 1
+
+
+def deploy(pipeline, counters):
+    for stage in ['build', 'image-push']:
+        with pipeline.stage(stage):
+            counters[stage].enter()
+            counters['any'].enter()
+            time.sleep(0.2)
+            counters['any'].leave()
+            counters[stage].leave()
+
+
+class TestPipeline(unittest.TestCase):
+
+    def test_parse_stage_jobs(self):
+        assert parse_stage_jobs(None) == {}
+        assert parse_stage_jobs('build=2, image-push=4') == {'build': 2, 'image-push': 4}
+        with self.assertRaises(ValueError):
+            parse_stage_jobs('test=2')
+        with self.assertRaises(ValueError):
+            parse_stage_jobs('build=many')
+
+    def test_create(self):
+        pipeline = Pipeline.create({'build': 3})
+        assert pipeline.isEnabled() is True
+        assert sorted(pipeline.semaphores.keys()) == ['build', 'framework-push', 'gitpull', 'image-push', 'render']
+        assert Pipeline().isEnabled() is False
+        with Pipeline().stage('build'):
+            pass
+
+    def test_stages_limit_and_overlap_across_processes(self):
+        pipeline = Pipeline({'build': 1, 'image-push': 2})
+        counters = dict((name, Counter()) for name in ['build', 'image-push', 'any'])
+        results = WorkerPool(3).run([
+            ("app{}".format(index), lambda: deploy(pipeline, counters)) for index in range(3)])
+        assert all(result.succeeded for result in results)
+        assert counters['build'].peak.value == 1
+        assert counters['image-push'].peak.value <= 2
+        # the push of one app overlapped the build of the next
+        assert counters['any'].peak.value > 1
+
+    def tearDown(self):
+        pass
+
+if __name__ == '__main__':
+    unittest.main()
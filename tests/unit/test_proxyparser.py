@@ -0,0 +1,114 @@
+#!/usr/bin/python
+
+from __future__ import print_function
+import unittest
+import os
+import sys
+import threading
+sys.path.insert(0, os.path.abspath(os.path.join(
+    os.path.dirname(os.path.realpath(__file__)), os.pardir, "cli")))
+from cli.proxyparser import ProxyParser, ProxyState
+from cli.sessionpool import SessionPool
+from mockito import mock
+
+# Test basic functionalities of ProxyParser class
+
+
+class CountingProxyParser(ProxyParser):
+
+    def __init__(self, config, ttl):
+        ProxyParser.__init__(self, mock(SessionPool), ttl)
+        self.config = config
+        self.fetches = 0
+
+    def get_proxy_url(self, environment):
+        return "http://{}.example.com/api/state".format(environment)
+
+    def get_proxy_config(self, environment):
+        self.fetches += 1
+        return self.config
+
+
+class SlowProxyParser(CountingProxyParser):
+    '''Blocks fetching the state of the 'slow' environment until released.'''
+
+    def __init__(self, config):
+        CountingProxyParser.__init__(self, config, 60)
+        self.fetching = threading.Event()
+        self.release = threading.Event()
+
+    def get_proxy_config(self, environment):
+        if environment == 'slow':
+            self.fetching.set()
+            self.release.wait(10)
+        return CountingProxyParser.get_proxy_config(self, environment)
+
+
+class TestProxyParser(unittest.TestCase):
+
+    def setUp(self):
+        self.config = {'Apps': [
+            {'Id': '/test/app1', 'Env': {'HTTP_PREFIX': '/test/app1'}, 'TcpPorts': None},
+            {'Id': '/test/app2', 'Env': {}, 'TcpPorts': {'9001': 'PORT0', '9002': 'PORT1'}}
+        ]}
+        ProxyParser().invalidate()
+
+    def test_proxy_state_indexes_prefixes_and_ports(self):
+        state = ProxyState(self.config)
+        assert state.path_begin_values == {'/test/app1': '/test/app1'}
+        assert state.backend_tcp_ports == {'9001': '/test/app2', '9002': '/test/app2'}
+        assert state.is_fresh(60)
+        assert not ProxyState(self.config, fetched_at=0).is_fresh(60)
+
+    def test_parse_config_fetches_once_per_environment(self):
+        first = CountingProxyParser(self.config, 60)
+        second = CountingProxyParser(self.config, 60)
+        first.parseConfig('test')
+        first.parseConfig('test')
+        second.parseConfig('test')
+        assert first.fetches == 1
+        assert second.fetches == 0
+        assert second.get_path_begin_values()['/test/app1'] == '/test/app1'
+        assert second.get_backend_tcp_ports()['9002'] == '/test/app2'
+        first.parseConfig('prod')
+        assert first.fetches == 2
+
+    def test_parse_config_refetches_stale_state(self):
+        parser = CountingProxyParser(self.config, 0)
+        parser.parseConfig('test')
+        parser.parseConfig('test')
+        assert parser.fetches == 2
+
+    def test_invalidate(self):
+        parser = CountingProxyParser(self.config, 60)
+        parser.parseConfig('test')
+        parser.invalidate('test')
+        parser.parseConfig('test')
+        assert parser.fetches == 2
+
+    def test_slow_proxy_does_not_block_other_environments(self):
+        parser = SlowProxyParser(self.config)
+        thread = threading.Thread(target=parser.parseConfig, args=('slow',))
+        thread.start()
+        try:
+            assert parser.fetching.wait(10)
+            # fetched while the slow proxy is still being waited for
+            parser.parseConfig('fast')
+            assert not parser.release.is_set()
+        finally:
+            parser.release.set()
+            thread.join()
+        assert parser.fetches == 2
+
+    def test_state_is_keyed_by_proxy_url(self):
+        parser = CountingProxyParser(self.config, 60)
+        parser.parseConfig('test')
+        parser.get_proxy_url = lambda environment: "http://other.example.com/api/state"
+        parser.parseConfig('test')
+        assert parser.fetches == 2
+
+    def tearDown(self):
+        ProxyParser().invalidate()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+#!/usr/bin/python
+
+from __future__ import print_function
+import unittest
+import json
+import os
+import subprocess
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(
+    os.path.dirname(os.path.realpath(__file__)), os.pardir, "cli")))
+from bin import roger
+
+# Test basic functionalities of the roger entry point
+
+HEAVY_MODULES = ['jinja2', 'pkg_resources', 'requests', 'slackclient', 'slackweb', 'tabulate', 'yaml']
+
+# Runs roger with the given arguments in a new interpreter and reports how long the import and the
+# command took and which of the HEAVY_MODULES got imported
+STARTUP_SCRIPT = '''
+import json, os, sys, time
+started = time.time()
+from bin import roger
+sys.stdout = open(os.devnull, 'w')
+try:
+    roger.main(sys.argv[1:])
+except SystemExit:
+    pass
+sys.stdout = sys.__stdout__
+print(json.dumps({'elapsed': time.time() - started,
+                  'imported': sorted(name for name in %r if name in sys.modules)}))
+''' % HEAVY_MODULES
+
+# generous limit, roger -h takes a few tens of milliseconds
+MAX_STARTUP_SECONDS = 1.0
+
+
+def main(argv):
+    # stands in for a command module in the tests below
+    return len(argv)
+
+
+class TestRoger(unittest.TestCase):
+
+    def setUp(self):
+        roger.COMMANDS['test'] = ('tests.unit.test_roger', 'runs a test command.')
+
+    def test_commands_are_importable(self):
+        for command in roger.getCommands():
+            if command == 'test':
+                continue
+            module_name, description = roger.COMMANDS[command]
+            module = __import__(module_name, fromlist=['main'])
+            assert callable(module.main)
+            assert module.describe() == description
+
+    def test_command_runs_in_process(self):
+        assert roger.main(['test', 'arg1', 'arg with spaces']) == 2
+
+    def test_invalid_command(self):
+        with self.assertRaises(SystemExit):
+            roger.main(['no-such-command'])
+
+    def test_command_argument_errors(self):
+        with self.assertRaises(SystemExit) as context:
+            roger.main(['push'])
+        assert context.exception.code == 2
+
+    def startup(self, *args):
+        root = os.path.abspath(os.path.join(os.path.dirname(os.path.realpath(__file__)), os.pardir, os.pardir))
+        env = dict(os.environ, PYTHONPATH=root)
+        output = subprocess.check_output([sys.executable, '-c', STARTUP_SCRIPT] + list(args),
+                                         cwd=root, env=env, stderr=open(os.devnull, 'w'))
+        return json.loads(output.strip().splitlines()[-1])
+
+    def test_help_startup(self):
+        result = self.startup('-h')
+        assert result['imported'] == []
+        assert result['elapsed'] < MAX_STARTUP_SECONDS
+
+    def test_argument_error_startup(self):
+        result = self.startup('push')
+        assert result['imported'] == []
+        assert result['elapsed'] < MAX_STARTUP_SECONDS
+
+    def test_version_startup(self):
+        # pkg_resources is needed to find the installed version
+        assert [name for name in self.startup('-v')['imported'] if name != 'pkg_resources'] == []
+
+    def tearDown(self):
+        del roger.COMMANDS['test']
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,10 +3,13 @@
 from __future__ import print_function
 import unittest
 import argparse
+import contextlib
 import json
 import yaml
 import os
+import shutil
 import sys
+import tempfile
 sys.path.insert(0, os.path.abspath(os.path.join(
     os.path.dirname(os.path.realpath(__file__)), os.pardir, "cli")))
 from cli.roger_build import RogerBuild
@@ -18,10 +21,38 @@ from cli.hooks import Hooks
 from cli.dockerutils import DockerUtils
 from cli.docker_build import Docker
 from cli.utils import Utils
+from cli.fingerprint import FINGERPRINT_LABEL, TAG_LABEL
+from tests.helper import FakeRegistry
 
 # Test basic functionalities of roger-build script
 
 
+class FakeDocker(object):
+
+    def __init__(self, project_shas):
+        self.project_shas = project_shas
+        self.fetches = []
+        self.builds = []
+
+    def fetch_private_repos(self, appObj, directory, repo, projects):
+        self.fetches.append(projects)
+        return self.project_shas
+
+    def docker_build(self, *args, **kwargs):
+        self.builds.append((args, kwargs))
+
+
+class RecordingPipeline(object):
+
+    def __init__(self):
+        self.stages = []
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        self.stages.append(name)
+        yield
+
+
 class TestBuild(unittest.TestCase):
 
     def setUp(self):
@@ -173,6 +204,98 @@ class TestBuild(unittest.TestCase):
             settings, appConfig, mockedHooks, dockerUtilsObj, dockerObj, args)
         verify(mockedHooks).run_hook("post_build", any(), any(), any())
 
+    def build_with_private_projects(self, reuse_image, disable_swaparoo=True, gemfile=None):
+        work_dir = tempfile.mkdtemp()
+        try:
+            os.makedirs(os.path.join(work_dir, 'test'))
+            open(os.path.join(work_dir, 'test', 'Dockerfile'), 'w').close()
+            if gemfile is not None:
+                with open(os.path.join(work_dir, 'test', 'Gemfile'), 'w') as f:
+                    f.write(gemfile)
+            settings = mock(Settings)
+            appConfig = mock(AppConfig)
+            dockerUtilsObj = mock(DockerUtils)
+            mockedHooks = mock(Hooks)
+            when(settings, strict=False).getConfigDir().thenReturn(any())
+            when(settings, strict=False).getCliDir().thenReturn(any())
+            when(settings).getUser().thenReturn('user')
+            when(appConfig).getRogerEnv(any()).thenReturn({'registry': 'example.com:5000'})
+            when(appConfig).getConfig(any(), any()).thenReturn({'name': 'test-app', 'repo': 'test'})
+            when(appConfig).getAppData(any(), any(), any()).thenReturn({'privateProjects': ['gem1']})
+            when(appConfig).getRepoName(any()).thenReturn('test')
+            when(mockedHooks, strict=False).run_hook(any(), any(), any(), any(), any()).thenReturn(0)
+            when(dockerUtilsObj).docker_push(any(), any()).thenReturn(0)
+            roger_build = RogerBuild()
+            roger_build.identifier = 'test'
+            roger_build.reused_tag = 'test-app-web-123/v0.1.0'
+            fingerprints = []
+
+            def getFingerprint(file_path, build_filename, docker_build_args, project_shas):
+                fingerprints.append(project_shas)
+                return None
+            roger_build.getFingerprint = getFingerprint
+            roger_build.pipeline = RecordingPipeline()
+            dockerObj = FakeDocker({'gem1': 'abc'})
+            args = argparse.Namespace(app_name='web', env='dev', directory=work_dir, tag_name='test-app-web/v0.1.0',
+                                      config_file='test.yml', verbose=False, push=True, build_arg=None,
+                                      disable_swaparoo=disable_swaparoo, reuse_image=reuse_image)
+            roger_build.main(settings, appConfig, mockedHooks, dockerUtilsObj, dockerObj, args)
+            return roger_build, dockerObj, fingerprints
+        finally:
+            shutil.rmtree(work_dir)
+
+    def test_fingerprint_needs_reuse_image(self):
+        roger_build, dockerObj, fingerprints = self.build_with_private_projects(False)
+        assert roger_build.reused_tag is None
+        assert fingerprints == []
+        assert dockerObj.fetches == [['gem1']]
+        (args, kwargs), = dockerObj.builds
+        # no fingerprint label, and the private projects are not downloaded twice
+        assert args[11] is None
+        assert kwargs == {'fetch_projects': False}
+        # the download doesn't hold a build slot
+        assert roger_build.pipeline.stages == ['gitpull', 'build', 'image-push']
+
+    def test_fingerprint_uses_checked_out_revisions(self):
+        roger_build, dockerObj, fingerprints = self.build_with_private_projects(True)
+        assert fingerprints == [{'gem1': 'abc'}]
+
+    def test_no_fingerprint_when_the_swaparoo_downloads_gems(self):
+        gemfile = "gem 'gem2', git: 'git@github.com:seomoz/gem2.git', branch: 'feature'\n"
+        roger_build, dockerObj, fingerprints = self.build_with_private_projects(True, False, gemfile)
+        assert fingerprints == []
+        roger_build, dockerObj, fingerprints = self.build_with_private_projects(True, True, gemfile)
+        assert fingerprints == [{'gem1': 'abc'}]
+
+    def test_findImage(self):
+        roger_build = RogerBuild()
+        registry = FakeRegistry(['test-app-grafana-123/v0.1.0'], images={
+            ('test-app-grafana-fingerprints', 'abc'): {FINGERPRINT_LABEL: 'abc',
+                                                       TAG_LABEL: 'test-app-grafana-123/v0.1.0'},
+            ('test-app-grafana-fingerprints', 'def'): {FINGERPRINT_LABEL: 'def',
+                                                       TAG_LABEL: 'test-app-grafana-456/v0.1.1'},
+            ('test-app-grafana-fingerprints', 'ghi'): {FINGERPRINT_LABEL: 'abc',
+                                                       TAG_LABEL: 'test-app-grafana-123/v0.1.0'}})
+        dockerUtilsObj = DockerUtils(session_pool=registry, cache_dir=tempfile.gettempdir())
+        assert roger_build.findImage(dockerUtilsObj, 'example.com:5000', 'test-app-grafana', 'abc') == \
+            'test-app-grafana-123/v0.1.0'
+        assert roger_build.findImage(dockerUtilsObj, 'example.com:5000', 'test-app-other', 'abc') is None
+        # the image is gone from the registry
+        assert roger_build.findImage(dockerUtilsObj, 'example.com:5000', 'test-app-grafana', 'def') is None
+        # the labels are for another fingerprint
+        assert roger_build.findImage(dockerUtilsObj, 'example.com:5000', 'test-app-grafana', 'ghi') is None
+
+    def test_pushFingerprint(self):
+        roger_build = RogerBuild()
+        dockerUtilsObj = mock(DockerUtils)
+        when(dockerUtilsObj).docker_tag(any(), any(), any()).thenReturn(0)
+        when(dockerUtilsObj).docker_push(any(), any()).thenReturn(0)
+        roger_build.pushFingerprint(dockerUtilsObj, 'example.com:5000/test-app-web-123/v0.1.0', 'example.com:5000',
+                                    'test-app-web', 'abc', False)
+        verify(dockerUtilsObj).docker_tag('example.com:5000/test-app-web-123/v0.1.0',
+                                          'example.com:5000/test-app-web-fingerprints:abc', False)
+        verify(dockerUtilsObj).docker_push('example.com:5000/test-app-web-fingerprints:abc', False)
+
     def tearDown(self):
         pass
 
@@ -9,6 +9,7 @@ import json
 sys.path.insert(0, os.path.abspath(os.path.join(
     os.path.dirname(os.path.realpath(__file__)), os.pardir, "cli")))
 import roger_push
+import roger_deploy
 from roger_deploy import RogerDeploy
 from cli.roger_build import RogerBuild
 from cli.roger_gitpull import RogerGitPull
@@ -31,6 +32,17 @@ from cli.utils import Utils
 # Test basic functionalities of roger-deploy script
 
 
+class FakeWorkerPool(object):
+    '''Records the number of workers deploys were run with instead of forking them.'''
+    sizes = []
+
+    def __init__(self, size):
+        FakeWorkerPool.sizes.append(size)
+
+    def run(self, jobs, on_complete=None):
+        return []
+
+
 class TestDeploy(unittest.TestCase):
 
     def setUp(self):
@@ -412,7 +424,8 @@ class TestDeploy(unittest.TestCase):
         random = 'test'
 
         config = self.config
-        data = self.data
+        # templates are read from the repo, so it is pulled even with skip_build
+        data = dict(self.data, template_path='templates')
 
         when(roger_deploy.utils).get_identifier(any(), any(), any()).thenReturn(any())
         when(roger_deploy.utils).extract_app_name(any()).thenReturn("test")
@@ -457,6 +470,73 @@ class TestDeploy(unittest.TestCase):
         roger_deploy.main(settings, appConfig, frameworkUtils, gitObj, mockedHooks, args)
         verify(roger_deploy.rogerGitPullObject, times=1).main(any(), any(), any(), any(), any())
 
+    def test_rogerDeploy_with_skip_build_does_not_pull(self):
+        settings = mock(Settings)
+        appConfig = mock(AppConfig)
+        roger_deploy = RogerDeploy()
+        marathon = mock(Marathon)
+        gitObj = mock(GitUtils)
+        mockedHooks = mock(Hooks)
+        roger_deploy.rogerGitPullObject = mock(RogerGitPull)
+        roger_deploy.rogerPushObject = mock(RogerPush)
+        roger_deploy.rogerBuildObject = mock(RogerBuild)
+        roger_deploy.dockerUtilsObject = mock(DockerUtils)
+        roger_deploy.dockerObject = mock(Docker)
+        roger_deploy.utils = mock(Utils)
+
+        roger_env = self.roger_env
+
+        repo_name = 'roger'
+        repo_url = 'test_url'
+        random = 'test'
+
+        config = self.config
+        data = self.data
+
+        when(roger_deploy.utils).get_identifier(any(), any(), any()).thenReturn(any())
+        when(roger_deploy.utils).extract_app_name(any()).thenReturn("test")
+
+        when(marathon).getCurrentImageVersion(
+            any(), any(), any()).thenReturn("testversion/v0.1.0")
+        when(marathon).getName().thenReturn('Marathon')
+        frameworkUtils = mock(FrameworkUtils)
+        when(frameworkUtils).getFramework(data).thenReturn(marathon)
+        when(settings).getConfigDir().thenReturn(any())
+        when(settings).getCliDir().thenReturn(any())
+        when(settings).getUser().thenReturn('test_user')
+        when(appConfig).getRogerEnv(any()).thenReturn(roger_env)
+        when(appConfig).getConfig(any(), any()).thenReturn(config)
+        when(appConfig).getAppData(any(), any(), any()).thenReturn(data)
+
+        when(appConfig).getRepoUrl(any()).thenReturn(repo_name)
+        when(appConfig).getRepoName(any()).thenReturn(repo_name)
+
+        when(mockedHooks).run_hook(any(), any(), any(), any(), any(), any()).thenReturn(0)
+
+        when(gitObj).gitPull(any()).thenReturn(0)
+        when(gitObj).gitShallowClone(any(), any()).thenReturn(0)
+        when(gitObj).gitClone(any(), any()).thenReturn(0)
+        when(gitObj).getGitSha(any(), any(), any()).thenReturn(random)
+
+        when(roger_deploy.rogerGitPullObject).main(any(), any(), any(), any(), any()).thenReturn(0)
+        when(roger_deploy.rogerPushObject).main(any(), any(), any(), any(), any()).thenReturn(0)
+
+        args = self.args
+        args.directory = ""
+        args.secrets_file = ""
+        args.environment = "dev"
+        args.skip_push = True
+        args.skip_gitpull = False
+        args.application = 'grafana_test_app'
+        args.config_file = 'test.json'
+        args.skip_build = True
+        args.branch = None
+        args.verbose = False
+        os.environ["ROGER_CONFIG_DIR"] = self.configs_dir
+        roger_deploy.main(settings, appConfig, frameworkUtils, gitObj, mockedHooks, args)
+        verify(gitObj, times=0).getGitSha(any(), any(), any())
+        verify(roger_deploy.rogerGitPullObject, times=0).main(any(), any(), any(), any(), any())
+
     def test_rogerDeploy_with_skip_gitpull_true(self):
         settings = mock(Settings)
         appConfig = mock(AppConfig)
@@ -523,6 +603,26 @@ class TestDeploy(unittest.TestCase):
         roger_deploy.main(settings, appConfig, frameworkUtils, gitObj, mockedHooks, args)
         verify(roger_deploy.rogerGitPullObject, times=0).main(any(), any(), any(), any(), any())
 
+    def deploy_apps(self, skip_gitpull, skip_build):
+        settings = mock(Settings)
+        args = argparse.Namespace(skip_gitpull=skip_gitpull, skip_build=skip_build)
+        set_worker_pool = roger_deploy.WorkerPool
+        roger_deploy.WorkerPool = FakeWorkerPool
+        FakeWorkerPool.sizes = []
+        try:
+            RogerDeploy().deployApps(settings, None, None, None, None, None, args, self.config, self.roger_env,
+                                     '/tmp/work_dir', None, 'dev', ['test_app', 'grafana_test_app'], 'master', None,
+                                     'test.yml', 'roger', False, {}, 4)
+        finally:
+            roger_deploy.WorkerPool = set_worker_pool
+        return FakeWorkerPool.sizes[0]
+
+    def test_deploy_apps_builds_a_shared_checkout_one_at_a_time(self):
+        assert self.deploy_apps(skip_gitpull=False, skip_build=False) == 4
+        assert self.deploy_apps(skip_gitpull=True, skip_build=False) == 1
+        # without builds nothing is written to the checkout
+        assert self.deploy_apps(skip_gitpull=True, skip_build=True) == 4
+
     def tearDown(self):
         pass
 
@@ -16,7 +16,8 @@ import requests
 from mockito import mock, Mock, when
 
 
-from cli.roger_promote import RogerPromote
+from cli.roger_promote import RogerPromote, PROMOTE_ATTEMPTS
+from cli.roger_push import RogerPush
 from cli.appconfig import AppConfig
 from cli.settings import Settings
 from cli.framework import Framework
@@ -25,6 +26,20 @@ from cli.marathon import Marathon
 from cli.chronos import Chronos
 
 
+class FakeRogerPush(RogerPush):
+    '''RogerPush whose main fails the first `failures` times it is called.'''
+
+    def __init__(self, failures):
+        RogerPush.__init__(self)
+        self.failures = failures
+        self.calls = []
+
+    def main(self, settings, appConfig, frameworkObject, hooksObj, args):
+        self.calls.append(args)
+        if len(self.calls) <= self.failures:
+            raise ValueError("ERROR - push failed")
+
+
 class TestRogerPromote(unittest.TestCase):
     def setUp(self):
         self.marathon = mock(Marathon)
@@ -114,6 +129,55 @@ class TestRogerPromote(unittest.TestCase):
         val = rp._config_resolver('template_path', 'test_app', 'roger.json')
         assert val == 'framework_template_path'
 
-    def test_roger_push_script(self):
-        path = RogerPromote()._roger_push_script()
-        assert 'roger-mesos-tools/cli/roger_push.py' in path
+    def promote_args(self):
+        return RogerPromote().arg_parse().parse_args(['stage', 'prod', 'test_app', 'test.yml', '--jobs', '2'])
+
+    def test_push_container_retries(self):
+        rp = RogerPromote()
+        rp._temp_dir = '/tmp/checkout'
+        roger_push = FakeRogerPush(failures=1)
+        rp._push_container('web', 'test-app-web/v1.0', self.promote_args(), roger_push=roger_push)
+        assert len(roger_push.calls) == 2
+        push_args = roger_push.calls[-1]
+        assert push_args.app_name == 'test_app:web'
+        assert push_args.env == 'prod'
+        assert push_args.directory == '/tmp/checkout'
+        assert push_args.image_name == 'test-app-web/v1.0'
+        assert push_args.config_file == 'test.yml'
+
+    def test_push_container_gives_up(self):
+        rp = RogerPromote()
+        roger_push = FakeRogerPush(failures=PROMOTE_ATTEMPTS)
+        with pytest.raises(ValueError):
+            rp._push_container('web', 'test-app-web/v1.0', self.promote_args(), roger_push=roger_push)
+        assert len(roger_push.calls) == PROMOTE_ATTEMPTS
+
+    def test_promote_containers(self):
+        framework = mock(Marathon)
+        when(framework).getName().thenReturn("Chronos")
+        rp = RogerPromote(framework=framework)
+        rp._get_template_path = lambda container, config_dir, args, app_name: container
+        rp._image_names = lambda environment, config_file, template_paths: \
+            ["registry:5000/test-app-{}/v1.0".format(template_path) for template_path in template_paths]
+
+        def push_container(container, image_name, args):
+            if container == 'worker':
+                raise ValueError("ERROR - push failed")
+        rp._push_container = push_container
+        results = rp._promote_containers(['web', 'worker', 'cron'], self.promote_args())
+        assert [(result.container, result.image, result.succeeded) for result in results] == [
+            ('web', 'test-app-web/v1.0', True),
+            ('worker', 'test-app-worker/v1.0', False),
+            ('cron', 'test-app-cron/v1.0', True)]
+        assert 'push failed' in results[1].error
+
+    def test_checkout_paths(self):
+        rp = RogerPromote()
+        rp._config_resolver = lambda key, application, config_file: 'framework/prod'
+        args = self.promote_args()
+        assert rp._checkout_paths({'extra_variables_path': 'config/vars.yml'}, args) == \
+            ['framework/prod', 'config/vars.yml']
+        # hooks can use any file of the repo
+        assert rp._checkout_paths({'hooks': {'pre_push': 'make'}}, args) is None
+        args.full_clone = True
+        assert rp._checkout_paths({}, args) is None
@@ -8,11 +8,85 @@ import argparse
 sys.path.insert(0, os.path.abspath(os.path.join(
     os.path.dirname(os.path.realpath(__file__)), os.pardir, "cli")))
 from cli.roger_ps import RogerPS
-from cli.haproxyparser import HAProxyParser
-from cli.marathon import Marathon
+from cli.proxyparser import ProxyParser
+from cli.marathon import Marathon, AppSummary, TaskSummary
 from mockito import mock, when
 
 
+class FakeConnection(object):
+
+    def __init__(self, events):
+        self.events = events
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class FakeEventStream(object):
+    '''Yields the events of every connection in turn, losing the connection after each.'''
+
+    def __init__(self, connections):
+        self.connections = connections
+        self.opened = []
+
+    def open(self):
+        if not self.connections:
+            raise KeyboardInterrupt()
+        self.opened.append(FakeConnection(self.connections.pop(0)))
+        return self.opened[-1]
+
+    def events(self, resp):
+        for event in resp.events:
+            yield event
+        raise IOError("connection reset")
+
+
+class FakeProxyParser(object):
+    '''Serves the proxy states in turn, the next one once the state is invalidated.'''
+
+    def __init__(self, states):
+        self.states = states
+        self.invalidated = []
+
+    def invalidate(self, environment=None):
+        self.invalidated.append(environment)
+        if len(self.states) > 1:
+            self.states.pop(0)
+
+    def parseConfig(self, environment):
+        self.path_begin_values, self.backend_tcp_ports = self.states[0]
+
+    def get_path_begin_values(self):
+        return self.path_begin_values
+
+    def get_backend_tcp_ports(self):
+        return self.backend_tcp_ports
+
+
+class FakeFramework(object):
+
+    def __init__(self, instance_details, app_envs, stream=None):
+        self.instance_details = instance_details
+        self.app_envs = app_envs
+        self.stream = stream
+        self.summary_requests = 0
+
+    def getAppSummaries(self, roger_env, environment):
+        self.summary_requests += 1
+        app_ids = set(self.app_envs) | set(task[0] for task in self.instance_details.values())
+        return [AppSummary(app_id, self.app_envs.get(app_id, {}),
+                           [TaskSummary(task_id, task[1], task[2], task[3])
+                            for task_id, task in sorted(self.instance_details.items()) if task[0] == app_id])
+                for app_id in sorted(app_ids)]
+
+    def fetchUserPass(self, environment):
+        pass
+
+    def getEventStream(self, roger_env, environment):
+        return self.stream
+
+
 class TestRogerPS(unittest.TestCase):
 
     def setUp(self):
@@ -31,7 +105,6 @@ class TestRogerPS(unittest.TestCase):
         environment['test'] = test
         roger_env['environments'] = environment
         self.roger_env = roger_env
-        framework = mock(Marathon)
         app_envs = {}
         instance_details = {}
         app_envs['app1'] = {"HTTP_PORT": "PORT0", "ENVKEY1": "value1"}
@@ -40,12 +113,9 @@ class TestRogerPS(unittest.TestCase):
             'app1-123'] = ("app1", "host1", ['3000', '3001'], "2016-03-18T20:48:13.732Z")
         instance_details[
             'app2-efg'] = ("app2", "host2", ['9000'], "2016-04-18T20:48:13.732Z")
-        when(framework).getAppEnvDetails(
-            self.roger_env, "test").thenReturn(app_envs)
-        when(framework).getInstanceDetails(
-            self.roger_env, "test").thenReturn(instance_details)
+        framework = FakeFramework(instance_details, app_envs)
         self.framework = framework
-        haproxyparser = mock(HAProxyParser)
+        haproxyparser = mock(ProxyParser)
         path_beg_values = {}
         path_beg_values['/test/app1'] = "app1"
         backend_services_tcp_ports = {}
@@ -80,10 +150,15 @@ class TestRogerPS(unittest.TestCase):
         assert app_details['apps']['app1']['tasks'][
             'app1-123']['hostname'] == "host1"
 
-    def test_get_instance_details(self):
-        instance_details = self.rogerps.get_instance_details(
-            self.framework, self.roger_env, "test")
-        assert instance_details.keys() == ['app1-123', 'app2-efg']
+    def test_get_proxy_indexes(self):
+        app_http_prefixes, app_tcp_ports = self.rogerps.get_proxy_indexes(self.haproxyparser)
+        assert app_http_prefixes == {'app1': ['/test/app1']}
+        assert app_tcp_ports == {'app2': ['9001']}
+
+    def test_fetch_sources(self):
+        instance_details, app_envs = self.rogerps.fetch_sources(
+            self.framework, self.haproxyparser, "test", self.roger_env)
+        assert sorted(instance_details.keys()) == ['app1-123', 'app2-efg']
         app1_data = instance_details['app1-123']
         app2_data = instance_details['app2-efg']
         assert app1_data[1] == "host1"
@@ -91,6 +166,63 @@ class TestRogerPS(unittest.TestCase):
         assert app2_data[0] == "app2"
         assert app2_data[2] == ['9000']
         assert app2_data[3] == "2016-04-18T20:48:13.732Z"
+        assert app_envs['app1'] == {"HTTP_PORT": "PORT0", "ENVKEY1": "value1"}
+        # the tasks and the envs come from one listing of the apps
+        assert self.framework.summary_requests == 1
+
+    def test_watch_prints_changed_rows(self):
+        args = self.args
+        args.verbose = False
+        instance_details = {'app1-123': ("app1", "host1", [3000], "2016-03-18T20:48:13.732Z")}
+        stream = FakeEventStream([
+            [('status_update_event', {'taskId': 'app1-456', 'appId': 'app1', 'taskStatus': 'TASK_RUNNING',
+                                      'host': 'host2', 'ports': [3001], 'timestamp': '2016-03-19'}),
+             ('status_update_event', {'taskId': 'app2-efg', 'appId': 'app2', 'taskStatus': 'TASK_RUNNING',
+                                      'host': 'host2', 'ports': [9000], 'timestamp': '2016-03-19'}),
+             ('status_update_event', {'taskId': 'app3-1', 'appId': 'app3', 'taskStatus': 'TASK_FAILED'})],
+            [],
+        ])
+        framework = FakeFramework(instance_details, {'app1': {"HTTP_PORT": "PORT0"}}, stream)
+        printed = []
+        self.rogerps.print_rows = lambda apps, args: printed.append(apps)
+        self.rogerps.sleep = lambda seconds: None
+        self.rogerps.watch(framework, self.haproxyparser, "test", args, self.roger_env)
+        assert printed[0] == [['app1', 1, "http://testhost/test/app1", "-"]]
+        # only the app that changed is printed again
+        assert printed[1] == [['app1', 2, "http://testhost/test/app1", "-"]]
+        assert printed[2] == [['app2', 1, "-", "9001"]]
+        # the stream was lost: tasks are fetched again and the apps that are gone printed as stopped
+        assert printed[3] == [['app1', 1, "http://testhost/test/app1", "-"], ['app2', 0, "-", "-"]]
+        assert len(printed) == 4
+        assert [resp.closed for resp in stream.opened] == [True, True]
+
+    def test_watch_closes_the_stream_when_the_snapshot_fails(self):
+        args = self.args
+        args.verbose = False
+        stream = FakeEventStream([[], []])
+        framework = FakeFramework({}, {}, stream)
+        framework.getAppSummaries = lambda roger_env, environment: 1 / 0
+        self.rogerps.sleep = lambda seconds: None
+        self.rogerps.watch(framework, self.haproxyparser, "test", args, self.roger_env)
+        assert [resp.closed for resp in stream.opened] == [True, True]
+
+    def test_watch_refreshes_proxy_on_app_updates(self):
+        args = self.args
+        args.verbose = False
+        instance_details = {'app1-123': ("app1", "host1", [3000], "2016-03-18T20:48:13.732Z"),
+                            'app2-efg': ("app2", "host2", [9000], "2016-03-18T20:48:13.732Z")}
+        stream = FakeEventStream([
+            [('api_post_event', {'appDefinition': {'id': 'app2', 'env': {"HTTP_PORT": "PORT0"}}})]])
+        framework = FakeFramework(instance_details, {'app1': {"HTTP_PORT": "PORT0"}}, stream)
+        proxyparser = FakeProxyParser([({'/test/app1': 'app1'}, {}),
+                                       ({'/test/app1': 'app1', '/test/app2': 'app2'}, {})])
+        printed = []
+        self.rogerps.print_rows = lambda apps, args: printed.append(apps)
+        self.rogerps.sleep = lambda seconds: None
+        self.rogerps.watch(framework, proxyparser, "test", args, self.roger_env)
+        assert printed[0] == [['app1', 1, "http://testhost/test/app1", "-"], ['app2', 1, "-", "-"]]
+        assert printed[1] == [['app2', 1, "http://testhost/test/app2", "-"]]
+        assert proxyparser.invalidated == ["test"]
 
     def tearDown(self):
         pass
@@ -7,7 +7,9 @@ import argparse
 from jinja2 import Template, exceptions
 import json
 import yaml
+import shutil
 import sys
+import tempfile
 sys.path.insert(0, os.path.abspath(os.path.join(
     os.path.dirname(os.path.realpath(__file__)), os.pardir, "cli")))
 from cli.roger_push import RogerPush
@@ -21,10 +23,93 @@ from mockito.matchers import any
 from cli.settings import Settings
 from cli.hooks import Hooks
 from cli.utils import Utils
+from tests.helper import FakeResponse
+from cli import templates
 
 # Test basic functionalities of roger-push script
 
 
+class FakeSettings(object):
+
+    def __init__(self, work_dir):
+        self.work_dir = work_dir
+
+    def getConfigDir(self):
+        return os.path.join(self.work_dir, 'config')
+
+    def getComponentsDir(self):
+        return os.path.join(self.work_dir, 'components')
+
+    def getTemplatesDir(self):
+        return os.path.join(self.work_dir, 'templates')
+
+    def getSecretsDir(self):
+        return os.path.join(self.work_dir, 'secrets')
+
+    def getUser(self):
+        return 'tester'
+
+
+class FakeAppConfig(object):
+
+    def __init__(self, config, roger_env):
+        self.config = config
+        self.roger_env = roger_env
+
+    def getConfig(self, config_dir, config_file):
+        return self.config
+
+    def getRogerEnv(self, config_dir):
+        return self.roger_env
+
+    def getAppData(self, config_dir, config_file, app_name):
+        return self.config['apps'].get(app_name)
+
+
+class FakeHooks(object):
+
+    def run_hook(self, hookname, appdata, path, env, user):
+        return 0
+
+
+class FakeFramework(object):
+    '''Records the configs put, deployment checks fail for the containers in failing_checks
+    and puts for the ones in failing_puts.'''
+
+    def __init__(self, failing_checks=(), failing_puts=()):
+        self.failing_checks = failing_checks
+        self.failing_puts = failing_puts
+        self.puts = []
+
+    def getName(self):
+        return 'Marathon'
+
+    def fetchUserPass(self, environment):
+        pass
+
+    def runDeploymentChecks(self, file_path, environment):
+        # any is mockito's matcher in this module
+        return all(not file_path.endswith("-{}.json".format(name)) for name in self.failing_checks)
+
+    def put(self, file_path, environmentObj, container, environment, act_as_user):
+        self.puts.append(container)
+        if container in self.failing_puts:
+            raise ValueError("PUT of {} failed".format(container))
+        return FakeResponse(204), [container]
+
+    def getDeployment(self, resp, file_path):
+        return None
+
+
+class FakeFrameworkUtils(object):
+
+    def __init__(self, framework):
+        self.framework = framework
+
+    def getFramework(self, data):
+        return self.framework
+
+
 class TestPush(unittest.TestCase):
 
     def setUp(self):
@@ -917,6 +1002,61 @@ class TestPush(unittest.TestCase):
         assert result['env']['ENV_VAR1'] == 'test_value1'
         assert result['env']['ENV_VAR2'] == 'test_value2'
 
+    def push_all_or_nothing(self, app_templates, framework, jobs=4):
+        '''Pushes the containers of test_app, rendered from templates, concurrently.'''
+        work_dir = tempfile.mkdtemp()
+        set_cache_dir = os.environ.get('ROGER_CACHE_DIR')
+        os.environ['ROGER_CACHE_DIR'] = os.path.join(work_dir, 'cache')
+        templates.clear()
+        curdir = os.getcwd()
+        try:
+            os.makedirs(os.path.join(work_dir, 'templates'))
+            for container, template in app_templates.items():
+                with open(os.path.join(work_dir, 'templates', 'test-app-{}.json'.format(container)), 'w') as f:
+                    f.write(template)
+            config = {'name': 'test-app', 'apps': {'test_app': {'name': 'test_app', 'containers': sorted(app_templates)}}}
+            roger_env = {'registry': 'registry.example.com:5000', 'environments': {'dev': {}}}
+            roger_push = RogerPush()
+            args = roger_push.parse_args().parse_args(['--env', 'dev', '--jobs', str(jobs), 'test_app', work_dir,
+                                                       'test-app/v1.0', 'test.yml'])
+            with self.assertRaises(ValueError) as context:
+                roger_push.main(FakeSettings(work_dir), FakeAppConfig(config, roger_env),
+                                FakeFrameworkUtils(framework), FakeHooks(), args)
+            return str(context.exception)
+        finally:
+            os.chdir(curdir)
+            templates.clear()
+            if set_cache_dir is None:
+                del os.environ['ROGER_CACHE_DIR']
+            else:
+                os.environ['ROGER_CACHE_DIR'] = set_cache_dir
+            shutil.rmtree(work_dir)
+
+    def test_failed_render_prevents_every_push(self):
+        framework = FakeFramework()
+        error = self.push_all_or_nothing({'web': '{"id": "/test/web"}', 'worker': '{"id": "/test/{{ undefined }}"}',
+                                          'cron': '{"id": "/test/cron"}'}, framework)
+        assert 'Unable to render Jinja template' in error
+        assert framework.puts == []
+
+    def test_failed_deployment_check_prevents_every_push(self):
+        framework = FakeFramework(failing_checks=['worker'])
+        error = self.push_all_or_nothing({'web': '{"id": "/test/web"}', 'worker': '{"id": "/test/worker"}',
+                                          'cron': '{"id": "/test/cron"}'}, framework)
+        assert 'Deployment Check failed' in error
+        assert framework.puts == []
+
+    def test_failed_put_stops_the_next_pushes(self):
+        framework = FakeFramework(failing_puts=['cron'])
+        error = self.push_all_or_nothing({'web': '{"id": "/test/web"}', 'worker': '{"id": "/test/worker"}',
+                                          'cron': '{"id": "/test/cron"}'}, framework, jobs=1)
+        assert 'PUT of cron failed' in error
+        assert framework.puts == ['cron']
+
+    def test_default_push_jobs(self):
+        args = RogerPush().parse_args().parse_args(['test_app', '/tmp', 'test-app/v1.0', 'test.yml'])
+        assert RogerPush().getPushJobs(args) == 1
+
     def tearDown(self):
         pass
 
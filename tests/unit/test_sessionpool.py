@@ -0,0 +1,62 @@
+#!/usr/bin/python
+
+from __future__ import print_function
+import unittest
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(
+    os.path.dirname(os.path.realpath(__file__)), os.pardir, "cli")))
+from cli.sessionpool import SessionPool, get_session_pool
+
+# Test basic functionalities of SessionPool class
+
+
+class FakeSession(object):
+
+    def __init__(self):
+        self.calls = []
+
+    def request(self, method, url, **kwargs):
+        self.calls.append((method, url, kwargs))
+
+
+class TestSessionPool(unittest.TestCase):
+
+    def setUp(self):
+        self.pool = SessionPool(pool_size=2, timeout=5, retries=1, backoff_factor=0)
+
+    def test_session_is_reused_per_endpoint(self):
+        first = self.pool.session("http://dev.example.com:8080/v2/apps")
+        second = self.pool.session("http://dev.example.com:8080/v2/tasks?status=running")
+        other = self.pool.session("http://dev.example.com:4400/scheduler/jobs")
+        assert first is second
+        assert first is not other
+
+    def test_session_adapter_settings(self):
+        session = self.pool.session("https://dev.example.com")
+        adapter = session.get_adapter("https://dev.example.com")
+        assert adapter._pool_maxsize == 2
+        assert adapter.max_retries.total == 1
+
+    def test_request_uses_default_timeout(self):
+        session = FakeSession()
+        url = "http://dev.example.com:8080/v2/apps"
+        self.pool._sessions[self.pool.endpoint(url)] = session
+        self.pool.get(url, auth=('user', 'pass'))
+        self.pool.put(url, data='{}', timeout=1)
+        assert session.calls[0] == ('GET', url, {'auth': ('user', 'pass'), 'timeout': 5})
+        assert session.calls[1] == ('PUT', url, {'data': '{}', 'timeout': 1})
+
+    def test_close_drops_sessions(self):
+        self.pool.session("http://dev.example.com:8080")
+        self.pool.close()
+        assert self.pool._sessions == {}
+
+    def test_default_pool_is_shared(self):
+        assert get_session_pool() is get_session_pool()
+
+    def tearDown(self):
+        pass
+
+if __name__ == '__main__':
+    unittest.main()
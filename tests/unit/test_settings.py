@@ -7,6 +7,7 @@ import os
 import sys
 sys.path.insert(0, os.path.abspath(os.path.join(
     os.path.dirname(os.path.realpath(__file__)), os.pardir, "cli")))
+from cli import settings
 from cli.settings import Settings
 
 # Test basic functionalities of Settings class
@@ -87,6 +88,56 @@ class TestSettings(unittest.TestCase):
         cli_dir = self.settingObj.getCliDir()
         assert cli_dir is not None
 
+    def test_getCacheDir(self):
+        set_cache_dir = os.environ.pop('ROGER_CACHE_DIR', '')
+        os.environ["ROGER_CACHE_DIR"] = self.base_dir + "/testcachedir"
+        assert self.settingObj.getCacheDir() == self.base_dir + "/testcachedir"
+        del os.environ['ROGER_CACHE_DIR']
+        assert self.settingObj.getCacheDir() == os.path.join(
+            os.path.expanduser('~'), '.cache', 'roger-mesos-tools')
+        if set_cache_dir.strip() != '':
+            os.environ["ROGER_CACHE_DIR"] = set_cache_dir
+
+    def test_getGitMirrorDir(self):
+        set_mirror_dir = os.environ.pop('ROGER_GIT_MIRROR_DIR', '')
+        assert self.settingObj.getGitMirrorDir() is None
+        os.environ["ROGER_GIT_MIRROR_DIR"] = self.base_dir + "/testmirrordir"
+        assert self.settingObj.getGitMirrorDir() == self.base_dir + "/testmirrordir"
+        del os.environ['ROGER_GIT_MIRROR_DIR']
+        if set_mirror_dir.strip() != '':
+            os.environ["ROGER_GIT_MIRROR_DIR"] = set_mirror_dir
+
+    def test_getDockerBackend(self):
+        set_backend = os.environ.pop('ROGER_DOCKER_BACKEND', '')
+        assert self.settingObj.getDockerBackend() == 'cli'
+        os.environ["ROGER_DOCKER_BACKEND"] = "api"
+        assert self.settingObj.getDockerBackend() == 'api'
+        os.environ["ROGER_DOCKER_BACKEND"] = "podman"
+        with self.assertRaises(ValueError):
+            self.settingObj.getDockerBackend()
+        del os.environ['ROGER_DOCKER_BACKEND']
+        if set_backend.strip() != '':
+            os.environ["ROGER_DOCKER_BACKEND"] = set_backend
+
+    def test_getPass_prompts_once(self):
+        set_pass = os.environ.pop('ROGER_USER_PASS_TESTPASS', None)
+        prompts = []
+        getpass = settings.getpass.getpass
+        settings.getpass.getpass = lambda prompt: prompts.append(prompt) or 'secret'
+        try:
+            assert self.settingObj.getPass('testpass') == 'secret'
+            assert Settings().getPass('testpass') == 'secret'
+            assert len(prompts) == 1
+            os.environ['ROGER_USER_PASS_TESTPASS'] = 'from-env'
+            assert self.settingObj.getPass('testpass') == 'from-env'
+        finally:
+            settings.getpass.getpass = getpass
+            settings._passwords.pop('testpass', None)
+            if set_pass is None:
+                os.environ.pop('ROGER_USER_PASS_TESTPASS', None)
+            else:
+                os.environ['ROGER_USER_PASS_TESTPASS'] = set_pass
+
     def tearDown(self):
         pass
 
@@ -0,0 +1,58 @@
+#!/usr/bin/python
+
+from __future__ import print_function
+import unittest
+import os
+import shutil
+import sys
+import tempfile
+sys.path.insert(0, os.path.abspath(os.path.join(
+    os.path.dirname(os.path.realpath(__file__)), os.pardir, "cli")))
+from jinja2 import StrictUndefined, exceptions
+from cli import templates
+
+# Test basic functionalities of the templates module
+
+
+class TestTemplates(unittest.TestCase):
+
+    def setUp(self):
+        self.template_dir = tempfile.mkdtemp()
+        self.cache_dir = tempfile.mkdtemp()
+        self.set_cache_dir = os.environ.get('ROGER_CACHE_DIR')
+        os.environ['ROGER_CACHE_DIR'] = self.cache_dir
+        with open(os.path.join(self.template_dir, 'test-app.json'), 'w') as f:
+            f.write('{"id": "{{ name }}"}')
+        templates.clear()
+
+    def test_get_environment_is_shared(self):
+        env = templates.get_environment(self.template_dir)
+        assert templates.get_environment(self.template_dir + "/") is env
+        assert templates.get_environment(self.template_dir, StrictUndefined) is not env
+
+    def test_templates_are_parsed_once(self):
+        env = templates.get_environment(self.template_dir)
+        template = env.get_template('test-app.json')
+        assert templates.get_environment(self.template_dir).get_template('test-app.json') is template
+        assert template.render(name='app') == '{"id": "app"}'
+
+    def test_strict_undefined(self):
+        template = templates.get_environment(self.template_dir, StrictUndefined).get_template('test-app.json')
+        with self.assertRaises(exceptions.UndefinedError):
+            template.render()
+
+    def test_bytecode_cache_is_isolated(self):
+        templates.get_environment(self.template_dir).get_template('test-app.json')
+        assert os.listdir(os.path.join(self.cache_dir, 'jinja')) != []
+
+    def tearDown(self):
+        templates.clear()
+        if self.set_cache_dir is None:
+            del os.environ['ROGER_CACHE_DIR']
+        else:
+            os.environ['ROGER_CACHE_DIR'] = self.set_cache_dir
+        shutil.rmtree(self.template_dir)
+        shutil.rmtree(self.cache_dir)
+
+if __name__ == '__main__':
+    unittest.main()
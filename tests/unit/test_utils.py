@@ -9,7 +9,7 @@ import sys
 import argparse
 sys.path.insert(0, os.path.abspath(os.path.join(
     os.path.dirname(os.path.realpath(__file__)), os.pardir, "cli")))
-from cli.utils import Utils
+from cli.utils import Utils, ErrorRecord, getDebugInfo, getErrorRecord, printErrorMsg
 from cli.appconfig import AppConfig
 from mockito import mock, Mock, when
 
@@ -41,6 +41,23 @@ class TestUtils(unittest.TestCase):
         assert self.utils.extractShaFromImage("") == ""
         assert self.utils.extractShaFromImage("bdsbddadhhd") == ""
 
+    def test_getDebugInfo(self):
+        line = sys._getframe().f_lineno + 1
+        info = getDebugInfo(1)
+        assert info.endswith(":{} fn:test_getDebugInfo".format(line))
+        assert info.startswith(os.path.splitext(__file__)[0])
+        assert getDebugInfo(10000).endswith("fn:test_getDebugInfo")
+
+    def test_printErrorMsg(self):
+        line = sys._getframe().f_lineno + 1
+        record = printErrorMsg("test error")
+        assert isinstance(record, ErrorRecord)
+        assert record.function == "test_printErrorMsg"
+        assert record.lineno == line
+        assert record.message == "test error"
+        assert str(record).endswith(":{} fn:test_printErrorMsg - test error".format(line))
+        assert getErrorRecord("test error").function == "test_printErrorMsg"
+
 
 if __name__ == '__main__':
     unittest.main()
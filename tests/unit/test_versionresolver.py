@@ -0,0 +1,66 @@
+#!/usr/bin/python
+
+from __future__ import print_function
+import unittest
+import os
+import shutil
+import sys
+import tempfile
+from tests.helper import FakeRegistry, FakeResponse
+sys.path.insert(0, os.path.abspath(os.path.join(
+    os.path.dirname(os.path.realpath(__file__)), os.pardir, "cli")))
+from cli.dockerutils import DockerUtils
+from cli.versionresolver import VersionResolver, split_version
+from mockito import mock, when
+
+# Test basic functionalities of VersionResolver class
+
+
+class TestVersionResolver(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.environments = ['dev', 'prod']
+        self.registry = FakeRegistry([
+            'aaa-other-12ab/v9.0.0',
+            'test-app-12ab/v0.1.0',
+            'test-app-34cd/v0.2.0',
+            'test-app-56ef/v0.10.0',
+            'test-app-dev-78ab/v5.0.0',
+            'test-app-78ab/latest',
+            'test-appx-12ab/v7.0.0',
+            'zzz-other-12ab/v9.0.0'
+        ])
+
+    def resolver(self, registry):
+        return VersionResolver(DockerUtils(session_pool=registry, cache_dir=self.cache_dir))
+
+    def test_split_version(self):
+        assert split_version("0.1.0") == (0, 1, 0)
+        assert split_version("2.0013") == (2, 13, 0)
+
+    def test_getVersions_scans_only_the_prefix(self):
+        versions = self.resolver(self.registry).getVersions('example.com:5000', 'test', 'app', self.environments)
+        assert versions == ['0.1.0', '0.2.0', '0.10.0']
+        assert len(self.registry.calls) == 3
+        assert self.registry.calls[0][0] == 'http://example.com:5000/v2/_catalog?n=1000&last=test-app-'
+        assert self.registry.calls[1][0] == 'http://example.com:5000/v2/_catalog?last=test-app-34cd%2Fv0.2.0&n=2'
+
+    def test_getLatestVersion(self):
+        resolver = self.resolver(self.registry)
+        assert resolver.getLatestVersion('example.com:5000', 'test', 'app', self.environments) == '0.10.0'
+        assert resolver.getLatestVersion('example.com:5000', 'test', 'none', self.environments) is None
+
+    def test_falls_back_to_v1_search(self):
+        dockerUtils = mock(DockerUtils)
+        when(dockerUtils).iter_catalog('example.com:5000', last='test-app-').thenRaise(ValueError("HTTP 404"))
+        when(dockerUtils).docker_search_v1('example.com:5000', 'test', 'app').thenReturn(
+            "test-app-12ab/v0.1.0 description\ntest-app-34cd/v1.0 description\n")
+        versions = VersionResolver(dockerUtils).getVersions('example.com:5000', 'test', 'app', [])
+        assert versions == ['0.1.0', '1.0']
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+#!/usr/bin/python
+
+from __future__ import print_function
+import unittest
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(
+    os.path.dirname(os.path.realpath(__file__)), os.pardir, "cli")))
+import threading
+import time
+from cli.workerpool import WorkerPool, thread_map
+
+# Test basic functionalities of WorkerPool class
+
+
+def succeed(name):
+    print("deploying {}".format(name))
+    os.system("echo from a subprocess of {}".format(name))
+
+
+def fail(name):
+    print("deploying {}".format(name))
+    raise ValueError("{} failed".format(name))
+
+
+def change_dir():
+    os.chdir("/")
+
+
+class TestWorkerPool(unittest.TestCase):
+
+    def test_run_collects_results_in_order(self):
+        completed = []
+        results = WorkerPool(2).run([
+            ('app1', lambda: succeed('app1')),
+            ('app2', lambda: fail('app2')),
+            ('app3', lambda: succeed('app3'))
+        ], on_complete=lambda result: completed.append(result.name))
+        assert [result.name for result in results] == ['app1', 'app2', 'app3']
+        assert sorted(completed) == ['app1', 'app2', 'app3']
+        assert results[0].succeeded is True
+        assert results[0].error is None
+        assert "deploying app1" in results[0].output
+        assert "from a subprocess of app1" in results[0].output
+        assert results[1].succeeded is False
+        assert "app2 failed" in results[1].error
+        assert "deploying app2" in results[1].output
+        assert results[2].succeeded is True
+
+    def test_jobs_do_not_change_parent_state(self):
+        cwd = os.getcwd()
+        results = WorkerPool(1).run([('app1', change_dir)])
+        assert results[0].succeeded is True
+        assert os.getcwd() == cwd
+
+    def test_run_with_no_jobs(self):
+        assert WorkerPool(4).run([]) == []
+
+    def test_thread_map_keeps_order_and_bounds_concurrency(self):
+        lock = threading.Lock()
+        state = {'running': 0, 'peak': 0}
+
+        def work(item):
+            with lock:
+                state['running'] += 1
+                state['peak'] = max(state['peak'], state['running'])
+            time.sleep(0.05)
+            with lock:
+                state['running'] -= 1
+            return item * 2
+
+        assert thread_map(work, range(6), 3) == [0, 2, 4, 6, 8, 10]
+        assert 1 < state['peak'] <= 3
+
+    def test_thread_map_reraises_errors(self):
+        def work(item):
+            if item == 2:
+                raise ValueError("item 2 failed")
+            return item
+        with self.assertRaises(ValueError):
+            thread_map(work, [1, 2, 3], 2)
+
+    def test_thread_map_runs_sequentially_with_one_job(self):
+        assert thread_map(lambda item: threading.current_thread().name, ['a', 'b'], 1) == \
+            [threading.current_thread().name] * 2
+
+    def tearDown(self):
+        pass
+
+if __name__ == '__main__':
+    unittest.main()